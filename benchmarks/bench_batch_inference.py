@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark the vectorized batch inference path against per-row inference.
+
+Trains a model like `simple_train.py` in a temporary directory (the artifacts in
+`src/web_service/local_objects` are left untouched), then times
+`run_batch_inference` against calling `run_inference` once per sample.
+
+The per-row path is only timed on the first `--per-row-limit` samples of large
+batches and extrapolated linearly (marked with `~`).
+
+Usage:
+    python benchmarks/bench_batch_inference.py
+    python benchmarks/bench_batch_inference.py --sizes 1 100 10000 100000
+"""
+
+import argparse
+import pickle as pkl
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the path to enable imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.web_service.app_config import config  # noqa: E402
+from src.web_service.inference import (  # noqa: E402
+    run_batch_inference,
+    run_inference,
+)
+from src.web_service.preprocessing import prepare_training_data  # noqa: E402
+from src.web_service.schemas import AbaloneFeatures  # noqa: E402
+
+
+def train_model(workdir: Path):
+    """Train the default forest and point the config at the temporary artifacts."""
+    from sklearn.ensemble import RandomForestRegressor
+
+    config.model_path = workdir / "model.pkl"
+    config.encoder_path = workdir / "label_encoder.pkl"
+
+    X, y, _ = prepare_training_data(config.data_path)
+    model = RandomForestRegressor(
+        n_estimators=100,
+        max_depth=20,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=-1,
+    )
+    model.fit(X, y)
+    with open(config.model_path, "wb") as f:
+        pkl.dump(model, f)
+    return model
+
+
+def make_samples(n: int, seed: int = 0) -> list[AbaloneFeatures]:
+    """Generate `n` random but valid abalone samples."""
+    rng = np.random.default_rng(seed)
+    sexes = rng.choice(["M", "F", "I"], size=n)
+    values = rng.uniform(0.05, 0.8, size=(n, 7))
+    return [
+        AbaloneFeatures(
+            sex=sex,
+            length=row[0],
+            diameter=row[1],
+            height=row[2],
+            whole_weight=row[3],
+            shucked_weight=row[4],
+            viscera_weight=row[5],
+            shell_weight=row[6],
+        )
+        for sex, row in zip(sexes, values)
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    """Return the best wall time (seconds) of `repeat` calls to `fn`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 100, 10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--per-row-limit",
+        type=int,
+        default=200,
+        help="Max samples timed on the per-row path (the rest is extrapolated)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print("Training benchmark model...")
+        model = train_model(Path(workdir))
+
+        print(
+            f"\n{'batch size':>10}  {'per-row (s)':>12}  {'batch (s)':>10}  "
+            f"{'speedup':>8}  parity"
+        )
+        for size in args.sizes:
+            samples = make_samples(size)
+            subset = samples[: args.per_row_limit]
+
+            per_row = best_of(
+                lambda: [run_inference(f, model=model) for f in subset], args.repeat
+            )
+            per_row *= size / len(subset)
+            batch = best_of(
+                lambda: run_batch_inference(samples, model=model), args.repeat
+            )
+
+            expected = [run_inference(f, model=model) for f in subset]
+            actual = run_batch_inference(subset, model=model)
+            parity = [p.model_dump() for p in actual] == [
+                p.model_dump() for p in expected
+            ]
+
+            marker = "~" if len(subset) < size else " "
+            print(
+                f"{size:>10}  {marker}{per_row:>11.4f}  {batch:>10.4f}  "
+                f"{per_row / batch:>7.1f}x  {'ok' if parity else 'MISMATCH'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Benchmark loading the training data from CSV against its typed columnar copy.
+
+Builds a CSV of `--rows` rows by repeating data/abalone.csv in a temporary
+directory, converts it once with `load_dataset`, then loads it in a fresh
+process per method:
+
+- csv: `pd.read_csv` with inferred dtypes (what every consumer used to do)
+- convert: parsing with explicit dtypes plus writing the copy (paid once per
+  CSV change)
+- columnar: `load_dataset` reading the up-to-date copy
+
+and reports the load time (median of `--repeat` loads), the memory held by the
+resulting DataFrame and the peak resident memory added by one load (Linux
+only).
+
+Usage:
+    python benchmarks/bench_dataset_load.py
+    python benchmarks/bench_dataset_load.py --rows 5000000 --repeat 5
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the path to enable imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modelling import dataset  # noqa: E402
+
+
+def memory_mb() -> dict:
+    """Return the current and peak RSS of this process in MB (Linux only)."""
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("VmRSS", "VmHWM"):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage
+
+
+def worker(method: str, csv_path: str, cache_dir: str, repeat: int, results):
+    """Load the data `repeat` times with one method and report timings."""
+    baseline = memory_mb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if method == "csv":
+            df = pd.read_csv(csv_path)
+        elif method == "convert":
+            copy_path = dataset.dataset_path(csv_path, cache_dir)
+            copy_path.unlink(missing_ok=True)
+            df = dataset.load_dataset(csv_path, cache_dir=cache_dir)
+        else:
+            df = dataset.load_dataset(csv_path, cache_dir=cache_dir)
+        timings.append(time.perf_counter() - start)
+        if len(timings) < repeat:
+            del df
+
+    peak = memory_mb()
+    results.put(
+        {
+            "method": method,
+            "seconds": float(np.median(timings)),
+            "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+            "peak_mb": peak.get("VmHWM", 0.0) - baseline.get("VmRSS", 0.0),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = pd.read_csv(project_root / "data" / "abalone.csv")
+    copies = -(-args.rows // len(source))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = Path(workdir) / "abalone.csv"
+        pd.concat([source] * copies).iloc[: args.rows].to_csv(csv_path, index=False)
+        cache_dir = Path(workdir) / "datasets"
+        dataset.load_dataset(csv_path, cache_dir=cache_dir)
+        copy_path = dataset.dataset_path(csv_path, cache_dir)
+        print(
+            f"{args.rows} rows: CSV {csv_path.stat().st_size / 2**20:.1f} MB, "
+            f"columnar copy {copy_path.stat().st_size / 2**20:.1f} MB"
+        )
+
+        ctx = multiprocessing.get_context("spawn")
+        print(
+            f"\n{'method':>10}  {'load (ms)':>10}  {'frame (MB)':>10}  "
+            f"{'peak (MB)':>10}"
+        )
+        for method in ("csv", "convert", "columnar"):
+            results = ctx.Queue()
+            process = ctx.Process(
+                target=worker,
+                args=(method, str(csv_path), str(cache_dir), args.repeat, results),
+            )
+            process.start()
+            report = results.get()
+            process.join()
+            print(
+                f"{method:>10}  {report['seconds'] * 1e3:>10.1f}  "
+                f"{report['frame_mb']:>10.1f}  {report['peak_mb']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
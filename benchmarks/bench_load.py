@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""Load-test the API and compare the results of two commits.
+
+Subcommands:
+
+- run: start the app, in-process behind an ASGI client (default) or as a local
+  uvicorn server, then drive /predict, /predict/batch and /train at each
+  `--concurrency` level. Writes throughput and latency percentiles (p50, p95,
+  p99) per scenario and concurrency level to a JSON file, with the commit and
+  settings they were measured with.
+- compare: compare two result files and exit with status 1 if a latency
+  percentile of any scenario got slower by more than `--threshold` percent.
+- commits: check out two commits in temporary git worktrees, run the same
+  benchmark on each with this script, then compare them.
+
+Each run serves a model trained for it in a temporary directory, so the
+artifacts in src/web_service/local_objects are left untouched. Request payloads
+are generated from a fixed seed and all distinct, so runs are reproducible and
+not served from the prediction cache. Each level is measured `--repeat` times
+and the median of every number is kept, which damps one-off noise. With the
+ASGI client, the client and the app share one event loop and CPU: use uvicorn
+to measure the server alone.
+
+For /train, the latency is that of the submission (the job runs in the
+background). The time until each job succeeded is reported separately; against
+commits where /train answers only once training is done, it is the response
+time.
+
+Usage:
+    python benchmarks/bench_load.py run --output before.json
+    python benchmarks/bench_load.py run --transport uvicorn --concurrency 1 8 32
+    python benchmarks/bench_load.py compare before.json after.json --threshold 10
+    python benchmarks/bench_load.py commits main HEAD --output-dir results
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+
+SCENARIOS = ("predict", "batch", "train")
+PERCENTILES = ("p50", "p95", "p99")
+SEXES = ("M", "F", "I")
+FIELDS = (
+    "length",
+    "diameter",
+    "height",
+    "whole_weight",
+    "shucked_weight",
+    "viscera_weight",
+    "shell_weight",
+)
+
+
+def make_samples(n: int, seed: int) -> list[dict]:
+    """Generate `n` distinct, valid AbaloneFeatures payloads."""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0.05, 1.0, size=(n, len(FIELDS))).round(6).tolist()
+    sexes = rng.choice(SEXES, size=n).tolist()
+    return [{"sex": sex, **dict(zip(FIELDS, row))} for sex, row in zip(sexes, values)]
+
+
+def summarize(latencies: list, errors: int, seconds: float) -> dict:
+    """Throughput and latency percentiles of one scenario run."""
+    ms = np.asarray(latencies) * 1e3
+    summary = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": seconds,
+        "throughput_rps": len(latencies) / seconds if seconds else 0.0,
+        "latency_ms": None,
+    }
+    if len(ms):
+        summary["latency_ms"] = {
+            "mean": float(ms.mean()),
+            "p50": float(np.percentile(ms, 50)),
+            "p95": float(np.percentile(ms, 95)),
+            "p99": float(np.percentile(ms, 99)),
+            "max": float(ms.max()),
+        }
+    return summary
+
+
+def median_result(runs: list[dict]) -> dict:
+    """Combine repeated runs of one scenario.
+
+    Request and error counts are summed, every other number is the median of
+    the runs.
+    """
+
+    def median(values):
+        if isinstance(values[0], dict):
+            return {key: median([v[key] for v in values]) for key in values[0]}
+        if isinstance(values[0], (int, float)) and not isinstance(values[0], bool):
+            return float(np.median(values))
+        return values[0]
+
+    combined = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        combined[key] = None if None in values else median(values)
+    for key in ("requests", "errors"):
+        combined[key] = sum(run[key] for run in runs)
+    combined["repeats"] = len(runs)
+    return combined
+
+
+def train_benchmark_model(n_estimators: int):
+    """Train the served model into the (temporary) configured paths."""
+    import pickle as pkl
+
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.web_service.app_config import config
+    from src.web_service.preprocessing import prepare_training_data
+
+    X, y, _ = prepare_training_data(config.data_path)
+    model = RandomForestRegressor(
+        n_estimators=n_estimators,
+        max_depth=20,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=-1,
+    ).fit(X, y)
+    with open(config.model_path, "wb") as f:
+        pkl.dump(model, f)
+
+
+@asynccontextmanager
+async def asgi_client():
+    """The app in this process, lifespan included, behind an httpx client."""
+    from src.web_service.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=300
+        ) as client:
+            yield client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(root: Path, startup_timeout: float = 120.0):
+    """A local uvicorn server running the app of `root`, and a client to it."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.web_service.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=root,
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=300
+        ) as client:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    response = await client.get("/health/ready")
+                    if response.status_code == 404:
+                        # Commits without a readiness probe
+                        response = await client.get("/health")
+                    if response.status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become ready in time")
+                await asyncio.sleep(0.1)
+            yield client
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def drive(client, n_requests: int, concurrency: int, send) -> dict:
+    """Send `n_requests` through `concurrency` concurrent users, timing each."""
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def user():
+        nonlocal errors, next_request
+        while next_request < n_requests:
+            index = next_request
+            next_request += 1
+            start = time.perf_counter()
+            try:
+                response = await send(client, index)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_predict(client, args, concurrency: int, seed: int) -> dict:
+    samples = make_samples(args.warmup + args.requests, seed=seed)
+
+    async def send(client, index):
+        return await client.post("/predict", json=samples[index])
+
+    await drive(client, args.warmup, 1, send)
+    samples = samples[args.warmup :]
+    return await drive(client, args.requests, concurrency, send)
+
+
+async def run_batch(client, args, concurrency: int, seed: int) -> dict:
+    n_batches = args.warmup + args.batch_requests
+    samples = make_samples(n_batches * args.batch_size, seed=seed)
+    batches = [
+        samples[i * args.batch_size : (i + 1) * args.batch_size]
+        for i in range(n_batches)
+    ]
+
+    async def send(client, index):
+        return await client.post("/predict/batch", json={"samples": batches[index]})
+
+    await drive(client, args.warmup, 1, send)
+    batches = batches[args.warmup :]
+    result = await drive(client, args.batch_requests, concurrency, send)
+    result["batch_size"] = args.batch_size
+    result["rows_per_second"] = result["throughput_rps"] * args.batch_size
+    return result
+
+
+async def run_train(client, args, concurrency: int, seed: int) -> dict:
+    jobs = []
+    durations = []
+    params = {"n_estimators": args.train_estimators, "max_depth": 10}
+
+    async def send(client, index):
+        start = time.perf_counter()
+        response = await client.post(
+            "/train", json={**params, "random_state": seed + index}
+        )
+        if response.status_code < 400:
+            job_id = response.json().get("job_id")
+            if job_id is None:
+                # Commits training synchronously: the job is done on response
+                durations.append(time.perf_counter() - start)
+            else:
+                jobs.append(job_id)
+        return response
+
+    result = await drive(client, args.train_jobs, concurrency, send)
+
+    # Wait for the queued jobs: time from submission until each one succeeded
+    for job_id in jobs:
+        while True:
+            job = (await client.get(f"/train/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.1)
+        if job["status"] == "succeeded":
+            submitted = datetime.fromisoformat(job["submitted_at"])
+            finished = datetime.fromisoformat(job["finished_at"])
+            durations.append((finished - submitted).total_seconds())
+        else:
+            result["errors"] += 1
+    result["job_seconds"] = (
+        {
+            "p50": float(np.percentile(durations, 50)),
+            "max": float(max(durations)),
+        }
+        if durations
+        else None
+    )
+    return result
+
+
+RUNNERS = {"predict": run_predict, "batch": run_batch, "train": run_train}
+
+
+def git_commit(root: Path) -> dict:
+    """Commit of `root`, and whether its working tree has uncommitted changes."""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"sha": None, "dirty": None}
+    return {"sha": sha, "dirty": bool(status.strip())}
+
+
+async def benchmark(args, root: Path) -> list[dict]:
+    client_context = asgi_client() if args.transport == "asgi" else uvicorn_client(root)
+    results = []
+    async with client_context as client:
+        # Training replaces the served model, so it runs last
+        for scenario in [s for s in SCENARIOS if s in args.scenarios]:
+            for concurrency in args.concurrency:
+                # A new seed per run, so no payload is sent twice
+                runs = []
+                for _ in range(args.repeat):
+                    seed = len(results) * args.repeat + len(runs)
+                    runs.append(
+                        await RUNNERS[scenario](client, args, concurrency, seed)
+                    )
+                results.append(
+                    {
+                        "scenario": scenario,
+                        "concurrency": concurrency,
+                        **median_result(runs),
+                    }
+                )
+                print_result(results[-1])
+    return results
+
+
+def print_result(result: dict):
+    latency = result["latency_ms"] or dict.fromkeys(PERCENTILES, float("nan"))
+    print(
+        f"{result['scenario']:>8}  {result['concurrency']:>4}  "
+        f"{result['throughput_rps']:>9.1f}  {latency['p50']:>8.2f}  "
+        f"{latency['p95']:>8.2f}  {latency['p99']:>8.2f}  {result['errors']:>6}"
+    )
+
+
+def command_run(args) -> int:
+    root = Path(args.root).resolve()
+    workdir = Path(tempfile.mkdtemp(prefix="bench-load-"))
+    # Before anything reads the app config, in this process and in uvicorn's
+    os.environ.update(
+        {
+            "ABALONE_MODEL_PATH": str(workdir / "model.pkl"),
+            "ABALONE_ENCODER_PATH": str(workdir / "label_encoder.pkl"),
+            "ABALONE_COMPILED_MODEL_PATH": str(workdir / "compiled_forest"),
+            "ABALONE_DATASET_CACHE_DIR": str(workdir / "datasets"),
+            "ABALONE_DATA_PATH": str(root / "data" / "abalone.csv"),
+        }
+    )
+    os.chdir(root)
+    sys.path.insert(0, str(root))
+
+    print(f"Training a {args.n_estimators}-tree model for {root}...")
+    train_benchmark_model(args.n_estimators)
+
+    print(
+        f"\n{'scenario':>8}  {'conc':>4}  {'req/s':>9}  {'p50 (ms)':>8}  "
+        f"{'p95 (ms)':>8}  {'p99 (ms)':>8}  {'errors':>6}"
+    )
+    results = asyncio.run(benchmark(args, root))
+
+    report = {
+        "commit": git_commit(root),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            key: getattr(args, key)
+            for key in (
+                "transport",
+                "scenarios",
+                "concurrency",
+                "requests",
+                "batch_requests",
+                "batch_size",
+                "train_jobs",
+                "train_estimators",
+                "warmup",
+                "repeat",
+                "n_estimators",
+            )
+        },
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def compare_reports(
+    base: dict, new: dict, threshold: float, min_delta_ms: float
+) -> tuple:
+    """Compare the latency percentiles of two reports.
+
+    A percentile regresses when it is more than `threshold` percent and more
+    than `min_delta_ms` slower (the absolute floor ignores jitter on
+    sub-millisecond latencies).
+
+    Returns:
+        tuple: (rows of the comparison table, list of regression messages)
+    """
+    base_results = {(r["scenario"], r["concurrency"]): r for r in base["results"]}
+    rows, regressions = [], []
+    for result in new["results"]:
+        key = (result["scenario"], result["concurrency"])
+        reference = base_results.get(key)
+        if reference is None or not reference["latency_ms"] or not result["latency_ms"]:
+            continue
+        for metric in PERCENTILES:
+            before = reference["latency_ms"][metric]
+            after = result["latency_ms"][metric]
+            change = (after - before) / before * 100 if before else 0.0
+            regressed = change > threshold and after - before > min_delta_ms
+            rows.append((*key, metric, before, after, change, regressed))
+            if regressed:
+                regressions.append(
+                    f"{key[0]} at concurrency {key[1]}: {metric} "
+                    f"{before:.2f} -> {after:.2f} ms ({change:+.1f}%)"
+                )
+        before_rps, after_rps = reference["throughput_rps"], result["throughput_rps"]
+        change = (after_rps - before_rps) / before_rps * 100 if before_rps else 0.0
+        rows.append((*key, "req/s", before_rps, after_rps, change, False))
+    return rows, regressions
+
+
+def print_comparison(base: dict, new: dict, rows: list, regressions: list, threshold):
+    def describe(report):
+        commit = report["commit"]
+        sha = (commit["sha"] or "unknown")[:10]
+        return sha + (" (dirty)" if commit["dirty"] else "")
+
+    print(f"base: {describe(base)}    new: {describe(new)}")
+    print(
+        f"\n{'scenario':>8}  {'conc':>4}  {'metric':>6}  {'base':>9}  "
+        f"{'new':>9}  {'change':>8}"
+    )
+    for scenario, concurrency, metric, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{scenario:>8}  {concurrency:>4}  {metric:>6}  {before:>9.2f}  "
+            f"{after:>9.2f}  {change:>+7.1f}%{flag}"
+        )
+    if regressions:
+        print(f"\n{len(regressions)} latency regression(s) above {threshold}%:")
+        for message in regressions:
+            print(f"  {message}")
+    else:
+        print(f"\nNo latency regression above {threshold}%")
+
+
+def command_compare(args) -> int:
+    base = json.loads(Path(args.base).read_text())
+    new = json.loads(Path(args.new).read_text())
+    rows, regressions = compare_reports(base, new, args.threshold, args.min_delta_ms)
+    print_comparison(base, new, rows, regressions, args.threshold)
+    return 1 if regressions else 0
+
+
+def run_arguments(args) -> list:
+    """The `run` options of `args`, as command-line arguments."""
+    return [
+        "--transport",
+        args.transport,
+        "--scenarios",
+        *args.scenarios,
+        "--concurrency",
+        *map(str, args.concurrency),
+        "--requests",
+        str(args.requests),
+        "--batch-requests",
+        str(args.batch_requests),
+        "--batch-size",
+        str(args.batch_size),
+        "--train-jobs",
+        str(args.train_jobs),
+        "--train-estimators",
+        str(args.train_estimators),
+        "--warmup",
+        str(args.warmup),
+        "--repeat",
+        str(args.repeat),
+        "--n-estimators",
+        str(args.n_estimators),
+    ]
+
+
+def command_commits(args) -> int:
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = []
+    with tempfile.TemporaryDirectory(prefix="bench-load-worktrees-") as tmp:
+        for i, ref in enumerate((args.base, args.new)):
+            worktree = Path(tmp) / f"tree-{i}"
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", str(worktree), ref],
+                cwd=project_root,
+                check=True,
+            )
+            output = (output_dir / f"{i}-{ref.replace('/', '_')}.json").resolve()
+            try:
+                print(f"\n=== {ref} ===")
+                subprocess.run(
+                    [
+                        sys.executable,
+                        str(Path(__file__).resolve()),
+                        "run",
+                        "--root",
+                        str(worktree),
+                        "--output",
+                        str(output),
+                        *run_arguments(args),
+                    ],
+                    check=True,
+                )
+            finally:
+                subprocess.run(
+                    ["git", "worktree", "remove", "--force", str(worktree)],
+                    cwd=project_root,
+                    check=False,
+                )
+            outputs.append(output)
+
+    print()
+    args.base, args.new = outputs
+    return command_compare(args)
+
+
+def add_run_options(parser):
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--requests", type=int, default=500, help="/predict requests per level"
+    )
+    parser.add_argument(
+        "--batch-requests", type=int, default=50, help="/predict/batch requests"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--train-jobs", type=int, default=2, help="/train requests")
+    parser.add_argument(
+        "--train-estimators", type=int, default=20, help="Trees per /train job"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="Untimed requests per level"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per level; the median of each number is kept",
+    )
+    parser.add_argument(
+        "--n-estimators", type=int, default=100, help="Trees of the served model"
+    )
+
+
+def add_compare_options(parser):
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Fail when a latency percentile is this many percent slower",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.5,
+        help="Ignore slowdowns smaller than this many milliseconds",
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Benchmark the app of one source tree")
+    add_run_options(run)
+    run.add_argument("--root", default=str(project_root), help="Source tree to run")
+    run.add_argument("--output", default="benchmarks/results/load.json")
+
+    compare = commands.add_parser("compare", help="Compare two result files")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    add_compare_options(compare)
+
+    commits = commands.add_parser("commits", help="Benchmark and compare two commits")
+    commits.add_argument("base", help="Reference commit (e.g. main)")
+    commits.add_argument("new", help="Commit to check (e.g. HEAD)")
+    commits.add_argument("--output-dir", default="benchmarks/results")
+    add_run_options(commits)
+    add_compare_options(commits)
+
+    args = parser.parse_args()
+    handlers = {
+        "run": command_run,
+        "compare": command_compare,
+        "commits": command_commits,
+    }
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Benchmark model cold-start time and per-worker memory for each artifact format.
+
+Trains the default forest in a temporary directory, exports both the pickle and
+the memory-mapped compiled artifact, then starts `--workers` processes per
+format at the same time. Each worker loads the model, predicts a batch (which
+touches the model pages), waits for the others, and reports:
+
+- load: time to get a ready-to-predict model
+- rss: resident memory of the worker
+- pss: proportional set size, where shared pages are split between the
+  processes mapping them (Linux only), the honest per-worker cost
+
+Usage:
+    python benchmarks/bench_model_startup.py
+    python benchmarks/bench_model_startup.py --workers 8 --n-estimators 300
+"""
+
+import argparse
+import multiprocessing
+import pickle as pkl
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the path to enable imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modelling.compiled_forest import (  # noqa: E402
+    CompiledForest,
+    export_compiled_forest,
+)
+
+
+def memory_mb() -> dict:
+    """Return the RSS and PSS of the current process in MB (Linux only)."""
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    usage[key.lower()] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage
+
+
+def worker(fmt: str, workdir: str, barrier, results):
+    """Load the model in the given format, predict, and report timings."""
+    # Import sklearn up front so the pickle timing measures unpickling only
+    import sklearn.ensemble  # noqa: F401
+
+    X = np.random.default_rng(0).uniform(0.0, 1.0, size=(2000, 8))
+    baseline = memory_mb()
+
+    start = time.perf_counter()
+    if fmt == "pickle":
+        with open(Path(workdir) / "model.pkl", "rb") as f:
+            model = pkl.load(f)
+    else:
+        model, _ = CompiledForest.load(Path(workdir) / "compiled_forest")
+    load_seconds = time.perf_counter() - start
+
+    model.predict(X)
+    ready_seconds = time.perf_counter() - start
+
+    # Measure while every worker of this format holds the model
+    barrier.wait()
+    usage = memory_mb()
+    results.put(
+        {
+            "load": load_seconds,
+            "ready": ready_seconds,
+            "rss": usage.get("rss", 0.0) - baseline.get("rss", 0.0),
+            "pss": usage.get("pss", 0.0) - baseline.get("pss", 0.0),
+        }
+    )
+    barrier.wait()
+
+
+def run_format(fmt: str, workdir: str, n_workers: int) -> list[dict]:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(fmt, workdir, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    args = parser.parse_args()
+
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.web_service.app_config import config
+    from src.web_service.preprocessing import prepare_training_data
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print("Training benchmark model...")
+        config.encoder_path = Path(workdir) / "label_encoder.pkl"
+        X, y, _ = prepare_training_data(config.data_path)
+        model = RandomForestRegressor(
+            n_estimators=args.n_estimators,
+            max_depth=20,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42,
+            n_jobs=-1,
+        ).fit(X, y)
+
+        model_path = Path(workdir) / "model.pkl"
+        with open(model_path, "wb") as f:
+            pkl.dump(model, f)
+        export_compiled_forest(model, model_path, Path(workdir) / "compiled_forest")
+        del model
+
+        print(f"\n{args.workers} workers per format (medians)")
+        print(
+            f"{'format':>10}  {'load (ms)':>10}  {'ready (ms)':>10}  "
+            f"{'rss (MB)':>9}  {'pss (MB)':>9}"
+        )
+        for fmt in ("pickle", "mmap"):
+            reports = run_format(fmt, workdir, args.workers)
+            median = {
+                key: float(np.median([r[key] for r in reports])) for key in reports[0]
+            }
+            print(
+                f"{fmt:>10}  {median['load'] * 1e3:>10.1f}  "
+                f"{median['ready'] * 1e3:>10.1f}  {median['rss']:>9.1f}  "
+                f"{median['pss']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
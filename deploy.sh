@@ -46,8 +46,10 @@ sleep 30
 echo "🔍 Checking service health..."
 
 # Check API
-if curl -f http://localhost:8000/health > /dev/null 2>&1; then
+if curl -f http://localhost:8000/health/ready > /dev/null 2>&1; then
     echo "✅ API service is healthy"
+elif curl -f http://localhost:8000/health/live > /dev/null 2>&1; then
+    echo "⚠️  API service is up but no model is ready yet"
 else
     echo "❌ API service is not responding"
 fi
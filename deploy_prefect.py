@@ -3,53 +3,57 @@ Prefect Deployment Configuration for MLOps Project
 Automated retraining pipeline with scheduling
 """
 
-from prefect import flow, task
+from prefect import flow
 from prefect.deployments import Deployment
 from prefect.server.schemas.schedules import CronSchedule
-import subprocess
-import sys
 from pathlib import Path
+from src.modelling.incremental import incremental_training
+from src.modelling.main import main as training_pipeline
 
 
-@task
-def train_model_task():
-    """Task to train the ML model"""
-    try:
-        # Run the training pipeline
-        result = subprocess.run(
-            [sys.executable, "src/modelling/main.py"],
-            capture_output=True,
-            text=True,
-            cwd=Path.cwd(),
-        )
+@flow(name="mlops-training-pipeline")
+def mlops_training_flow(
+    mode: str = "full",
+    data_dir: str = "data/incoming",
+    drift_threshold: float = 0.2,
+):
+    """Main flow for MLOps training pipeline
 
-        if result.returncode == 0:
-            print("✅ Model training completed successfully")
-            return True
-        else:
-            print(f"❌ Model training failed: {result.stderr}")
-            return False
+    "full" (the default) retrains from scratch with the training-pipeline
+    flow. In "incremental" mode, only the rows added to data/abalone.csv or to
+    `data_dir` since the last run are fitted, as extra trees of the current
+    model; it falls back to a full retrain on drift (PSI above
+    `drift_threshold`) or when there is no previous run.
 
-    except Exception as e:
-        print(f"❌ Error during model training: {e}")
-        return False
+    Both run in this process as subflows, so a failure fails this run with
+    its traceback, and imports are paid once per worker instead of by a new
+    interpreter on every run.
 
+    Returns:
+        The result of the subflow (metrics, model path, timings)
+    """
+    print(f"🚀 Starting MLOps training pipeline ({mode})...")
 
-@flow(name="mlops-training-pipeline")
-def mlops_training_flow():
-    """Main flow for MLOps training pipeline"""
-    print("🚀 Starting MLOps training pipeline...")
+    if mode == "incremental":
+        result = incremental_training(
+            data_dir=Path(data_dir), drift_threshold=drift_threshold
+        )
+        print(
+            f"🎉 MLOps training pipeline completed: {result['mode']} "
+            f"({result['reason']})"
+        )
+        return result
 
     # Train the model
-    success = train_model_task()
-
-    if success:
-        print("🎉 MLOps training pipeline completed successfully!")
-    else:
-        print("💥 MLOps training pipeline failed!")
-        raise Exception("Model training failed")
-
-    return success
+    result = training_pipeline()
+    stages = ", ".join(
+        f"{stage} {seconds:.1f}s" for stage, seconds in result["stage_seconds"].items()
+    )
+    print(
+        f"🎉 MLOps training pipeline completed successfully! "
+        f"MSE {result['metrics']['mse']:.4f} ({stages})"
+    )
+    return result
 
 
 # Create deployment
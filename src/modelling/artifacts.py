@@ -0,0 +1,49 @@
+"""Helpers to write and version model artifacts on disk."""
+
+import hashlib
+import os
+import pickle as pkl
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def file_signature(path: Path) -> tuple:
+    """Return the (mtime, size) signature used to detect a rewritten file."""
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def content_version(data: bytes) -> str:
+    """Return the version of an artifact: a short hash of its content."""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+@contextmanager
+def atomic_write(path: Path):
+    """Open a temporary file next to `path` and move it into place on success.
+
+    Concurrent readers see either the old or the new file, never a partial one.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def save_pickle_atomic(obj, path: Path):
+    """
+    Pickle an object to `path` atomically.
+
+    Args:
+        obj: Any picklable object (model, encoder, etc.)
+        path: Destination path
+    """
+    with atomic_write(path) as f:
+        pkl.dump(obj, f)
@@ -0,0 +1,203 @@
+"""On-disk cache of preprocessing results, keyed by the content of their inputs.
+
+Entries are Parquet files in a local directory, evicted least recently used
+first beyond a size limit.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import pandas as pd
+
+# Bump to invalidate every entry when the storage layout changes
+CACHE_FORMAT_VERSION = "1"
+
+# Source files whose content is the "preprocessing code version". dataset.py
+# shapes the frames load_data returns (dtypes, float32 narrowing)
+PREPROCESSING_SOURCES = [
+    Path(__file__).parent / "preprocessing.py",
+    Path(__file__).parent / "utils.py",
+    Path(__file__).parent / "dataset.py",
+]
+
+
+# File digests of this process, by (path, size, modification time)
+_file_digests = {}
+
+
+def file_digest(path) -> str:
+    """
+    SHA-256 of a file's content.
+
+    Digests are remembered per (path, size, modification time) for the life
+    of the process, so a file is read again only when it changes.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _file_digests[memo_key] = digest.hexdigest()
+    return _file_digests[memo_key]
+
+
+def code_version() -> str:
+    """Digest of the preprocessing source files and of the cache format."""
+    digest = hashlib.sha256(CACHE_FORMAT_VERSION.encode())
+    for path in PREPROCESSING_SOURCES:
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def frame_digest(frame) -> str:
+    """SHA-256 of a DataFrame or Series: values, index, column names and dtypes."""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    if isinstance(frame, pd.DataFrame):
+        digest.update(repr(list(frame.columns)).encode())
+        digest.update(repr(list(frame.dtypes.astype(str))).encode())
+    else:
+        digest.update(repr((frame.name, str(frame.dtype))).encode())
+    return digest.hexdigest()
+
+
+def input_key(value) -> str:
+    """Content key of a stage input: file digest for paths, data digest for frames."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return "frame:" + frame_digest(value)
+    if isinstance(value, (str, os.PathLike)) and Path(value).is_file():
+        return "file:" + file_digest(value)
+    return "value:" + repr(value)
+
+
+class FrameCache:
+    """
+    On-disk cache of DataFrames, Series and tuples of them.
+
+    Each entry is a directory of Parquet files (one per frame) and a
+    meta.json describing how to rebuild the result. Entries are written to a
+    temporary directory and renamed into place, so readers never see half an
+    entry. A hit refreshes the entry's modification time; when the cache
+    grows beyond `max_bytes`, the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key(self, *parts: str) -> str:
+        """Entry key of a stage and the content keys of its inputs."""
+        return hashlib.sha256("\0".join([code_version(), *parts]).encode()).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached result of `key`, or None."""
+        entry = self.directory / key
+        try:
+            with open(entry / "meta.json") as f:
+                meta = json.load(f)
+            frames = []
+            for i, kind in enumerate(meta["kinds"]):
+                frame = pd.read_parquet(entry / f"{i}.parquet")
+                if kind == "series":
+                    frame = frame.iloc[:, 0].rename(meta["names"][i])
+                frames.append(frame)
+            os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            # Missing, or removed by a concurrent eviction
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tuple(frames) if meta["tuple"] else frames[0]
+
+    def put(self, key: str, result):
+        """Store a DataFrame, a Series or a tuple of them, then evict if needed."""
+        frames = result if isinstance(result, tuple) else (result,)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_entry = Path(tempfile.mkdtemp(dir=self.directory, prefix=".tmp-"))
+        try:
+            meta = {"tuple": isinstance(result, tuple), "kinds": [], "names": []}
+            for i, frame in enumerate(frames):
+                is_series = isinstance(frame, pd.Series)
+                meta["kinds"].append("series" if is_series else "frame")
+                meta["names"].append(frame.name if is_series else None)
+                table = frame.to_frame(name="values") if is_series else frame
+                table.to_parquet(tmp_entry / f"{i}.parquet")
+            with open(tmp_entry / "meta.json", "w") as f:
+                json.dump(meta, f)
+            os.rename(tmp_entry, self.directory / key)
+        except OSError:
+            # Already stored by a concurrent run
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Delete every entry."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+preprocessing_cache = FrameCache(
+    directory=os.getenv("ABALONE_PREPROCESSING_CACHE_DIR", ".cache/preprocessing"),
+    # Opt-in: 0 (the default) disables the cache
+    max_bytes=int(float(os.getenv("ABALONE_PREPROCESSING_CACHE_MAX_MB", "0")) * 2**20),
+)
+
+
+def cached_stage(func):
+    """
+    Cache a preprocessing stage returning DataFrames in `preprocessing_cache`.
+
+    The key is the stage name, the preprocessing code version and the content
+    of every argument (file digest for paths, data digest for frames), so a
+    result is reused only when it would be recomputed identically.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not preprocessing_cache.enabled:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = preprocessing_cache.key(
+            func.__qualname__,
+            *(f"{name}={input_key(value)}" for name, value in bound.arguments.items()),
+        )
+        result = preprocessing_cache.get(key)
+        if result is None:
+            result = func(*args, **kwargs)
+            preprocessing_cache.put(key, result)
+        return result
+
+    return wrapper
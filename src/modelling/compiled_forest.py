@@ -0,0 +1,212 @@
+"""Flat, array-backed evaluator for a fitted RandomForestRegressor.
+
+All trees of the forest are concatenated into contiguous NumPy arrays (one
+entry per node) and a batch is evaluated by walking every tree one level at a
+time with vectorized gathers, instead of going through sklearn's per-call
+validation and joblib dispatch.
+
+On disk, a compiled forest is a directory holding one `.npy` file per array and
+a small JSON manifest:
+
+    compiled_forest/
+        manifest.json           version, shapes and the array directory in use
+        <version>-<id>/*.npy    the node arrays
+
+Loading memory-maps the arrays read-only, so it takes constant time and every
+worker process serving the same artifact shares its pages through the OS page
+cache. A new export writes a fresh array directory and then atomically replaces
+the manifest, so readers never see a half-written forest.
+"""
+
+import json
+import shutil
+import uuid
+from pathlib import Path
+import numpy as np
+from .artifacts import atomic_write, content_version, file_signature
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class CompiledForest:
+    """A random forest regressor compiled to flat node arrays.
+
+    Leaves point to themselves (left == right == node) with an infinite
+    threshold, so walking `max_depth` levels leaves every sample on its leaf
+    without any branching.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompiledForest":
+        """Flatten the trees of a fitted (single-output) RandomForestRegressor."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Only single-output forests can be compiled")
+
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int64),
+            right=np.concatenate(rights).astype(np.int64),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=max_depth,
+        )
+
+    def predict(self, X) -> np.ndarray:
+        """Predict a batch, matching `RandomForestRegressor.predict`.
+
+        Like sklearn's trees, features are compared as float32 against float64
+        thresholds, and the per-tree outputs are averaged.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+
+        # Index into the flattened matrix: row offset + feature
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.int64) * n_features)[:, None]
+
+        nodes = np.repeat(self.roots[None, :], n_samples, axis=0)
+        for _ in range(self.max_depth):
+            go_left = X_flat[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return self.value[nodes].sum(axis=1) / self.n_trees
+
+    def save(self, directory: Path, version: str = None, **metadata) -> dict:
+        """Save the node arrays as `.npy` files plus a JSON manifest.
+
+        Args:
+            directory: Artifact directory (created if needed)
+            version: Version of the source model, recorded in the manifest
+            **metadata: Extra JSON-serializable fields for the manifest
+
+        Returns:
+            The manifest that was written
+        """
+        directory = Path(directory)
+        arrays_dir_name = f"{version or 'unversioned'}-{uuid.uuid4().hex[:8]}"
+        arrays_dir = directory / arrays_dir_name
+        arrays_dir.mkdir(parents=True)
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            array = np.ascontiguousarray(getattr(self, name))
+            np.save(arrays_dir / f"{name}.npy", array)
+            arrays[name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "version": version,
+            "arrays_dir": arrays_dir_name,
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes,
+            "max_depth": self.max_depth,
+            "arrays": arrays,
+            **metadata,
+        }
+        with atomic_write(directory / MANIFEST_NAME) as f:
+            f.write(json.dumps(manifest, indent=2).encode())
+
+        # Drop older array directories. Processes that still have them mapped
+        # keep their pages until they reload.
+        for child in directory.iterdir():
+            if child.is_dir() and child.name != arrays_dir_name:
+                shutil.rmtree(child, ignore_errors=True)
+
+        return manifest
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> tuple:
+        """Load a forest saved with `save`.
+
+        Args:
+            directory: Artifact directory
+            mmap: If True, memory-map the arrays read-only instead of reading them
+
+        Returns:
+            tuple: (CompiledForest, manifest)
+
+        Raises:
+            FileNotFoundError: If the artifact (or one of its arrays) is missing
+            ValueError: If the artifact format is not supported
+        """
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST_NAME).read_text())
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported compiled forest format: {manifest.get('format_version')}"
+            )
+
+        arrays_dir = directory / manifest["arrays_dir"]
+        arrays = {
+            # asarray drops the np.memmap subclass (no copy), which keeps
+            # fancy indexing on the hot path as cheap as on plain arrays
+            name: np.asarray(
+                np.load(arrays_dir / f"{name}.npy", mmap_mode="r" if mmap else None)
+            )
+            for name in ARRAY_NAMES
+        }
+        return cls(**arrays, max_depth=manifest["max_depth"]), manifest
+
+
+def export_compiled_forest(forest, model_path: Path, compiled_path: Path) -> str:
+    """Compile a fitted forest and save it next to its pickled model.
+
+    The manifest records the version and file signature of the pickle it was
+    built from, so a stale export is detected when the model is retrained
+    without it, and a fresh one is trusted without re-hashing the pickle.
+
+    Args:
+        forest: The fitted RandomForestRegressor (already saved to `model_path`)
+        model_path: Path of the pickled model
+        compiled_path: Artifact directory of the compiled forest
+
+    Returns:
+        The version of the exported model
+    """
+    model_path = Path(model_path)
+    version = content_version(model_path.read_bytes())
+    CompiledForest.from_sklearn(forest).save(
+        compiled_path,
+        version=version,
+        source_signature=list(file_signature(model_path)),
+    )
+    return version
@@ -0,0 +1,144 @@
+"""Typed columnar copy of the training CSV.
+
+The CSV is parsed once into an Arrow IPC (Feather v2) file with explicit
+dtypes: Sex as a categorical, measurements as float32 when that loses no
+precision of the CSV values, Rings as int16. Later loads memory-map that file
+instead of parsing text again. The copy records the signature and digest of
+the CSV it came from, and is rebuilt only when the CSV content changes.
+
+Every reader of the training data (the training flow, `prepare_training_data`,
+simple_train.py, the Streamlit demo) goes through `load_dataset`.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pathlib import Path
+from .artifacts import atomic_write, file_signature
+
+# Bump to rebuild every copy when the conversion changes
+DATASET_FORMAT_VERSION = 1
+
+# Directory of the copies
+DATASET_CACHE_DIR = Path(os.getenv("ABALONE_DATASET_CACHE_DIR", ".cache/datasets"))
+
+MEASUREMENT_COLUMNS = [
+    "Length",
+    "Diameter",
+    "Height",
+    "Whole weight",
+    "Shucked weight",
+    "Viscera weight",
+    "Shell weight",
+]
+DTYPES = {
+    "Sex": "category",
+    "Rings": "int16",
+    **{column: "float64" for column in MEASUREMENT_COLUMNS},
+}
+
+# float32 is used when it keeps every value to this relative precision (the
+# CSV has at most 4 significant digits)
+FLOAT32_RTOL = 1e-6
+
+METADATA_KEY = b"abalone_source"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_path(csv_path: Path, cache_dir: Path = None) -> Path:
+    """Location of the columnar copy of `csv_path` (one per source path)."""
+    csv_path = Path(csv_path).resolve()
+    path_hash = hashlib.sha256(str(csv_path).encode()).hexdigest()[:12]
+    return Path(cache_dir or DATASET_CACHE_DIR) / (
+        f"{csv_path.stem}-{path_hash}.feather"
+    )
+
+
+def read_csv_typed(csv_path: Path) -> pd.DataFrame:
+    """Parse the CSV with explicit dtypes, narrowing measurements to float32."""
+    df = pd.read_csv(csv_path, dtype=DTYPES)
+    for column in MEASUREMENT_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy()
+        narrowed = values.astype(np.float32)
+        if np.allclose(narrowed, values, rtol=FLOAT32_RTOL, atol=0, equal_nan=True):
+            df[column] = narrowed
+    return df
+
+
+def _write(table: pa.Table, path: Path, source: dict):
+    metadata = {**(table.schema.metadata or {}), METADATA_KEY: json.dumps(source)}
+    # Uncompressed so that loads can memory-map the file
+    with atomic_write(path) as f:
+        feather.write_feather(
+            table.replace_schema_metadata(metadata), f, compression="uncompressed"
+        )
+
+
+def _read_source(path: Path) -> dict | None:
+    """Source description stored in a copy, None if there is no usable copy."""
+    try:
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(metadata[METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return None
+
+
+def load_dataset(
+    csv_path: Path, columns: list = None, cache_dir: Path = None
+) -> pd.DataFrame:
+    """Load the training data through its columnar copy.
+
+    The copy is valid while the CSV keeps the same (mtime, size) signature.
+    When the signature changed, the CSV is hashed: the copy is rebuilt only
+    if the content changed too.
+
+    Args:
+        csv_path: Raw CSV file
+        columns: Columns to load (default: all of them)
+        cache_dir: Directory of the copies (default: `DATASET_CACHE_DIR`)
+
+    Returns:
+        DataFrame with Sex as a categorical and numeric columns in their
+        narrowest lossless dtype
+
+    Raises:
+        FileNotFoundError: If the CSV doesn't exist
+    """
+    csv_path = Path(csv_path)
+    signature = list(file_signature(csv_path))
+    path = dataset_path(csv_path, cache_dir)
+    stored = _read_source(path)
+
+    fresh = stored is not None and stored["version"] == DATASET_FORMAT_VERSION
+    if fresh and stored["signature"] != signature:
+        fresh = stored["sha256"] == _sha256(csv_path)
+        if fresh:
+            # Touched but unchanged: record the new signature, no parsing
+            table = feather.read_table(path, memory_map=True)
+            _write(table, path, {**stored, "signature": signature})
+
+    if not fresh:
+        source = {
+            "version": DATASET_FORMAT_VERSION,
+            "path": str(csv_path),
+            "signature": signature,
+            "sha256": _sha256(csv_path),
+        }
+        table = pa.Table.from_pandas(read_csv_typed(csv_path), preserve_index=False)
+        _write(table, path, source)
+
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
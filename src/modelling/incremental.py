@@ -0,0 +1,427 @@
+"""Incremental retraining: fit only the rows added since the last run.
+
+New rows are fitted as extra trees of the current forest. A full retrain
+happens when there is no usable previous run, the data was rewritten, the data
+drifted or the forest grew too large.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import pickle as pkl
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from prefect import flow
+from .preprocessing import FEATURE_COLUMNS, TARGET_COLUMN, splitting_data
+from .search import BASE_PARAMS
+from .training import evaluate, save_model, train
+
+STATE_FILENAME = "training_state.json"
+STATE_VERSION = 1
+
+# Codes of a LabelEncoder fitted on the full data, fixed so that a batch of new
+# rows missing a class is encoded like the training data
+SEX_CLASSES = ["F", "I", "M"]
+
+# Columns whose distribution is watched for drift (target included)
+DRIFT_COLUMNS = FEATURE_COLUMNS[1:] + TARGET_COLUMN
+DRIFT_BINS = 10
+# Bins empty on one side would make the PSI infinite
+PSI_EPSILON = 1e-4
+
+
+def _sha256(path: Path, limit: int = None) -> str:
+    """Digest of a file, or of its first `limit` bytes."""
+    digest = hashlib.sha256()
+    remaining = limit if limit is not None else math.inf
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(int(min(1 << 20, remaining)))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def read_csv_from(path: Path, offset: int = 0) -> tuple:
+    """
+    Read the complete rows of a CSV file that start at or after byte `offset`.
+
+    A trailing line without a newline may still be being written: it is left
+    for the next run.
+
+    Returns:
+        tuple: (DataFrame of the rows, byte offset after the last complete row)
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = max(offset, f.tell())
+        f.seek(start)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    df = pd.read_csv(io.BytesIO(header + data[:end]))
+    return df, start + end
+
+
+def load_state(savepath) -> dict | None:
+    """Load the state of the last run from `savepath`, None if there is none."""
+    path = Path(savepath) / STATE_FILENAME
+    if not path.exists():
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def save_state(state: dict, savepath):
+    """Write the state atomically, so a crash never leaves half a file."""
+    path = Path(savepath) / STATE_FILENAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def detect_new_data(trainset_path: Path, data_dir: Path = None, state: dict = None):
+    """
+    Find the rows added since the last run.
+
+    The main CSV is append-only: its high-water mark is the byte offset after
+    the last row consumed, with the digest of everything before it. CSV files
+    in `data_dir` are consumed whole and remembered by content digest.
+
+    Args:
+        trainset_path: Main training CSV
+        data_dir: Optional directory of appended CSV files
+        state: State of the last run (None: every row is new)
+
+    Returns:
+        tuple: (DataFrame of the new rows, updated sources for the state,
+            reason why the previous data can't be trusted or None)
+    """
+    trainset_path = Path(trainset_path)
+    previous = (state or {}).get("sources", {})
+    frames = []
+    reason = None
+
+    mark = previous.get("trainset", {})
+    offset = mark.get("offset", 0)
+    if offset and (
+        not trainset_path.exists()
+        or trainset_path.stat().st_size < offset
+        or _sha256(trainset_path, offset) != mark.get("sha256")
+    ):
+        reason = f"{trainset_path} was rewritten since the last run"
+        offset = 0
+    df, offset = read_csv_from(trainset_path, offset)
+    frames.append(df)
+    sources = {
+        "trainset": {
+            "path": str(trainset_path),
+            "offset": offset,
+            "sha256": _sha256(trainset_path, offset),
+        },
+        "files": {},
+    }
+
+    consumed = previous.get("files", {})
+    if data_dir is not None and Path(data_dir).is_dir():
+        for path in sorted(Path(data_dir).glob("*.csv")):
+            digest = _sha256(path)
+            sources["files"][path.name] = digest
+            if path.name not in consumed:
+                frames.append(pd.read_csv(path))
+            elif consumed[path.name] != digest:
+                reason = reason or f"{path} changed since the last run"
+    if any(name not in sources["files"] for name in consumed):
+        reason = reason or f"Files of {data_dir} were removed since the last run"
+
+    return pd.concat(frames, ignore_index=True), sources, reason
+
+
+def encode_features(df: pd.DataFrame) -> tuple:
+    """
+    Encode raw rows with the fixed sex codes.
+
+    Rows with a missing value or an unknown sex are dropped.
+
+    Returns:
+        tuple: (features in FEATURE_COLUMNS order, target Series)
+    """
+    df = df.assign(Sex_encoded=df["Sex"].map({c: i for i, c in enumerate(SEX_CLASSES)}))
+    df = df.dropna(subset=FEATURE_COLUMNS + TARGET_COLUMN)
+    X = df[FEATURE_COLUMNS].astype({"Sex_encoded": np.int64})
+    return X.reset_index(drop=True), df[TARGET_COLUMN[0]].reset_index(drop=True)
+
+
+def drift_reference(df: pd.DataFrame) -> dict:
+    """Bin edges of each drift column, taken from the deciles of `df`."""
+    quantiles = np.linspace(0, 1, DRIFT_BINS + 1)[1:-1]
+    return {
+        column: np.unique(np.quantile(df[column], quantiles)).tolist()
+        for column in DRIFT_COLUMNS
+    }
+
+
+def bin_counts(df: pd.DataFrame, edges: dict) -> dict:
+    """Number of rows of `df` per drift bin, and per sex."""
+    counts = {
+        column: np.bincount(
+            np.searchsorted(edges[column], df[column], side="right"),
+            minlength=len(edges[column]) + 1,
+        ).tolist()
+        for column in DRIFT_COLUMNS
+    }
+    counts["Sex_encoded"] = np.bincount(
+        df["Sex_encoded"], minlength=len(SEX_CLASSES)
+    ).tolist()
+    return counts
+
+
+def population_stability(reference: dict, current: dict) -> dict:
+    """
+    Population Stability Index of each column between two sets of bin counts.
+
+    PSI = sum((p - q) * ln(p / q)) over bins; below 0.1 is usually read as
+    stable and above 0.25 as a major shift.
+    """
+    psi = {}
+    for column, ref_counts in reference.items():
+        q = np.asarray(ref_counts, dtype=np.float64)
+        p = np.asarray(current[column], dtype=np.float64)
+        q = np.maximum(q / q.sum(), PSI_EPSILON)
+        p = np.maximum(p / max(p.sum(), 1.0), PSI_EPSILON)
+        psi[column] = float(np.sum((p - q) * np.log(p / q)))
+    return psi
+
+
+def warm_start_update(model, X_new, y_new, extra_trees: int):
+    """
+    Fit `extra_trees` more trees on the new rows, keeping the existing ones.
+
+    Returns:
+        The same model, with `n_estimators` increased
+    """
+    if hasattr(model, "feature_names_in_"):
+        X_new = X_new[list(model.feature_names_in_)]
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + extra_trees)
+    model.fit(X_new, y_new)
+    model.set_params(warm_start=False)
+    return model
+
+
+def _full_state(X: pd.DataFrame, y: pd.Series, n_estimators: int) -> dict:
+    """Drift reference and row counts right after a full retrain."""
+    df = X.assign(**{TARGET_COLUMN[0]: y})
+    edges = drift_reference(df)
+    reference = bin_counts(df, edges)
+    return {
+        "n_rows": len(X),
+        "n_rows_at_full_retrain": len(X),
+        "n_estimators_at_full_retrain": n_estimators,
+        "drift_edges": edges,
+        "reference_counts": reference,
+        "new_counts": {
+            column: [0] * len(counts) for column, counts in reference.items()
+        },
+        "updates_since_full_retrain": 0,
+        "last_full_retrain": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def full_retrain(trainset_path: Path, data_dir: Path, savepath, params: dict) -> tuple:
+    """
+    Retrain from scratch on the main CSV and every file of the data directory.
+
+    Returns:
+        tuple: (model, held-out metrics, new state)
+    """
+    df, sources, _ = detect_new_data(trainset_path, data_dir, state=None)
+    X, y = encode_features(df)
+    X_train, X_test, y_train, y_test = splitting_data.fn(
+        X.assign(**{TARGET_COLUMN[0]: y})
+    )
+    model = train(
+        X_train,
+        y_train.to_numpy().ravel(),
+        X_test,
+        y_test,
+        savepath=str(savepath),
+        **params,
+    )
+    metrics = evaluate(model, X_test, y_test)
+    state = {
+        "version": STATE_VERSION,
+        "sources": sources,
+        "params": params,
+        **_full_state(X, y, params["n_estimators"]),
+    }
+    return model, metrics, state
+
+
+@flow(name="incremental-training")
+def incremental_training(
+    trainset_path: Path = Path("data/abalone.csv"),
+    data_dir: Path = Path("data/incoming"),
+    savepath="src/web_service/local_objects",
+    drift_threshold: float = 0.2,
+    min_drift_rows: int = 200,
+    min_extra_trees: int = 10,
+    max_estimators: int = 500,
+    params: dict = None,
+) -> dict:
+    """Update the saved model with the rows added since the last run.
+
+    New rows are found with the high-water mark stored next to the model (see
+    `detect_new_data`). They get extra trees through `warm_start`, in
+    proportion to their share of the data seen since the last full retrain
+    (at least `min_extra_trees`). Before fitting, the current model is scored
+    on them ("test-then-train"), which tells how well it was doing on unseen
+    data.
+
+    A full retrain happens instead when there is no previous run, the data
+    seen so far was rewritten, the forest would exceed `max_estimators` trees,
+    or the rows added since the last full retrain drifted: the largest
+    Population Stability Index over the features and target exceeds
+    `drift_threshold`. Drift is only checked once `min_drift_rows` rows have
+    accumulated, as the PSI of a handful of rows is mostly noise.
+
+    Args:
+        trainset_path: Main training CSV, appended to over time
+        data_dir: Directory of appended CSV files (optional)
+        savepath: Directory of the model and of the run state
+        drift_threshold: PSI above which the model is retrained from scratch
+        min_drift_rows: Accumulated new rows needed before checking drift
+        min_extra_trees: Minimum number of trees fitted on new rows
+        max_estimators: Forest size that forces a full retrain
+        params: Hyperparameters of a full retrain (default: those of the
+            current model, else the `train` defaults)
+
+    Returns:
+        Dictionary with the mode ("full", "incremental" or "skipped"), the
+        reason, the number of new rows, the number of trees, the drift per
+        column and metrics
+    """
+    start = time.perf_counter()
+    savepath = Path(savepath)
+    state = load_state(savepath)
+    model_path = savepath / "model.pkl"
+    model = None
+    if state is not None and model_path.exists():
+        with open(model_path, "rb") as f:
+            model = pkl.load(f)
+
+    def retrain(reason: str, drift: dict = None, new_rows: int = None) -> dict:
+        print(f"🔁 Full retrain: {reason}")
+        # Keep the hyperparameters of the current model (e.g. a search winner)
+        full_params = params or (state or {}).get("params")
+        if full_params is None and model is not None:
+            full_params = {key: model.get_params()[key] for key in BASE_PARAMS}
+        full_params = {**BASE_PARAMS, **(full_params or {})}
+        new_model, metrics, new_state = full_retrain(
+            trainset_path, data_dir, savepath, full_params
+        )
+        save_state(new_state, savepath)
+        return {
+            "mode": "full",
+            "reason": reason,
+            "new_rows": new_rows,
+            "n_rows": new_state["n_rows"],
+            "n_estimators": len(new_model.estimators_),
+            "drift": drift,
+            "metrics": metrics,
+            "model_path": str(model_path),
+            "seconds": time.perf_counter() - start,
+        }
+
+    if model is None:
+        return retrain("no previous incremental run")
+
+    df, sources, rewritten = detect_new_data(trainset_path, data_dir, state)
+    if rewritten:
+        return retrain(rewritten)
+
+    X_new, y_new = encode_features(df)
+    if len(X_new) == 0:
+        state["sources"] = sources
+        save_state(state, savepath)
+        print("✅ No new rows since the last run")
+        return {
+            "mode": "skipped",
+            "reason": "no new rows",
+            "new_rows": 0,
+            "n_rows": state["n_rows"],
+            "n_estimators": len(model.estimators_),
+            "drift": None,
+            "metrics": None,
+            "model_path": str(model_path),
+            "seconds": time.perf_counter() - start,
+        }
+
+    # Drift of everything added since the last full retrain
+    new = X_new.assign(**{TARGET_COLUMN[0]: y_new})
+    new_counts = {
+        column: (np.asarray(state["new_counts"][column]) + counts).tolist()
+        for column, counts in bin_counts(new, state["drift_edges"]).items()
+    }
+    accumulated = sum(new_counts["Sex_encoded"])
+    drift = population_stability(state["reference_counts"], new_counts)
+    if accumulated >= min_drift_rows and max(drift.values()) > drift_threshold:
+        column = max(drift, key=drift.get)
+        return retrain(
+            f"drift on {column} (PSI {drift[column]:.3f} > {drift_threshold})",
+            drift,
+            len(X_new),
+        )
+
+    extra_trees = max(
+        min_extra_trees,
+        round(
+            state["n_estimators_at_full_retrain"]
+            * len(X_new)
+            / state["n_rows_at_full_retrain"]
+        ),
+    )
+    if len(model.estimators_) + extra_trees > max_estimators:
+        return retrain(
+            f"the forest would exceed {max_estimators} trees", drift, len(X_new)
+        )
+
+    # Test-then-train: the current model has never seen these rows
+    columns = list(getattr(model, "feature_names_in_", X_new.columns))
+    mse = evaluate(model, X_new[columns], y_new)["mse"]
+    metrics = {"new_rows_mse_before_update": mse}
+
+    fit_start = time.perf_counter()
+    model = warm_start_update(model, X_new, y_new, extra_trees)
+    metrics["update_seconds"] = time.perf_counter() - fit_start
+    save_model(model, str(savepath))
+
+    state.update(
+        sources=sources,
+        n_rows=state["n_rows"] + len(X_new),
+        new_counts=new_counts,
+        updates_since_full_retrain=state["updates_since_full_retrain"] + 1,
+    )
+    save_state(state, savepath)
+    print(
+        f"🌱 {len(X_new)} new rows: {extra_trees} trees added "
+        f"({len(model.estimators_)} total), MSE before update {mse:.4f}"
+    )
+    return {
+        "mode": "incremental",
+        "reason": f"{len(X_new)} new rows",
+        "new_rows": len(X_new),
+        "n_rows": state["n_rows"],
+        "n_estimators": len(model.estimators_),
+        "drift": drift,
+        "metrics": metrics,
+        "model_path": str(model_path),
+        "seconds": time.perf_counter() - start,
+    }
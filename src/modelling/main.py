@@ -1,24 +1,93 @@
 # This module is the training flow: it reads the data, preprocesses it, trains a model and saves it.
 
 import argparse
+import os
+import time
+from contextlib import contextmanager
 from prefect import flow
 from src.modelling.preprocessing import prepare_data
-from src.modelling.training import train
+from src.modelling.search import SEARCH_MODES, search_hyperparameters
+from src.modelling.training import evaluate, save_model, train
 from pathlib import Path
 
 
+@contextmanager
+def timed(stage_seconds: dict, stage: str):
+    """Record the wall time of a block as `stage_seconds[stage]`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds[stage] = time.perf_counter() - start
+
+
 @flow(name="training-pipeline")
-def main(trainset_path: Path = Path("data/abalone.csv")) -> None:
-    """Train a model using the data at the given path and save the model (pickle)."""
+def main(
+    trainset_path: Path = Path("data/abalone.csv"),
+    search: str = None,
+    n_iter: int = 10,
+    workers: int = None,
+    halving_factor: int = 3,
+    halving_resource: str = "samples",
+    savepath: str = "src/web_service/local_objects",
+) -> dict:
+    """Train a model using the data at the given path and save the model (pickle).
+
+    With `search` ("grid", "random" or "halving"), candidate hyperparameters
+    are fitted in parallel and the best one on the held-out split is saved.
+    "halving" eliminates most candidates with cheap fits on a subsample
+    (`halving_resource="samples"`) or with fewer trees ("trees") first.
+
+    Returns:
+        Dictionary with the saved model path, the held-out metrics, the
+        number of training and test samples, the search summary (None
+        without search) and the duration of each stage
+    """
+    stage_seconds = {}
+    start = time.perf_counter()
+
     # Prepare data (subflow: load, encode, split)
     print("Preparing data...")
-    X_train, _, y_train, _ = prepare_data(trainset_path)
+    with timed(stage_seconds, "prepare_data"):
+        X_train, X_test, y_train, y_test = prepare_data(trainset_path)
     # (Optional) Pickle encoder if need be
 
-    # Train model
-    print("Training the model...")
-    train(X_train, y_train, savepath="src/web_service/local_objects")
-    # Pickle model --> The model should be saved in pkl format the `src/web_service/local_objects` folder
+    summary = None
+    if search:
+        print(f"Searching hyperparameters ({search})...")
+        with timed(stage_seconds, "search"):
+            rf, _, summary = search_hyperparameters(
+                X_train,
+                y_train,
+                X_test,
+                y_test,
+                mode=search,
+                n_iter=n_iter,
+                workers=workers,
+                factor=halving_factor,
+                resource=halving_resource,
+            )
+        with timed(stage_seconds, "save"):
+            model_path = save_model(rf, savepath)
+    else:
+        # Train model (and pickle it in the `savepath` folder)
+        print("Training the model...")
+        with timed(stage_seconds, "train"):
+            rf = train(X_train, y_train, savepath=savepath)
+        model_path = os.path.join(savepath, "model.pkl")
+
+    with timed(stage_seconds, "evaluate"):
+        metrics = evaluate(rf, X_test, y_test)
+
+    return {
+        "model_path": model_path,
+        "metrics": metrics,
+        "training_samples": len(X_train),
+        "test_samples": len(X_test),
+        "search": summary,
+        "stage_seconds": stage_seconds,
+        "total_seconds": time.perf_counter() - start,
+    }
 
 
 if __name__ == "__main__":
@@ -31,5 +100,48 @@ if __name__ == "__main__":
         default="data/abalone.csv",
         help="Path to the training set (default: data/abalone.csv)",
     )
+    parser.add_argument(
+        "--search",
+        choices=list(SEARCH_MODES),
+        default=None,
+        help="Search hyperparameters in parallel instead of training one model",
+    )
+    parser.add_argument(
+        "--n_iter",
+        type=int,
+        default=10,
+        help="Number of candidates in random search (default: 10)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes fitting candidates in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--halving_factor",
+        type=int,
+        default=3,
+        help=(
+            "Halving search: budget growth and elimination ratio per rung (default: 3)"
+        ),
+    )
+    parser.add_argument(
+        "--halving_resource",
+        choices=["samples", "trees"],
+        default="samples",
+        help="Halving search: budget cut down in early rungs (default: samples)",
+    )
     args = parser.parse_args()
-    main(Path(args.trainset_path))
+    result = main(
+        Path(args.trainset_path),
+        args.search,
+        args.n_iter,
+        args.workers,
+        args.halving_factor,
+        args.halving_resource,
+    )
+    stages = ", ".join(
+        f"{stage} {seconds:.1f}s" for stage, seconds in result["stage_seconds"].items()
+    )
+    print(f"Model saved to {result['model_path']} ({stages})")
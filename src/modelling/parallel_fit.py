@@ -0,0 +1,143 @@
+"""Worker side of parallel fits: shared training data and the per-candidate fit.
+
+Only imports what a worker needs, so spawned processes start fast.
+"""
+
+import os
+import pickle as pkl
+import time
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+
+# Training data of a search worker, attached once per process
+_worker_state = {}
+
+
+class SharedArrays:
+    """
+    NumPy arrays copied once into a single shared-memory block.
+
+    Worker processes attach to the block by name and get zero-copy views, so
+    the data is neither pickled per task nor duplicated per process.
+    """
+
+    ALIGNMENT = 64
+
+    def __init__(self, arrays: dict):
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[name] = (offset, array.shape, array.dtype.str)
+            offset += -(-array.nbytes // self.ALIGNMENT) * self.ALIGNMENT
+
+        self._shm = SharedMemory(create=True, size=max(offset, 1))
+        for name, array in arrays.items():
+            self._view(self._shm, layout[name])[...] = array
+        self.spec = {"name": self._shm.name, "layout": layout}
+
+    @staticmethod
+    def _view(shm: SharedMemory, entry) -> np.ndarray:
+        offset, shape, dtype = entry
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+    @classmethod
+    def attach(cls, spec: dict) -> tuple:
+        """
+        Attach to the block described by `spec` from another process.
+
+        Returns:
+            tuple: (SharedMemory handle to keep alive, dict of read-only arrays)
+        """
+        # Spawned workers share the creator's resource tracker, which unlinks
+        # the block if the creator dies without closing it
+        shm = SharedMemory(name=spec["name"])
+
+        arrays = {}
+        for name, entry in spec["layout"].items():
+            arrays[name] = cls._view(shm, entry)
+            arrays[name].flags.writeable = False
+        return shm, arrays
+
+    def close(self):
+        """Release and destroy the block."""
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def init_worker(spec: dict, feature_names: list, model_dir: str):
+    """Attach to the search's shared data, once per worker process."""
+    shm, arrays = SharedArrays.attach(spec)
+    _worker_state["shm"] = shm
+    _worker_state["model_dir"] = model_dir
+    # Fit on DataFrames like `train`, so models keep their feature names
+    _worker_state["X_train"] = pd.DataFrame(
+        arrays["X_train"], columns=feature_names, copy=False
+    )
+    _worker_state["X_test"] = pd.DataFrame(
+        arrays["X_test"], columns=feature_names, copy=False
+    )
+    _worker_state["y_train"] = arrays["y_train"]
+    _worker_state["y_test"] = arrays["y_test"]
+    # Fixed shuffle of the training rows, whose prefixes are the subsamples
+    _worker_state["sample_order"] = arrays.get("sample_order")
+
+
+def fit_candidate(
+    index: int, params: dict, n_samples: int = None, save_model: bool = True
+) -> dict:
+    """
+    Fit and evaluate one candidate on the worker's shared data.
+
+    The fitted model is pickled to the search's temporary directory so only
+    the winner has to be loaded back.
+
+    Args:
+        index: Position of the candidate in the search
+        params: RandomForestRegressor parameters
+        n_samples: Fit on this many shuffled training rows (None: all of them,
+            in their original order)
+        save_model: Pickle the fitted model (skipped for eliminatory fits)
+    """
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    X_train, y_train = _worker_state["X_train"], _worker_state["y_train"]
+    if n_samples is not None and n_samples < len(y_train):
+        rows = _worker_state["sample_order"][:n_samples]
+        X_train, y_train = X_train.iloc[rows], y_train[rows]
+
+    rf = RandomForestRegressor(**params, n_jobs=1)
+    rf.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    y_pred = rf.predict(_worker_state["X_test"])
+    mse = mean_squared_error(_worker_state["y_test"], y_pred)
+
+    model_path = None
+    if save_model:
+        model_path = os.path.join(_worker_state["model_dir"], f"candidate-{index}.pkl")
+        with open(model_path, "wb") as f:
+            pkl.dump(rf, f)
+
+    return {
+        "index": index,
+        "params": params,
+        "n_samples": len(y_train),
+        "mse": float(mse),
+        "rmse": float(np.sqrt(mse)),
+        "r2_score": float(r2_score(_worker_state["y_test"], y_pred)),
+        "fit_seconds": fit_seconds,
+        "wall_seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "model_path": model_path,
+    }
@@ -1,11 +1,254 @@
+"""Scoring with a trained model, from Python or as an offline bulk command."""
+
+import argparse
+import os
 import pickle as pkl
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.web_service.app_config import config
+from src.modelling.dataset import DTYPES
+from src.web_service.preprocessing import load_label_encoder, sex_code_table
+
+# Model and encoder of a scoring worker, loaded once per process
+_worker_state = {}
+
+# Every CSV chunk is parsed with the same dtypes, so that they all match the
+# output schema (taken from the first chunk): Sex stays a plain string, Rings is
+# nullable since rows to score may have no label, other columns are strings.
+CSV_DTYPES = {**DTYPES, "Sex": "str", "Rings": "Int16"}
+
+
+def load_model(savepath):
+    """Unpickle a model from a file, or from `model.pkl` in a directory."""
+    savepath = Path(savepath)
+    if savepath.is_dir():
+        savepath = savepath / "model.pkl"
+    with open(savepath, "rb") as f:
+        return pkl.load(f)
 
 
 def predict(X, model=None, savepath=None):
     if model:
         return model.predict(X)
     elif savepath:
-        model = pkl.load(savepath)
+        model = load_model(savepath)
         return model.predict(X)
     else:
         raise ValueError("Please specify a model to make a prediciton")
+
+
+def iter_chunks(path: Path, chunk_size: int):
+    """Yield DataFrames of at most `chunk_size` rows from a CSV or Parquet file."""
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        dtypes = defaultdict(lambda: "str", CSV_DTYPES)
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtypes)
+
+
+def features_from_frame(df: pd.DataFrame, label_encoder) -> tuple:
+    """
+    Build the feature matrix of raw data rows, encoded like the web service.
+
+    Columns are taken in `config.feature_columns` order; Sex goes through the
+    fitted label encoder. Rows with a missing value or an unknown sex are left
+    out.
+
+    Returns:
+        tuple: (feature matrix of the valid rows, boolean mask of valid rows)
+    """
+    codes = df["Sex"].astype(str).map(sex_code_table(label_encoder))
+    X = np.empty((len(df), len(config.feature_columns)), dtype=np.float64)
+    for j, column in enumerate(config.feature_columns):
+        values = codes if column == "Sex_encoded" else df[column]
+        X[:, j] = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+    valid = ~np.isnan(X).any(axis=1)
+    return X[valid], valid
+
+
+def score_frame(df: pd.DataFrame, model=None, label_encoder=None) -> pd.DataFrame:
+    """
+    Append predicted_rings and predicted_age (unrounded) to a chunk of raw data.
+
+    Rows that can't be scored get null predictions. Without a model or encoder,
+    the ones loaded by `_init_worker` are used.
+    """
+    model = model if model is not None else _worker_state["model"]
+    if label_encoder is None:
+        label_encoder = _worker_state["label_encoder"]
+
+    X, valid = features_from_frame(df, label_encoder)
+    rings = np.full(len(df), np.nan)
+    if valid.any():
+        rings[valid] = predict(X, model)
+
+    df = df.copy()
+    df["predicted_rings"] = rings
+    df["predicted_age"] = rings + 1.5
+    return df
+
+
+def _init_worker(model_path, encoder_path, single_threaded=True):
+    """Load the model and encoder once per scoring process."""
+    model = load_model(model_path)
+    # In a pool, parallelism comes from the processes: one thread per worker
+    if single_threaded and hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    _worker_state["model"] = model
+    _worker_state["label_encoder"] = load_label_encoder(encoder_path)
+
+
+def peak_memory_mb() -> dict:
+    """Peak resident memory of this process and of its largest finished child."""
+    import resource  # Unix only
+
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes vs KiB
+    return {
+        "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "worker": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def score_file(
+    input_path,
+    output_path,
+    model_path=None,
+    encoder_path=None,
+    chunk_size: int = 100_000,
+    workers: int = None,
+) -> dict:
+    """
+    Score a CSV or Parquet file of any size into a Parquet file.
+
+    The input is read chunk by chunk and chunks are scored in a process pool.
+    At most two chunks per worker are in flight, and results are appended to
+    the output in input order as soon as they are ready, so memory stays flat
+    whatever the file size.
+
+    Args:
+        input_path: CSV or Parquet file with the raw columns (Sex, Length, ...)
+        output_path: Parquet file to write, input columns plus predictions
+        model_path: Pickled model, or a directory holding model.pkl
+        encoder_path: Pickled label encoder
+        chunk_size: Number of rows per chunk
+        workers: Number of scoring processes (1 scores in this process)
+
+    Returns:
+        Dictionary with the number of rows, rows left unscored, duration,
+        throughput and peak memory
+    """
+    model_path = Path(model_path or config.model_path)
+    encoder_path = Path(encoder_path or config.encoder_path)
+    workers = workers or os.cpu_count()
+
+    start = time.perf_counter()
+    rows = 0
+    unscored = 0
+    writer = None
+
+    def write(scored: pd.DataFrame):
+        nonlocal rows, unscored, writer
+        table = pa.Table.from_pandas(scored, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        rows += len(scored)
+        unscored += int(scored["predicted_rings"].isna().sum())
+
+    try:
+        if workers == 1:
+            _init_worker(model_path, encoder_path, single_threaded=False)
+            for chunk in iter_chunks(input_path, chunk_size):
+                write(score_frame(chunk))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_path, encoder_path),
+            ) as pool:
+                pending = deque()
+                for chunk in iter_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(score_frame, chunk))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    except BaseException:
+        # Don't leave a truncated output behind
+        if writer is not None:
+            writer.close()
+            Path(output_path).unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "unscored_rows": unscored,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score a CSV or Parquet file with the trained model."
+    )
+    parser.add_argument("input_path", type=str, help="CSV or Parquet file to score")
+    parser.add_argument("output_path", type=str, help="Parquet file to write")
+    parser.add_argument(
+        "--model_path",
+        type=str,
+        default=str(config.model_path),
+        help=(
+            "Pickled model or directory holding model.pkl "
+            f"(default: {config.model_path})"
+        ),
+    )
+    parser.add_argument(
+        "--encoder_path",
+        type=str,
+        default=str(config.encoder_path),
+        help=f"Pickled label encoder (default: {config.encoder_path})",
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=100_000, help="Rows per chunk"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Scoring processes (default: CPU count, 1 scores in-process)",
+    )
+    args = parser.parse_args()
+
+    stats = score_file(
+        args.input_path,
+        args.output_path,
+        model_path=args.model_path,
+        encoder_path=args.encoder_path,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+    print(
+        f"Scored {stats['rows']} rows ({stats['unscored_rows']} unscored) "
+        f"in {stats['seconds']:.1f}s: {stats['rows_per_second']:.0f} rows/s"
+    )
+    print(
+        f"Peak memory: {stats['peak_memory_mb']['main']:.0f} MB (main), "
+        f"{stats['peak_memory_mb']['worker']:.0f} MB (largest worker)"
+    )
@@ -3,6 +3,7 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from prefect import flow, task
 from pathlib import Path
+from .cache import cached_stage, input_key, preprocessing_cache
 from .utils import load_data
 
 FEATURE_COLUMNS = [
@@ -19,6 +20,7 @@ TARGET_COLUMN = ["Rings"]
 
 
 @task
+@cached_stage
 def encode_sex(df: pd.DataFrame) -> pd.DataFrame:
     label_encoder = LabelEncoder()
     df["Sex_encoded"] = label_encoder.fit_transform(df["Sex"])
@@ -26,6 +28,7 @@ def encode_sex(df: pd.DataFrame) -> pd.DataFrame:
 
 
 @task
+@cached_stage
 def splitting_data(df: pd.DataFrame) -> pd.DataFrame:
     y = df[TARGET_COLUMN]
     X = df.drop(TARGET_COLUMN, axis=1)
@@ -39,11 +42,26 @@ def splitting_data(df: pd.DataFrame) -> pd.DataFrame:
 
 @flow(name="prepare-data")
 def prepare_data(trainset_path: Path):
-    """Prepare data subflow: load, encode, and split data."""
+    """Prepare data subflow: load, encode, and split data.
+
+    The splits are cached on disk under the digest of the file and of the
+    preprocessing code: when neither changed, they are read back and none of
+    the stages runs.
+    """
+    key = None
+    if preprocessing_cache.enabled:
+        key = preprocessing_cache.key("prepare_data", input_key(trainset_path))
+        splits = preprocessing_cache.get(key)
+        if splits is not None:
+            print("Using cached splits")
+            return splits
+
     # Load data
     df = load_data(trainset_path)
     # Encode sex column
     df = encode_sex(df)
     # Split data
     X_train, X_test, y_train, y_test = splitting_data(df)
+    if key is not None:
+        preprocessing_cache.put(key, (X_train, X_test, y_train, y_test))
     return X_train, X_test, y_train, y_test
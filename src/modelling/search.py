@@ -0,0 +1,402 @@
+"""Parallel Random Forest hyperparameter search.
+
+Candidate fits run in a process pool over shared-memory training data.
+"""
+
+import math
+import multiprocessing
+import os
+import pickle as pkl
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import mlflow
+import mlflow.sklearn
+import numpy as np
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
+from prefect import task
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from .parallel_fit import SharedArrays, fit_candidate, init_worker
+
+# Defaults of `train`, overridden by each candidate
+BASE_PARAMS = {
+    "n_estimators": 100,
+    "max_depth": 20,
+    "min_samples_split": 5,
+    "min_samples_leaf": 2,
+    "random_state": 42,
+}
+
+DEFAULT_PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [10, 20, None],
+    "min_samples_split": [2, 5],
+    "min_samples_leaf": [1, 2],
+}
+
+SEARCH_MODES = ("grid", "random", "halving")
+
+# MLflow accepts at most this many metrics per log_batch call
+MLFLOW_BATCH_METRICS = 1000
+
+
+def make_candidates(
+    mode: str = "grid",
+    param_grid: dict = None,
+    n_iter: int = 10,
+    random_state=42,
+    base_params: dict = None,
+) -> list:
+    """
+    List the hyperparameter sets to try.
+
+    Args:
+        mode: "grid" for every combination, "random" for `n_iter` samples,
+            "halving" for every combination (eliminated by `successive_halving`)
+        param_grid: Values to try per hyperparameter (DEFAULT_PARAM_GRID if None)
+        n_iter: Number of candidates in random mode
+        random_state: Seed of the random sampling
+        base_params: Values of the hyperparameters not searched (BASE_PARAMS if None)
+
+    Returns:
+        List of full parameter dicts (base parameters overridden by the candidate)
+    """
+    param_grid = param_grid or DEFAULT_PARAM_GRID
+    if mode in ("grid", "halving"):
+        sampled = ParameterGrid(param_grid)
+    elif mode == "random":
+        sampled = ParameterSampler(param_grid, n_iter=n_iter, random_state=random_state)
+    else:
+        raise ValueError(
+            f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}"
+        )
+    return [{**(base_params or BASE_PARAMS), **params} for params in sampled]
+
+
+@contextmanager
+def _fit_pool(X_train, y_train, X_test, y_test, workers: int, sample_order=None):
+    """
+    Start a process pool whose workers share the search data.
+
+    The arrays are placed in shared memory once; each worker attaches to it
+    when it starts. Fitted models go to a temporary directory removed on exit.
+    """
+    feature_names = list(X_train.columns) if hasattr(X_train, "columns") else None
+    arrays = {
+        "X_train": np.asarray(X_train, dtype=np.float64),
+        "y_train": np.asarray(y_train, dtype=np.float64).ravel(),
+        "X_test": np.asarray(X_test, dtype=np.float64),
+        "y_test": np.asarray(y_test, dtype=np.float64).ravel(),
+    }
+    if sample_order is not None:
+        arrays["sample_order"] = sample_order
+
+    with (
+        SharedArrays(arrays) as shared,
+        tempfile.TemporaryDirectory() as model_dir,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(shared.spec, feature_names, model_dir),
+        ) as pool,
+    ):
+        yield pool
+
+
+def _load_model(path: str):
+    with open(path, "rb") as f:
+        return pkl.load(f)
+
+
+def run_search(
+    X_train, y_train, X_test, y_test, candidates: list, workers: int = None
+) -> tuple:
+    """
+    Fit every candidate in a process pool and pick the best on the test split.
+
+    Candidates are submitted largest forest first so the longest fits don't
+    end up last.
+
+    Args:
+        X_train, y_train, X_test, y_test: The splits from `splitting_data`
+        candidates: Parameter dicts, see `make_candidates`
+        workers: Number of processes (default: CPU count)
+
+    Returns:
+        tuple: (best fitted model, list of per-candidate results sorted by mse)
+    """
+    workers = min(workers or os.cpu_count(), len(candidates))
+    order = sorted(range(len(candidates)), key=lambda i: -candidates[i]["n_estimators"])
+
+    with _fit_pool(X_train, y_train, X_test, y_test, workers) as pool:
+        futures = [pool.submit(fit_candidate, i, candidates[i]) for i in order]
+        results = sorted((f.result() for f in futures), key=lambda r: r["mse"])
+        best_model = _load_model(results[0]["model_path"])
+
+    for result in results:
+        del result["model_path"]
+    return best_model, results
+
+
+def halving_rungs(
+    n_candidates: int, n_train: int, factor: int = 3, min_samples: int = 100
+) -> list:
+    """
+    Budget of each rung of a successive-halving search, as a fraction of a full fit.
+
+    There are enough rungs for about `factor` candidates to reach the last one,
+    which is always a full fit; each rung has `factor` times the budget of the
+    previous one. With a sample budget, rungs are dropped so the first one
+    still fits on at least `min_samples` rows.
+    """
+    n_rungs = 1
+    while factor**n_rungs <= n_candidates:
+        n_rungs += 1
+    while n_rungs > 1 and n_train / factor ** (n_rungs - 1) < min_samples:
+        n_rungs -= 1
+    return [factor ** (rung - n_rungs + 1) for rung in range(n_rungs)]
+
+
+def successive_halving(
+    X_train,
+    y_train,
+    X_test,
+    y_test,
+    candidates: list,
+    factor: int = 3,
+    resource: str = "samples",
+    min_samples: int = 100,
+    workers: int = None,
+    random_state: int = 42,
+) -> tuple:
+    """
+    Search with successive halving: cheap fits eliminate candidates before full fits.
+
+    Every candidate is first fitted with a small budget, a fraction of the
+    training rows ("samples", taken from one fixed shuffle) or of its trees
+    ("trees"). Only the best 1/`factor` on the test split move on to the next
+    rung, which has `factor` times the budget. The last rung fits the
+    survivors exactly like `run_search` would, and the best of them wins.
+
+    The exhaustive grid is never run, so its cost is estimated as every
+    candidate costing what a finalist did at full budget. On small grids the
+    early rungs can cost more than they save: the CPU time saved is then 0.
+
+    Args:
+        X_train, y_train, X_test, y_test: The splits from `splitting_data`
+        candidates: Parameter dicts, see `make_candidates`
+        factor: Budget multiplier between rungs and elimination ratio
+        resource: "samples" or "trees", the budget cut down in early rungs
+        min_samples: Minimum number of rows of a "samples" fit
+        workers: Number of processes (default: CPU count)
+        random_state: Seed of the row shuffle
+
+    Returns:
+        tuple: (best fitted model, results of the last rung sorted by mse,
+            summary with every rung, the CPU time spent and the estimated
+            CPU time of the exhaustive grid)
+    """
+    if resource not in ("samples", "trees"):
+        raise ValueError(
+            f"Unknown resource {resource!r}, expected 'samples' or 'trees'"
+        )
+    if factor < 2:
+        raise ValueError("factor must be at least 2")
+
+    n_train = len(y_train)
+    if resource == "samples":
+        rungs = halving_rungs(len(candidates), n_train, factor, min_samples)
+    else:
+        rungs = halving_rungs(len(candidates), n_train, factor, min_samples=0)
+    sample_order = np.random.default_rng(random_state).permutation(n_train)
+    workers = min(workers or os.cpu_count(), len(candidates))
+
+    def budget(params: dict, fraction: float) -> tuple:
+        """Parameters and number of rows of a fit with a fraction of the budget."""
+        if fraction == 1:
+            return params, None
+        if resource == "trees":
+            n_estimators = max(1, round(params["n_estimators"] * fraction))
+            return {**params, "n_estimators": n_estimators}, None
+        return params, max(1, round(n_train * fraction))
+
+    survivors = list(range(len(candidates)))
+    history = []
+    summary_rungs = []
+    with _fit_pool(
+        X_train, y_train, X_test, y_test, workers, sample_order.astype(np.int64)
+    ) as pool:
+        for rung, fraction in enumerate(rungs):
+            last = rung == len(rungs) - 1
+            fits = {i: budget(candidates[i], fraction) for i in survivors}
+            order = sorted(survivors, key=lambda i: -fits[i][0]["n_estimators"])
+            futures = [
+                pool.submit(fit_candidate, i, fits[i][0], fits[i][1], save_model=last)
+                for i in order
+            ]
+            results = sorted((f.result() for f in futures), key=lambda r: r["mse"])
+            for result in results:
+                result["rung"] = rung
+            history.extend(results)
+            summary_rungs.append(
+                {
+                    "rung": rung,
+                    "budget": fraction,
+                    "n_candidates": len(results),
+                    "cpu_seconds": sum(r["cpu_seconds"] for r in results),
+                    "best_mse": results[0]["mse"],
+                }
+            )
+            if not last:
+                keep = max(1, math.ceil(len(results) / factor))
+                survivors = [r["index"] for r in results[:keep]]
+
+        best_model = _load_model(results[0]["model_path"])
+
+    full_cpu_seconds = sum(r["cpu_seconds"] for r in results)
+    exhaustive_cpu_seconds = full_cpu_seconds / len(results) * len(candidates)
+    cpu_seconds = sum(r["cpu_seconds"] for r in history)
+
+    for result in history:
+        result.pop("model_path", None)
+    summary = {
+        "resource": resource,
+        "factor": factor,
+        "n_candidates": len(candidates),
+        "n_fits": len(history),
+        "rungs": summary_rungs,
+        "cpu_seconds": cpu_seconds,
+        "estimated_exhaustive_cpu_seconds": exhaustive_cpu_seconds,
+        "cpu_seconds_saved": max(0.0, exhaustive_cpu_seconds - cpu_seconds),
+        "history": history,
+    }
+    return best_model, results, summary
+
+
+def log_search_to_mlflow(
+    results: list, best_model, mode: str, total_seconds: float, summary: dict = None
+):
+    """
+    Log a whole search as one MLflow run.
+
+    Per-candidate metrics are sent with `log_batch` (step = candidate index)
+    instead of one request per value; the full table is attached as
+    search_results.json and the best model is logged as "model". For a
+    successive-halving search, `results` is its last rung and the CPU time
+    figures of `summary` are logged as metrics.
+    """
+    mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000"))
+    best = results[0]
+
+    with mlflow.start_run(run_name="abalone-hyperparameter-search") as run:
+        mlflow.log_params(
+            {
+                "search_mode": mode,
+                "n_candidates": len(results),
+                **{f"best_{key}": value for key, value in best["params"].items()},
+            }
+        )
+
+        timestamp = int(time.time() * 1000)
+        metrics = [
+            Metric(key, result[key], timestamp, result["index"])
+            for result in results
+            for key in ("mse", "rmse", "r2_score", "fit_seconds", "wall_seconds")
+        ]
+        metrics += [
+            Metric(f"best_{key}", best[key], timestamp, 0)
+            for key in ("mse", "rmse", "r2_score")
+        ]
+        metrics.append(Metric("search_seconds", total_seconds, timestamp, 0))
+        for key in (
+            "cpu_seconds",
+            "estimated_exhaustive_cpu_seconds",
+            "cpu_seconds_saved",
+        ):
+            if summary and key in summary:
+                metrics.append(Metric(key, summary[key], timestamp, 0))
+
+        client = MlflowClient()
+        for start in range(0, len(metrics), MLFLOW_BATCH_METRICS):
+            client.log_batch(
+                run.info.run_id, metrics=metrics[start : start + MLFLOW_BATCH_METRICS]
+            )
+
+        mlflow.log_dict(
+            {"candidates": results, **(summary or {})}, "search_results.json"
+        )
+        mlflow.sklearn.log_model(best_model, "model")
+
+
+@task
+def search_hyperparameters(
+    X_train,
+    y_train,
+    X_test,
+    y_test,
+    mode: str = "grid",
+    param_grid: dict = None,
+    n_iter: int = 10,
+    workers: int = None,
+    log_to_mlflow: bool = True,
+    factor: int = 3,
+    resource: str = "samples",
+):
+    """
+    Run a grid, random or successive-halving search.
+
+    Returns:
+        tuple: (best model, results sorted by mse, summary with the number of
+            fits and the time spent; for "halving", also the rungs and the
+            CPU time saved against the exhaustive grid)
+    """
+    candidates = make_candidates(mode, param_grid, n_iter)
+
+    start = time.perf_counter()
+    if mode == "halving":
+        best_model, results, summary = successive_halving(
+            X_train,
+            y_train,
+            X_test,
+            y_test,
+            candidates,
+            factor,
+            resource,
+            workers=workers,
+        )
+    else:
+        best_model, results = run_search(
+            X_train, y_train, X_test, y_test, candidates, workers
+        )
+        summary = {
+            "n_candidates": len(candidates),
+            "n_fits": len(results),
+            "cpu_seconds": sum(r["cpu_seconds"] for r in results),
+        }
+    total_seconds = time.perf_counter() - start
+    summary = {"mode": mode, "seconds": total_seconds, **summary}
+
+    best = results[0]
+    print(
+        f"🔎 {len(candidates)} candidates in {total_seconds:.1f}s - best MSE "
+        f"{best['mse']:.4f} with {best['params']}"
+    )
+    if mode == "halving":
+        print(
+            f"⏱️ {summary['n_fits']} fits over {len(summary['rungs'])} rungs used "
+            f"{summary['cpu_seconds']:.1f} CPU-s, about "
+            f"{summary['cpu_seconds_saved']:.1f} CPU-s less than the exhaustive "
+            f"grid ({summary['estimated_exhaustive_cpu_seconds']:.1f} CPU-s)"
+        )
+    if log_to_mlflow:
+        log_search_to_mlflow(
+            results,
+            best_model,
+            mode,
+            total_seconds,
+            summary if mode == "halving" else None,
+        )
+    return best_model, results, summary
@@ -1,5 +1,6 @@
 from sklearn.ensemble import RandomForestRegressor
 from .utils import pickle_object
+from .compiled_forest import export_compiled_forest
 from prefect import task
 import os
 import mlflow
@@ -8,6 +9,26 @@ from sklearn.metrics import mean_squared_error, r2_score
 import numpy as np
 
 
+def save_model(rf, savepath):
+    """Pickle the model to `savepath`/model.pkl and export its compiled form."""
+    model_path = os.path.join(savepath, "model.pkl")
+    pickle_object(rf, model_path)
+    # Flat array form of the forest, for the compiled serving backend
+    export_compiled_forest(rf, model_path, os.path.join(savepath, "compiled_forest"))
+    return model_path
+
+
+def evaluate(rf, X_test, y_test) -> dict:
+    """Metrics of a model on the held-out split."""
+    y_pred = rf.predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+    return {
+        "mse": float(mse),
+        "rmse": float(np.sqrt(mse)),
+        "r2_score": float(r2_score(y_test, y_pred)),
+    }
+
+
 @task
 def train(
     X,
@@ -55,18 +76,16 @@ def train(
 
         # Evaluate and log metrics if test data provided
         if X_test is not None and y_test is not None:
-            y_pred = rf.predict(X_test)
-            mse = mean_squared_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
-
-            mlflow.log_metrics({"mse": mse, "rmse": np.sqrt(mse), "r2_score": r2})
+            metrics = evaluate(rf, X_test, y_test)
+            mlflow.log_metrics(metrics)
 
             print(
-                f"📊 Model metrics - MSE: {mse:.4f}, RMSE: {np.sqrt(mse):.4f}, R²: {r2:.4f}"
+                f"📊 Model metrics - MSE: {metrics['mse']:.4f}, "
+                f"RMSE: {metrics['rmse']:.4f}, R²: {metrics['r2_score']:.4f}"
             )
 
         # Save model locally if path provided
         if savepath:
-            pickle_object(rf, os.path.join(savepath, "model.pkl"))
+            save_model(rf, savepath)
 
         return rf
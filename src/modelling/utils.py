@@ -1,6 +1,6 @@
 import pickle as pkl
-import pandas as pd
 from prefect import task
+from .dataset import load_dataset
 
 TRAINSET_PATH = "data/abalone.csv"
 
@@ -20,5 +20,7 @@ def pickle_object(obj, filepath):
 
 @task
 def load_data(datapath):
-    df = pd.read_csv(datapath)
+    # Typed columnar copy of the CSV, parsed again only when the file changes.
+    # Not a cached_stage: that copy already is the cache of the raw data.
+    df = load_dataset(datapath)
     return df
@@ -1,6 +1,7 @@
 """Configuration for the FastAPI application."""
 
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -15,6 +16,12 @@ class AppConfig(BaseSettings):
 
     # Model paths
     model_path: Path = Path("src/web_service/local_objects/model.pkl")
+    encoder_path: Path = Path("src/web_service/local_objects/label_encoder.pkl")
+    compiled_model_path: Path = Path("src/web_service/local_objects/compiled_forest")
+
+    # Serving backend: the pickled sklearn forest, or its flat compiled form
+    # (much lower per-call overhead, best for small batches)
+    model_backend: Literal["sklearn", "compiled"] = "sklearn"
 
     # Data paths
     data_path: Path = Path("data/abalone.csv")
@@ -33,6 +40,45 @@ class AppConfig(BaseSettings):
 
     target_column: str = "Rings"
 
+    # Startup: load the model and encoder, then run synthetic warm-up
+    # predictions of each batch size (model.predict on every load, and the full
+    # request path through every inference worker) before reporting ready
+    preload_model: bool = True
+    warm_up_batch_sizes: list[int] = [1, 8, 64, 512]
+
+    # Executors for CPU-bound work: "thread" or "process" pools
+    inference_executor_kind: Literal["thread", "process"] = "thread"
+    inference_max_workers: int = 4
+    training_executor_kind: Literal["thread", "process"] = "process"
+    training_max_workers: int = 1  # Also the cap on concurrent training jobs
+
+    # Opt-in micro-batching: concurrent /predict calls share one model.predict
+    micro_batching_enabled: bool = False
+    micro_batch_max_size: int = 64
+    micro_batch_max_wait_ms: float = 2.0
+
+    # Prediction cache: repeated feature vectors (quantized to
+    # `prediction_cache_decimals`) are answered without calling the model.
+    # Entries are keyed by model version and dropped when a new model is published
+    prediction_cache_enabled: bool = True
+    prediction_cache_max_entries: int = 10_000
+    prediction_cache_ttl_seconds: float = 300.0  # 0 disables expiry
+    prediction_cache_decimals: int = 6
+
+    # /predict/stream: rows scored per vectorized call, and the longest accepted
+    # line (bounds the memory held for a line that never ends)
+    stream_chunk_size: int = 4096
+    stream_max_line_bytes: int = 65536
+
+    # Sampling profiler of inference jobs (thread pool only): "header" profiles
+    # requests sent with `X-Profile: 1`, "all" every request. Folded stacks are
+    # served by GET /admin/profile. "off" adds nothing to the request path
+    profiling: Literal["off", "header", "all"] = "off"
+    profiling_interval_ms: float = 1.0
+
+    # Number of finished training jobs kept for GET /train/{job_id}
+    training_jobs_history: int = 100
+
     # Sex encoding mapping
     sex_mapping: dict = {"M": 0, "F": 1, "I": 2}  # Male, Female, Infant
 
@@ -0,0 +1,126 @@
+"""Micro-batching of concurrent single-sample predictions."""
+
+import asyncio
+import contextvars
+import numpy as np
+from .app_config import config
+from .executor import WorkerPool, inference_pool
+from .inference import predict_matrix
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one vectorized predict.
+
+    Requests enqueue a prepared (1, n_features) row and await a future. A
+    collector task takes the first waiting row, then keeps collecting for at
+    most `max_wait_ms` or until `max_batch_size` rows are waiting, and hands the
+    stacked matrix to the inference pool in a single `predict` call. Rows are
+    grouped by model, so a batch straddling a model publish is still served
+    consistently.
+    """
+
+    def __init__(self, pool: WorkerPool, max_batch_size: int, max_wait_ms: float):
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+        self._queue: asyncio.Queue | None = None
+        self._collector: asyncio.Task | None = None
+        self._dispatches: set[asyncio.Task] = set()
+
+    async def predict(self, row: np.ndarray, model=None, model_version=None) -> tuple:
+        """Predict one prepared row as part of the next batch.
+
+        Args:
+            row: Feature row of shape (1, n_features)
+            model: Model to predict with (None: the worker's registry)
+            model_version: Version of `model`
+
+        Returns:
+            tuple: (predicted rings, model version)
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, model, model_version, future))
+        return await future
+
+    def stats(self) -> dict:
+        """Snapshot of the batching counters."""
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+        }
+
+    def stop(self):
+        """Cancel the collector (it is restarted on next use)."""
+        if self._collector is not None:
+            self._collector.cancel()
+        self._collector = None
+        self._queue = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._collector is None or self._collector.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            # In an empty context: the collector outlives the request starting it
+            self._collector = contextvars.Context().run(
+                loop.create_task, self._collect()
+            )
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without waiting so the next batch can start collecting
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: list):
+        groups = {}
+        for item in batch:
+            groups.setdefault((id(item[1]), item[2]), []).append(item)
+
+        for items in groups.values():
+            _, model, model_version, _ = items[0]
+            X = np.vstack([item[0] for item in items])
+            try:
+                predicted, served_version = await self.pool.run(
+                    predict_matrix, X, model, model_version
+                )
+            except Exception as e:
+                for *_, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+            for rings, (*_, future) in zip(predicted, items):
+                if not future.done():
+                    future.set_result((rings, served_version))
+
+
+micro_batcher = MicroBatcher(
+    inference_pool, config.micro_batch_max_size, config.micro_batch_max_wait_ms
+)
@@ -0,0 +1,177 @@
+"""Columnar (Arrow IPC / Parquet) batch prediction.
+
+Request columns are looked up with the same mapping as the rest of the
+service: each entry of `config.feature_columns` is found under its training
+name (e.g. "Whole weight") or its API field name (e.g. "whole_weight"). Sex
+may be given as labels ("Sex"/"sex", plain or dictionary-encoded strings) or
+already encoded ("Sex_encoded"). Other columns are ignored.
+
+Numeric columns are viewed as NumPy arrays without copying when they are
+float64, null-free and in one chunk; the only copy is the assembly of the
+feature matrix handed to the model.
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from .app_config import config
+from .inference import FEATURE_FIELDS, predict_matrix
+from .metrics import count_rows, stage
+from .preprocessing import load_label_encoder
+
+MEDIA_TYPES = {
+    "application/vnd.apache.arrow.stream": "arrow_stream",
+    "application/vnd.apache.arrow.file": "arrow_file",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+RESPONSE_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def columnar_format(content_type: str) -> str | None:
+    """Map a request Content-Type to a columnar format (None if unsupported)."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return MEDIA_TYPES.get(media_type)
+
+
+def read_table(body: bytes, fmt: str) -> pa.Table:
+    """Read an Arrow IPC stream, Arrow IPC file or Parquet body without copying it.
+
+    Raises:
+        ValueError: If the body can't be read in the given format
+    """
+    buffer = pa.py_buffer(body)
+    try:
+        if fmt == "arrow_stream":
+            return ipc.open_stream(buffer).read_all()
+        if fmt == "arrow_file":
+            return ipc.open_file(buffer).read_all()
+        return pq.read_table(pa.BufferReader(buffer))
+    except pa.ArrowException as e:
+        raise ValueError(f"Could not read {fmt} body: {e}") from e
+
+
+def _find_column(table: pa.Table, names: list) -> pa.ChunkedArray | None:
+    for name in names:
+        if name in table.column_names:
+            return table.column(name)
+    return None
+
+
+def _to_numpy(column: pa.ChunkedArray, name: str) -> np.ndarray:
+    """View a numeric column as float64 NumPy (zero-copy when possible)."""
+    if column.null_count:
+        raise ValueError(f"Column {name!r} contains {column.null_count} null values")
+    try:
+        column = column.cast(pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Column {name!r} is not numeric ({column.type})") from e
+    return column.to_numpy()
+
+
+def _encode_sex(table: pa.Table) -> np.ndarray:
+    """Return the encoded sex column, encoding labels in one vectorized pass.
+
+    Codes sent as Sex_encoded must be LabelEncoder codes of the served encoder.
+    """
+    encoded = _find_column(table, ["Sex_encoded"])
+    if encoded is not None:
+        codes = _to_numpy(encoded, "Sex_encoded")
+        n_classes = len(load_label_encoder().classes_)
+        invalid = (codes != np.floor(codes)) | (codes < 0) | (codes >= n_classes)
+        if invalid.any():
+            raise ValueError(
+                f"Unknown Sex_encoded codes {np.unique(codes[invalid]).tolist()}, "
+                f"expected integers from 0 to {n_classes - 1}"
+            )
+        return codes
+
+    labels = _find_column(table, ["Sex", "sex"])
+    if labels is None:
+        raise ValueError("Missing column 'Sex' (or 'sex', 'Sex_encoded')")
+    if pa.types.is_dictionary(labels.type):
+        labels = labels.cast(labels.type.value_type)
+
+    # The position of a label in classes_ is its LabelEncoder code
+    classes = pa.array(load_label_encoder().classes_.astype(str))
+    codes = pc.index_in(labels, value_set=classes)
+    if codes.null_count:
+        unseen = pc.unique(pc.filter(labels, pc.is_null(codes))).to_pylist()
+        raise ValueError(f"Unknown sex labels {unseen}, expected {classes.to_pylist()}")
+    return codes.to_numpy().astype(np.float64)
+
+
+def table_to_matrix(table: pa.Table) -> np.ndarray:
+    """Build the feature matrix of a table in `config.feature_columns` order.
+
+    Measurements are validated like AbaloneFeatures (finite and > 0).
+
+    Raises:
+        ValueError: If a column is missing, null, non-numeric or out of range
+    """
+    X = np.empty((table.num_rows, len(config.feature_columns)), dtype=np.float64)
+
+    for j, column in enumerate(config.feature_columns):
+        if column == "Sex_encoded":
+            X[:, j] = _encode_sex(table)
+            continue
+
+        field = FEATURE_FIELDS[column]
+        values = _find_column(table, [column, field])
+        if values is None:
+            raise ValueError(f"Missing column {column!r} (or {field!r})")
+        values = _to_numpy(values, column)
+
+        invalid = ~(np.isfinite(values) & (values > 0))
+        if invalid.any():
+            raise ValueError(
+                f"Column {column!r} must be > 0: {int(invalid.sum())} invalid "
+                f"values, first at row {int(np.argmax(invalid))}"
+            )
+        X[:, j] = values
+
+    return X
+
+
+def predict_table(
+    body: bytes, fmt: str, model=None, model_version: str = None
+) -> tuple:
+    """Predict every row of a columnar body and encode the results.
+
+    Runs in the inference pool.
+
+    Args:
+        body: Arrow IPC (stream or file) or Parquet data
+        fmt: Format of `body`, see `columnar_format`
+        model: Model to predict with (None: the worker's registry)
+        model_version: Version of `model`
+
+    Returns:
+        tuple: (Arrow IPC stream with predicted_rings and predicted_age, model
+            version)
+
+    Raises:
+        ValueError: If the body or its columns are invalid
+    """
+    with stage("prepare_features"):
+        X = table_to_matrix(read_table(body, fmt))
+    count_rows(len(X))
+    predicted_rings = []
+    if len(X):
+        predicted_rings, model_version = predict_matrix(X, model, model_version)
+
+    rings = np.asarray(predicted_rings, dtype=np.float64)
+    result = pa.table(
+        {
+            "predicted_rings": np.round(rings, 2),
+            "predicted_age": np.round(rings + 1.5, 2),
+        },
+        metadata={"model_version": model_version or ""},
+    )
+
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, result.schema) as writer:
+        writer.write_table(result)
+    return sink.getvalue().to_pybytes(), model_version
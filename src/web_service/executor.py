@@ -0,0 +1,146 @@
+"""Worker pools that run CPU-bound work (inference, training) off the event loop."""
+
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from .app_config import config
+from .metrics import metrics_registry
+from .profiling import sampling_profiler
+
+
+class WorkerPool:
+    """A lazily created thread or process pool with queue-depth accounting.
+
+    Jobs are submitted from the event loop with `await pool.run(fn, *args)`; the
+    loop stays free while the job runs. Counters are only touched from the loop
+    thread, so they need no locking.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind {kind!r} for pool {name!r}")
+
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Executor | None = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+
+    @property
+    def executor(self) -> Executor:
+        """The underlying executor, created on first use."""
+        if self._executor is None:
+            if self.kind == "process":
+                # Spawn (not fork): the server process is multi-threaded
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of submitted jobs still waiting for a free worker."""
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn, *args):
+        """Run `fn(*args)` in the pool and await its result.
+
+        With a process pool, `fn` and its arguments must be picklable. With a
+        thread pool, `fn` runs in a copy of the caller's context, so it can
+        record metrics for the request that submitted it, and it is sampled if
+        that request is profiled.
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            if sampling_profiler.enabled:
+                fn = sampling_profiler.wrap(fn)
+            fn = functools.partial(contextvars.copy_context().run, fn)
+
+        self.submitted += 1
+        self.in_flight += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        try:
+            result = await loop.run_in_executor(self.executor, fn, *args)
+        except BaseException:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of the pool counters."""
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the underlying executor (a new one is created on next use)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Separate pools so a long retrain never starves predictions of workers
+inference_pool = WorkerPool(
+    "inference", config.inference_executor_kind, config.inference_max_workers
+)
+training_pool = WorkerPool(
+    "training", config.training_executor_kind, config.training_max_workers
+)
+
+
+def _pool_metric(counter: str) -> dict:
+    return {
+        (pool.name,): getattr(pool, counter) for pool in (inference_pool, training_pool)
+    }
+
+
+metrics_registry.callback(
+    "abalone_worker_pool_in_flight",
+    "Jobs submitted to the pool and not yet finished.",
+    lambda: _pool_metric("in_flight"),
+    ("pool",),
+)
+metrics_registry.callback(
+    "abalone_worker_pool_queue_depth",
+    "Jobs waiting for a free worker.",
+    lambda: _pool_metric("queue_depth"),
+    ("pool",),
+)
+metrics_registry.callback(
+    "abalone_worker_pool_jobs_completed_total",
+    "Jobs completed successfully.",
+    lambda: _pool_metric("completed"),
+    ("pool",),
+    kind="counter",
+)
+metrics_registry.callback(
+    "abalone_worker_pool_jobs_failed_total",
+    "Jobs that raised an error.",
+    lambda: _pool_metric("failed"),
+    ("pool",),
+    kind="counter",
+)
@@ -1,11 +1,185 @@
 """Inference functions for the web service."""
 
 import pickle as pkl
+import threading
+import time
+from collections import OrderedDict
+from operator import attrgetter
+import numpy as np
+import orjson
 import pandas as pd
 from pathlib import Path
 from .app_config import config
+from .metrics import metrics_registry, stage
 from .schemas import AbaloneFeatures, PredictionResponse
-from .preprocessing import preprocess_single_sample
+from .preprocessing import (
+    encode_sex_values,
+    preprocess_single_sample,
+    sex_code_table,
+)
+from .registry import model_registry
+
+# Training column name -> AbaloneFeatures attribute, for the numeric features
+FEATURE_FIELDS = {
+    "Length": "length",
+    "Diameter": "diameter",
+    "Height": "height",
+    "Whole weight": "whole_weight",
+    "Shucked weight": "shucked_weight",
+    "Viscera weight": "viscera_weight",
+    "Shell weight": "shell_weight",
+}
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of predictions with a time-to-live.
+
+    Keys are (model version, quantized feature row): features are scaled to
+    `decimals` places, rounded to int64 and stored as raw bytes, so feature
+    vectors that agree to `decimals` places share an entry, and an entry of one
+    model version never answers for another. Settings default to the app config
+    and are read on every call.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        ttl_seconds: float = None,
+        decimals: int = None,
+    ):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._decimals = decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is not None:
+            return self._max_entries
+        return config.prediction_cache_max_entries
+
+    @property
+    def ttl_seconds(self) -> float:
+        if self._ttl_seconds is not None:
+            return self._ttl_seconds
+        return config.prediction_cache_ttl_seconds
+
+    @property
+    def decimals(self) -> int:
+        if self._decimals is not None:
+            return self._decimals
+        return config.prediction_cache_decimals
+
+    @property
+    def enabled(self) -> bool:
+        return config.prediction_cache_enabled and self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self, X: np.ndarray, model_version: str) -> list:
+        """Build the cache key of every row of a feature matrix."""
+        quantized = np.rint(X * 10.0**self.decimals).astype(np.int64)
+        # Quantized zeros are all +0, so equal rows have equal bytes
+        data = quantized.tobytes()
+        width = quantized.shape[1] * quantized.itemsize
+        return [
+            (model_version, data[start : start + width])
+            for start in range(0, len(data), width)
+        ]
+
+    def lookup(self, keys: list) -> tuple:
+        """Look up many keys at once.
+
+        Returns:
+            tuple: (cached values, None for misses; indices of the misses)
+        """
+        now = time.monotonic()
+        values = [None] * len(keys)
+        missing = []
+        with self._lock:
+            entries = self._entries
+            for i, key in enumerate(keys):
+                entry = entries.get(key)
+                if entry is not None and entry[1] > now:
+                    entries.move_to_end(key)
+                    values[i] = entry[0]
+                else:
+                    if entry is not None:
+                        del entries[key]  # Expired
+                    missing.append(i)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return values, missing
+
+    def store(self, keys: list, values: list):
+        """Insert predictions, evicting the least recently used entries."""
+        ttl = self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl > 0 else float("inf")
+        max_entries = self.max_entries
+        with self._lock:
+            entries = self._entries
+            for key, value in zip(keys, values):
+                entries[key] = (value, expires_at)
+                entries.move_to_end(key)
+            overflow = len(entries) - max_entries
+            for _ in range(overflow):
+                entries.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+    def invalidate(self, *_):
+        """Drop every entry (called when a new model version is published)."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Snapshot of the cache size and counters."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "decimals": self.decimals,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+prediction_cache = PredictionCache()
+model_registry.add_publish_listener(prediction_cache.invalidate)
+
+metrics_registry.callback(
+    "abalone_prediction_cache_hits_total",
+    "Predictions served from the prediction cache.",
+    lambda: {(): prediction_cache.hits},
+    kind="counter",
+)
+metrics_registry.callback(
+    "abalone_prediction_cache_misses_total",
+    "Predictions computed by the model.",
+    lambda: {(): prediction_cache.misses},
+    kind="counter",
+)
+metrics_registry.callback(
+    "abalone_prediction_cache_hit_ratio",
+    "Share of predictions served from the cache since startup.",
+    lambda: {(): prediction_cache.stats()["hit_rate"]},
+)
+metrics_registry.callback(
+    "abalone_prediction_cache_entries",
+    "Predictions currently cached.",
+    lambda: {(): len(prediction_cache)},
+)
 
 
 def load_model(model_path: Path = None):
@@ -35,10 +209,11 @@ def load_model(model_path: Path = None):
     return model
 
 
-def prepare_features(features: AbaloneFeatures) -> pd.DataFrame:
+def prepare_features_frame(features: AbaloneFeatures) -> pd.DataFrame:
     """Convert AbaloneFeatures to a DataFrame with the correct column names and order.
 
-    Uses the same preprocessing pipeline as training to ensure consistency.
+    Uses the same DataFrame preprocessing pipeline as training. This is the
+    reference path that `prepare_features` must stay consistent with.
 
     Args:
         features: Input features from the API request
@@ -64,59 +239,226 @@ def prepare_features(features: AbaloneFeatures) -> pd.DataFrame:
     return processed_df
 
 
-def run_inference(features: AbaloneFeatures, model=None) -> PredictionResponse:
-    """Run inference on a single abalone sample.
+def prepare_features(features: AbaloneFeatures, label_encoder=None) -> np.ndarray:
+    """Convert AbaloneFeatures to a single feature row without going through pandas.
+
+    Values are written straight into a preallocated (1, n_features) float64 row
+    in `config.feature_columns` order. Sex is encoded with a table lookup over
+    the encoder classes, which matches `prepare_features_frame`.
 
     Args:
-        features: Input features for prediction
-        model: Pre-loaded model (optional, will load from disk if not provided)
+        features: Input features from the API request
+        label_encoder: Fitted encoder (defaults to the cached one)
 
     Returns:
-        PredictionResponse with predicted rings and age
+        Feature row ready for `model.predict`
+
+    Raises:
+        ValueError: If the sex label was not seen when the encoder was fitted
+    """
+    sex_codes = sex_code_table(label_encoder)
+    if features.sex not in sex_codes:
+        raise ValueError(f"y contains previously unseen labels: {features.sex!r}")
+
+    X = np.empty((1, len(config.feature_columns)), dtype=np.float64)
+    row = X[0]
+
+    for j, column in enumerate(config.feature_columns):
+        if column == "Sex_encoded":
+            row[j] = sex_codes[features.sex]
+        else:
+            row[j] = getattr(features, FEATURE_FIELDS[column])
+
+    return X
+
+
+def features_to_matrix(
+    features_list: list[AbaloneFeatures], label_encoder=None
+) -> np.ndarray:
+    """Convert a list of AbaloneFeatures to a single feature matrix.
+
+    The matrix is C-contiguous float64 of shape (n_samples, n_features), with
+    columns in `config.feature_columns` order and sex encoded in one vectorized
+    lookup.
+
+    Args:
+        features_list: Input features for prediction
+        label_encoder: Fitted encoder (defaults to the cached one)
+
+    Returns:
+        Feature matrix ready for `model.predict`
+    """
+    n_samples = len(features_list)
+    X = np.empty((n_samples, len(config.feature_columns)), dtype=np.float64)
+
+    for j, column in enumerate(config.feature_columns):
+        if column == "Sex_encoded":
+            sexes = [features.sex for features in features_list]
+            X[:, j] = encode_sex_values(sexes, label_encoder)
+        else:
+            getter = attrgetter(FEATURE_FIELDS[column])
+            X[:, j] = np.fromiter(
+                map(getter, features_list), dtype=np.float64, count=n_samples
+            )
+
+    return X
+
+
+def predict_matrix(X: np.ndarray, model=None, model_version: str = None) -> tuple:
+    """Predict rings for an already prepared feature matrix.
+
+    Rows found in the prediction cache are not sent to the model. The cache is
+    skipped when the model version is unknown.
+
+    Args:
+        X: Feature matrix in `config.feature_columns` order
+        model: Pre-loaded model (optional, this process's registry is used if not
+            provided)
+        model_version: Version of `model`
+
+    Returns:
+        tuple: (predicted rings as a list of floats, model version)
     """
-    # Load model if not provided
     if model is None:
-        model = load_model()
+        served = model_registry.get(revalidate=True)
+        model, model_version = served.model, served.version
 
-    # Prepare features
-    X = prepare_features(features)
+    if model_version is None or not prediction_cache.enabled:
+        with stage("model.predict"):
+            predicted = model.predict(X)
+        return predicted.tolist(), model_version
+
+    keys = prediction_cache.keys(X, model_version)
+    predictions, missing = prediction_cache.lookup(keys)
+    if missing:
+        X_missing = X if len(missing) == len(keys) else X[missing]
+        with stage("model.predict"):
+            computed = model.predict(X_missing).tolist()
+        prediction_cache.store([keys[i] for i in missing], computed)
+        for i, value in zip(missing, computed):
+            predictions[i] = value
 
-    # Make prediction
-    predicted_rings = float(model.predict(X)[0])
+    return predictions, model_version
 
-    # Calculate age (rings + 1.5 years)
-    predicted_age = predicted_rings + 1.5
 
-    # Create response
-    response = PredictionResponse(
+def build_prediction_response(
+    features: AbaloneFeatures, predicted_rings: float, model_version: str = None
+) -> PredictionResponse:
+    """Build the response for one sample from its predicted number of rings.
+
+    Args:
+        features: Input features of the sample (already validated)
+        predicted_rings: Raw model output for the sample
+        model_version: Version of the model that made the prediction
+
+    Returns:
+        PredictionResponse with rounded rings and age (rings + 1.5 years)
+    """
+    return PredictionResponse.model_construct(
         predicted_rings=round(predicted_rings, 2),
-        predicted_age=round(predicted_age, 2),
+        predicted_age=round(predicted_rings + 1.5, 2),
         input_features=features,
+        model_version=model_version,
     )
 
-    return response
+
+def run_inference(
+    features: AbaloneFeatures, model=None, model_version: str = None
+) -> PredictionResponse:
+    """Run inference on a single abalone sample.
+
+    Args:
+        features: Input features for prediction
+        model: Pre-loaded model (optional, this process's registry is used if not
+            provided)
+        model_version: Version of `model`, echoed in the response
+
+    Returns:
+        PredictionResponse with predicted rings, age and serving model version
+    """
+    # Load model if not provided
+    if model is None:
+        served = model_registry.get(revalidate=True)
+        model, model_version = served.model, served.version
+
+    # Prepare features
+    with stage("prepare_features"):
+        X = prepare_features(features)
+
+    # Make prediction (or reuse a cached one)
+    predicted_rings = predict_matrix(X, model, model_version)[0][0]
+
+    return build_prediction_response(features, predicted_rings, model_version)
 
 
 def run_batch_inference(
-    features_list: list[AbaloneFeatures], model=None
+    features_list: list[AbaloneFeatures], model=None, model_version: str = None
 ) -> list[PredictionResponse]:
     """Run inference on multiple abalone samples.
 
     Args:
         features_list: List of input features for prediction
-        model: Pre-loaded model (optional, will load from disk if not provided)
+        model: Pre-loaded model (optional, this process's registry is used if not
+            provided)
+        model_version: Version of `model`, echoed in each response
 
     Returns:
         List of PredictionResponse objects
     """
     # Load model if not provided
     if model is None:
-        model = load_model()
+        served = model_registry.get(revalidate=True)
+        model, model_version = served.model, served.version
+
+    # Predict all uncached samples in a single vectorized call
+    with stage("prepare_features"):
+        X = features_to_matrix(features_list)
+    predicted_rings, _ = predict_matrix(X, model, model_version)
+
+    return [
+        build_prediction_response(features, rings, model_version)
+        for rings, features in zip(predicted_rings, features_list)
+    ]
+
+
+def run_compact_batch_inference(
+    features_list: list[AbaloneFeatures],
+    ids: list = None,
+    model=None,
+    model_version: str = None,
+) -> bytes:
+    """Run batch inference and encode a compact response directly to JSON.
+
+    No PredictionResponse is built: rounded predictions stay NumPy arrays and
+    orjson serializes them natively, in the CompactBatchPredictionResponse
+    layout.
+
+    Args:
+        features_list: List of input features for prediction
+        ids: Optional ID of each sample, echoed in the response
+        model: Pre-loaded model (optional, this process's registry is used if not
+            provided)
+        model_version: Version of `model`
+
+    Returns:
+        JSON-encoded CompactBatchPredictionResponse
+    """
+    if model is None:
+        served = model_registry.get(revalidate=True)
+        model, model_version = served.model, served.version
 
-    # Process all samples
-    predictions = []
-    for features in features_list:
-        prediction = run_inference(features, model=model)
-        predictions.append(prediction)
+    with stage("prepare_features"):
+        X = features_to_matrix(features_list)
+    predicted_rings, _ = predict_matrix(X, model, model_version)
+    rings = np.asarray(predicted_rings, dtype=np.float64)
 
-    return predictions
+    return orjson.dumps(
+        {
+            "predicted_rings": np.round(rings, 2),
+            "predicted_age": np.round(rings + 1.5, 2),
+            "ids": ids,
+            "count": len(rings),
+            "model_version": model_version,
+        },
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
@@ -0,0 +1,106 @@
+"""Background training jobs for the /train endpoint."""
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from .app_config import config
+from .executor import WorkerPool, training_pool
+from .training import train_and_save
+
+
+class TrainingJobManager:
+    """Queue training jobs on a worker pool and keep track of their status.
+
+    At most `max_concurrent` jobs train at once; the others wait in the
+    "queued" state. Job records are plain dicts shaped like TrainingJobStatus.
+    Everything here runs on the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, pool: WorkerPool, max_concurrent: int, history: int):
+        self.pool = pool
+        self.history = history
+        self.jobs: OrderedDict[str, dict] = OrderedDict()
+        self._max_concurrent = max_concurrent
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, params: dict, on_success=None) -> dict:
+        """Enqueue a training job and return its record immediately.
+
+        Args:
+            params: Hyperparameters passed to `train_and_save`
+            on_success: Optional coroutine function awaited with the job record
+                once training succeeded (e.g. to hot-swap the new model)
+
+        Returns:
+            The job record
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self._max_concurrent)
+            self._loop = loop
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "params": params,
+            "submitted_at": datetime.now(timezone.utc),
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+            "training_seconds": None,
+            "training_samples": None,
+            "model_path": None,
+            "model_version": None,
+            "metrics": None,
+            "search": None,
+            "error": None,
+        }
+        self.jobs[job["job_id"]] = job
+        self._evict_finished()
+
+        task = asyncio.create_task(self._run(job, on_success))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        """Return the record of a job, or None if it is unknown."""
+        return self.jobs.get(job_id)
+
+    async def _run(self, job: dict, on_success):
+        async with self._slots:
+            job["status"] = "running"
+            job["started_at"] = datetime.now(timezone.utc)
+            try:
+                result = await self.pool.run(train_and_save, job["params"])
+                job.update(result)
+                if on_success is not None:
+                    await on_success(job)
+                job["status"] = "succeeded"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = datetime.now(timezone.utc)
+                job["duration_seconds"] = (
+                    job["finished_at"] - job["started_at"]
+                ).total_seconds()
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond the history limit."""
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["status"] in ("succeeded", "failed")
+        ]
+        for job_id in finished[: max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+
+training_jobs = TrainingJobManager(
+    training_pool, config.training_max_workers, config.training_jobs_history
+)
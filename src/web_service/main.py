@@ -1,25 +1,79 @@
 """FastAPI application for Abalone Age Prediction."""
 
-from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import HTMLResponse
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import HTMLResponse, Response
 from pathlib import Path
+from typing import Union
 import sys
 from src.web_service.app_config import config
+from src.web_service.batching import micro_batcher
+from src.web_service.executor import inference_pool, training_pool
+from src.web_service.jobs import training_jobs
+from src.web_service.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MetricsMiddleware,
+    count_rows,
+    mark_stage,
+    metrics_registry,
+    set_model_version,
+    stage,
+)
 from src.web_service.schemas import (
     AbaloneFeatures,
     PredictionResponse,
     BatchPredictionRequest,
     BatchPredictionResponse,
+    CompactBatchPredictionResponse,
     TrainingRequest,
     TrainingResponse,
+    TrainingJobStatus,
     HealthResponse,
+    LivenessResponse,
+    ReadinessResponse,
+    ExecutorMetricsResponse,
+    PredictionCacheStats,
+)
+from src.web_service.inference import (
+    build_prediction_response,
+    prediction_cache,
+    prepare_features,
+    run_inference,
+    run_batch_inference,
+    run_compact_batch_inference,
+)
+from src.web_service.registry import ModelVersion, model_registry
+from src.web_service.startup import FirstRequestTimer, preload
+from src.web_service.profiling import ProfilingMiddleware, sampling_profiler
+from src.web_service.columnar import (
+    RESPONSE_MEDIA_TYPE,
+    columnar_format,
+    predict_table,
+)
+from src.web_service.streaming import (
+    RESPONSE_MEDIA_TYPES,
+    BodyStreamingResponse,
+    stream_format,
+    stream_predictions,
 )
-from src.web_service.inference import run_inference, run_batch_inference, load_model
 
 # Add the project root to the path to enable imports
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: preload and warm the model, release the pools on shutdown."""
+    if config.preload_model:
+        await preload()
+    yield
+    micro_batcher.stop()
+    inference_pool.shutdown()
+    training_pool.shutdown()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=config.app_name,
@@ -27,30 +81,72 @@ app = FastAPI(
     description=config.app_description,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
+app.add_middleware(FirstRequestTimer)
+app.add_middleware(MetricsMiddleware)
+if config.profiling != "off":
+    app.add_middleware(
+        ProfilingMiddleware,
+        mode=config.profiling,
+        interval_ms=config.profiling_interval_ms,
+    )
 
 
-# Global model cache
-_model_cache = None
-
-
-def get_model():
-    """Get or load the model (with caching)."""
-    global _model_cache
-    if _model_cache is None:
+async def get_model_version() -> ModelVersion:
+    """Get the served model version, loading it off the event loop on first use."""
+    served = model_registry.current
+    if served is None:
         try:
-            _model_cache = load_model()
+            served = await asyncio.to_thread(model_registry.get)
         except FileNotFoundError as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
             )
-    return _model_cache
+        model_registry.mark_ready()
+    return served
+
+
+async def get_prediction_model() -> ModelVersion:
+    """Get the model version serving a prediction request.
+
+    Every prediction endpoint goes through here, so this is also where the
+    time of the last prediction request is recorded for the readiness probe,
+    and where the request's validation stage ends for the metrics.
+    """
+    mark_stage("validation")
+    served = await get_model_version()
+    model_registry.record_prediction()
+    set_model_version(served.version)
+    return served
+
 
+def inference_args(served: ModelVersion) -> tuple:
+    """Get the (model, version) pair to hand to an inference job serving `served`.
+
+    Thread workers share the server's published model; process workers cannot,
+    so they get (None, None) and serve from their own registry.
+    """
+    if inference_pool.kind == "thread":
+        return served.model, served.version
+    return None, None
 
-def clear_model_cache():
-    """Clear the model cache (useful after training)."""
-    global _model_cache
-    _model_cache = None
+
+async def get_inference_model() -> tuple:
+    """Get the (model, version) pair to hand to a prediction request's job."""
+    return inference_args(await get_prediction_model())
+
+
+async def swap_in_trained_model(job: dict):
+    """Load and warm the newly trained model off the loop, then publish it.
+
+    Publishing is a single reference swap: in-flight predictions keep the
+    version they already hold and the next request gets the new one, so there
+    is no cold load after a retrain.
+    """
+    served = await asyncio.to_thread(model_registry.load_and_publish)
+    model_registry.mark_ready()
+    job["model_version"] = served.version
 
 
 @app.get("/", response_class=HTMLResponse, tags=["Home"])
@@ -248,6 +344,18 @@ async def home():
                         <p>Health check endpoint - verify API and model status</p>
                     </div>
 
+                    <div class="endpoint">
+                        <span class="method get">GET</span>
+                        <strong>/health/live</strong>
+                        <p>Liveness probe - answers as long as the process runs</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="method get">GET</span>
+                        <strong>/health/ready</strong>
+                        <p>Readiness probe - served model version, load time, warm-up and last prediction age</p>
+                    </div>
+
                     <div class="endpoint">
                         <span class="method post">POST</span>
                         <strong>/predict</strong>
@@ -260,10 +368,40 @@ async def home():
                         <p>Predict abalone age for multiple samples at once</p>
                     </div>
 
+                    <div class="endpoint">
+                        <span class="method post">POST</span>
+                        <strong>/predict/arrow</strong>
+                        <p>Predict a whole Arrow IPC or Parquet table, returned as Arrow</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="method post">POST</span>
+                        <strong>/predict/stream</strong>
+                        <p>Stream predictions for an NDJSON or CSV upload of any size</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="method get">GET</span>
+                        <strong>/metrics</strong>
+                        <p>Prometheus metrics: per-stage latency histograms, request counts, batch sizes, cache hits, model loads</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="method get">GET</span>
+                        <strong>/admin/profile</strong>
+                        <p>Folded stacks sampled from profiled requests (opt-in, ABALONE_PROFILING)</p>
+                    </div>
+
                     <div class="endpoint">
                         <span class="method post">POST</span>
                         <strong>/train</strong>
-                        <p>Train a new model with custom hyperparameters</p>
+                        <p>Queue the training of a new model with custom hyperparameters</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="method get">GET</span>
+                        <strong>/train/{job_id}</strong>
+                        <p>Status, timing and metrics of a training job</p>
                     </div>
                 </div>
 
@@ -405,21 +543,63 @@ print(response.json())</div>
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
-    """Check the health status of the API and model availability."""
-    model_loaded = False
-    try:
-        model = get_model()
-        model_loaded = model is not None
-    except HTTPException:
-        pass
+    """Check the health status of the API and model availability.
 
+    Like the probes below, only reads the registry's cached state: it never
+    loads the model, and reports "degraded" until the instance is ready.
+    """
     return HealthResponse(
-        status="healthy" if model_loaded else "degraded",
-        model_loaded=model_loaded,
+        status="healthy" if model_registry.ready else "degraded",
+        model_loaded=model_registry.current is not None,
         version=config.app_version,
     )
 
 
+@app.get("/health/live", response_model=LivenessResponse, tags=["Health"])
+async def liveness():
+    """Liveness probe: the process is up and its event loop is responsive.
+
+    Never looks at the model, so a missing or reloading model doesn't get the
+    instance restarted.
+    """
+    return LivenessResponse(status="alive", uptime_seconds=model_registry.uptime())
+
+
+@app.get(
+    "/health/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse}},
+    tags=["Health"],
+)
+async def readiness(response: Response):
+    """Readiness probe: a warmed model is published and can serve predictions.
+
+    Reads the registry's cached state only (no lock, no disk access, no model
+    load), so it answers in constant time even under load. Returns 503 with the
+    same body while the instance is not ready. Also reports the time to ready
+    and the first prediction request's latency, to track cold starts.
+    """
+    served = model_registry.current
+    warmed_up = served is not None and served.warm_up_seconds is not None
+    ready = model_registry.ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return ReadinessResponse(
+        status="ready" if ready else "not_ready",
+        model_loaded=served is not None,
+        model_version=served.version if served else None,
+        model_loaded_at=served.loaded_at if served else None,
+        model_load_seconds=served.load_seconds if served else None,
+        warmed_up=warmed_up,
+        warm_up_seconds=served.warm_up_seconds if served else None,
+        last_prediction_age_seconds=model_registry.last_prediction_age(),
+        time_to_ready_seconds=model_registry.ready_seconds,
+        first_request_seconds=model_registry.first_request_seconds,
+        uptime_seconds=model_registry.uptime(),
+    )
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 async def predict(features: AbaloneFeatures):
     """Predict the age of an abalone based on physical measurements.
@@ -434,8 +614,17 @@ async def predict(features: AbaloneFeatures):
         Predicted number of rings and estimated age
     """
     try:
-        model = get_model()
-        prediction = run_inference(features, model=model)
+        model, version = await get_inference_model()
+        count_rows(1)
+        if config.micro_batching_enabled:
+            # Coalesce with concurrent requests into a single predict call
+            with stage("prepare_features"):
+                row = prepare_features(features)
+            with stage("micro_batch"):
+                rings, version = await micro_batcher.predict(row, model, version)
+            return build_prediction_response(features, rings, version)
+
+        prediction = await inference_pool.run(run_inference, features, model, version)
         return prediction
     except Exception as e:
         raise HTTPException(
@@ -444,22 +633,44 @@ async def predict(features: AbaloneFeatures):
         )
 
 
-@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
+@app.post(
+    "/predict/batch",
+    response_model=Union[BatchPredictionResponse, CompactBatchPredictionResponse],
+    tags=["Prediction"],
+)
 async def predict_batch(request: BatchPredictionRequest):
     """Predict the age of multiple abalones in a single request.
 
     This endpoint is more efficient for processing multiple samples as it loads
     the model once and reuses it for all predictions.
 
+    With `response_format="compact"`, predictions come back as parallel
+    `predicted_rings` / `predicted_age` arrays (plus the request `ids`, if any)
+    instead of one object per sample echoing its input features, which makes
+    large responses much smaller and faster to build.
+
     Args:
         request: Batch request containing multiple abalone samples
 
     Returns:
-        List of predictions for each sample
+        List of predictions for each sample, or parallel arrays in compact mode
     """
     try:
-        model = get_model()
-        predictions = run_batch_inference(request.samples, model=model)
+        model, version = await get_inference_model()
+        count_rows(len(request.samples))
+        if request.response_format == "compact":
+            body = await inference_pool.run(
+                run_compact_batch_inference,
+                request.samples,
+                request.ids,
+                model,
+                version,
+            )
+            return Response(content=body, media_type="application/json")
+
+        predictions = await inference_pool.run(
+            run_batch_inference, request.samples, model, version
+        )
         return BatchPredictionResponse(predictions=predictions, count=len(predictions))
     except Exception as e:
         raise HTTPException(
@@ -468,71 +679,237 @@ async def predict_batch(request: BatchPredictionRequest):
         )
 
 
-@app.post("/train", response_model=TrainingResponse, tags=["Training"])
+@app.post(
+    "/predict/arrow",
+    response_class=Response,
+    tags=["Prediction"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string", "format": "binary"}}
+                for media_type in (
+                    "application/vnd.apache.arrow.stream",
+                    "application/vnd.apache.arrow.file",
+                    "application/vnd.apache.parquet",
+                )
+            },
+        }
+    },
+)
+async def predict_arrow(request: Request):
+    """Predict the age of a table of abalones sent as Arrow IPC or Parquet.
+
+    Columns are matched to the model features by training name ("Whole weight")
+    or API field name ("whole_weight"); sex is given as labels ("Sex") or
+    already encoded ("Sex_encoded"). Columns are read without per-row decoding
+    and predicted in one vectorized call.
+
+    Returns:
+        An Arrow IPC stream with `predicted_rings` and `predicted_age` columns,
+        in input row order; the model version is in the `X-Model-Version`
+        header and the schema metadata
+    """
+    fmt = columnar_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected an Arrow IPC (stream or file) or Parquet body",
+        )
+
+    body = await request.body()
+    model, version = await get_inference_model()
+    try:
+        result, version = await inference_pool.run(
+            predict_table, body, fmt, model, version
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch prediction failed: {str(e)}",
+        )
+    return Response(
+        content=result,
+        media_type=RESPONSE_MEDIA_TYPE,
+        headers={"X-Model-Version": version or ""},
+    )
+
+
+@app.post(
+    "/predict/stream",
+    response_class=BodyStreamingResponse,
+    tags=["Prediction"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/AbaloneFeatures"}
+                },
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def predict_stream(request: Request):
+    """Predict the age of an arbitrarily large number of abalones as a stream.
+
+    The body is NDJSON (one AbaloneFeatures object per line) or CSV with a
+    header row (API field names or the training column names, extra columns
+    ignored). Rows are scored in fixed-size chunks as the upload arrives and
+    results are streamed back in the same format, one record per input row with
+    its 0-based `row` index. Invalid rows get an `error` instead of a prediction.
+
+    The `X-Model-Version` header gives the model serving at the start of the
+    stream.
+    """
+    fmt = stream_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected an application/x-ndjson or text/csv body",
+        )
+
+    # One snapshot for both, in case a new model is published in between
+    served = await get_prediction_model()
+    model, version = inference_args(served)
+    return BodyStreamingResponse(
+        stream_predictions(request.stream(), fmt, model, version),
+        media_type=RESPONSE_MEDIA_TYPES[fmt],
+        headers={"X-Model-Version": served.version},
+    )
+
+
+@app.post(
+    "/train",
+    response_model=TrainingResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Training"],
+)
 async def train_model(request: TrainingRequest = TrainingRequest()):
-    """Train a new Random Forest model with the specified hyperparameters.
+    """Queue the training of a new Random Forest model with the specified hyperparameters.
 
-    This endpoint triggers the training pipeline which:
+    The request returns immediately with a job ID. In a separate worker process,
+    the training job:
     1. Loads the data from the configured data path
     2. Preprocesses the data (encodes categorical features, splits into train/test)
-    3. Trains a Random Forest Regressor with the provided hyperparameters
-    4. Saves the trained model to disk
+    3. Trains a Random Forest Regressor with the provided hyperparameters, or
+       with `search="halving"` runs a successive-halving search over
+       `param_grid` (cheap fits eliminate candidates before full fits)
+    4. Evaluates it on the held-out split and saves it to disk
 
-    After training, the model cache is cleared and the new model will be used
-    for subsequent predictions.
+    When the job succeeds the new model is swapped in atomically, without
+    interrupting in-flight predictions. Poll `GET /train/{job_id}` for progress.
 
     Args:
         request: Training configuration with hyperparameters
 
     Returns:
-        Training status and model information
+        Job ID and initial status of the training job
     """
-    try:
-        from sklearn.model_selection import train_test_split
-        from sklearn.ensemble import RandomForestRegressor
-        import pickle as pkl
-        import os
-        from .preprocessing import prepare_training_data
-
-        # Load and preprocess data using unified preprocessing
-        X, y, encoder = prepare_training_data(config.data_path)
-
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+    job = training_jobs.submit(request.model_dump(), on_success=swap_in_trained_model)
+    return TrainingResponse(
+        message="Training job queued",
+        job_id=job["job_id"],
+        status=job["status"],
+        status_url=f"/train/{job['job_id']}",
+    )
+
+
+@app.get("/train/{job_id}", response_model=TrainingJobStatus, tags=["Training"])
+async def training_job_status(job_id: str):
+    """Get the status, timing and metrics of a training job.
+
+    Args:
+        job_id: Identifier returned by `POST /train`
 
-        # Train model with custom parameters
-        rf = RandomForestRegressor(
-            n_estimators=request.n_estimators,
-            max_depth=request.max_depth,
-            min_samples_split=request.min_samples_split,
-            min_samples_leaf=request.min_samples_leaf,
-            random_state=request.random_state,
-            n_jobs=-1,
+    Returns:
+        Status of the training job
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Training job {job_id} not found",
         )
+    return job
+
 
-        rf.fit(X_train, y_train)
+@app.get(
+    "/metrics/executor", response_model=ExecutorMetricsResponse, tags=["Monitoring"]
+)
+async def executor_metrics():
+    """Queue-depth metrics of the inference and training worker pools."""
+    return ExecutorMetricsResponse(
+        pools=[inference_pool.stats(), training_pool.stats()]
+    )
 
-        # Save model
-        model_path = config.model_path
-        os.makedirs(model_path.parent, exist_ok=True)
-        with open(model_path, "wb") as f:
-            pkl.dump(rf, f)
 
-        # Clear model cache to load the newly trained model
-        clear_model_cache()
+@app.get("/metrics/cache", response_model=PredictionCacheStats, tags=["Monitoring"])
+async def cache_metrics():
+    """Size and hit/miss counters of the prediction cache.
 
-        return TrainingResponse(
-            message="Model trained successfully",
-            model_path=str(config.model_path),
-            training_samples=len(X_train),
-        )
-    except Exception as e:
+    With a process inference pool each worker keeps its own cache, and these
+    counters only cover the server process.
+    """
+    return PredictionCacheStats(**prediction_cache.stats())
+
+
+@app.get(
+    "/metrics",
+    response_class=Response,
+    responses={200: {"content": {METRICS_CONTENT_TYPE: {}}}},
+    tags=["Monitoring"],
+)
+async def prometheus_metrics():
+    """All metrics of the server process in the Prometheus text format.
+
+    Per-stage latency histograms of the prediction path (validation,
+    prepare_features, model.predict, serialization), request counts and
+    durations, rows per request, prediction cache hits, worker pool queues and
+    model load durations, labelled by endpoint and model version.
+    """
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get(
+    "/admin/profile",
+    response_class=Response,
+    responses={200: {"content": {"text/plain": {}}}},
+    tags=["Monitoring"],
+)
+async def profile():
+    """Aggregated stacks sampled from the inference jobs of profiled requests.
+
+    Folded format, one `request;outer frame;...;inner frame count` line per
+    distinct stack, ready for flamegraph.pl or speedscope. Requests are profiled
+    when `ABALONE_PROFILING` is "all", or "header" and they carry `X-Profile: 1`.
+    """
+    if not sampling_profiler.enabled:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Training failed: {str(e)}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is off (set ABALONE_PROFILING to header or all)",
         )
+    return Response(
+        content=sampling_profiler.folded(),
+        media_type="text/plain",
+        headers={
+            "X-Profile-Samples": str(sampling_profiler.samples),
+            "X-Profile-Jobs": str(sampling_profiler.jobs),
+        },
+    )
+
+
+@app.delete(
+    "/admin/profile", status_code=status.HTTP_204_NO_CONTENT, tags=["Monitoring"]
+)
+async def reset_profile():
+    """Drop the collected samples, e.g. before profiling a new scenario."""
+    sampling_profiler.reset()
 
 
 if __name__ == "__main__":
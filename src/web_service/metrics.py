@@ -0,0 +1,369 @@
+"""In-process Prometheus metrics, exposed in the text format by GET /metrics.
+
+Modules define their metrics on `metrics_registry` next to the code they
+measure: counters and histograms are updated as events happen, callback
+metrics read existing counters (worker pools, prediction cache) at scrape time.
+
+Requests are measured by `MetricsMiddleware`. It puts a `RequestTimer` in a
+context variable, which the request path fills in as it goes:
+
+- validation: request parsing and validation, until the handler asks for the
+  model (`mark_stage`)
+- prepare_features, model.predict: timed where they run with `stage()`;
+  thread-pool jobs run in a copy of the request's context, so this works
+  from inference workers too (process workers don't report these stages)
+- micro_batch: with micro-batching, the wait for and prediction of the shared
+  batch (which replaces model.predict)
+- serialization: from the end of the last stage until the response starts
+  (response building and encoding; not recorded for streamed responses)
+
+Stage timings, the request duration, the number of rows predicted and the
+request count are then recorded once, at the end of the request, labelled with
+the endpoint's route and the model version that served it.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BATCH_SIZE_BUCKETS = tuple(4**i for i in range(10))  # 1 to 262144 rows
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", r"\\").replace('"', r"\"")
+        value = value.replace("\n", r"\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """A monotonically increasing value per label set.
+
+    Not locked: only update it from the event loop thread.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        """Add `amount` to the series of `labels` (values in `labelnames` order)."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in list(self._values.items()):
+            yield self.name, self.labelnames, labels, value
+
+
+class Histogram:
+    """Observations counted in cumulative `le` buckets, per label set.
+
+    Only histograms created with `threadsafe=True` may be updated outside the
+    event loop thread: the others skip the lock, which costs as much as the
+    update itself.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+        threadsafe: bool = False,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (last one is +Inf)..., sum of observations]
+        self._series = {}
+        self._lock = threading.Lock() if threadsafe else None
+
+    def observe(self, value: float, labels: tuple = ()):
+        """Record one observation in the series of `labels`."""
+        if self._lock is not None:
+            with self._lock:
+                self._add(value, labels)
+        else:
+            self._add(value, labels)
+
+    def _add(self, value: float, labels: tuple):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        items = [(labels, list(series)) for labels, series in self._series.items()]
+        bucket_names = self.labelnames + ("le",)
+        for labels, series in items:
+            counts, total = series[:-1], series[-1]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield (
+                    self.name + "_bucket",
+                    bucket_names,
+                    labels + (_format_value(bound),),
+                    cumulative,
+                )
+            yield self.name + "_sum", self.labelnames, labels, total
+            yield self.name + "_count", self.labelnames, labels, cumulative
+
+
+class CallbackMetric:
+    """A gauge or counter whose values are read from `collect()` at scrape time.
+
+    `collect` returns a {label values: value} dict; None values are skipped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        collect=None,
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        for labels, value in self._collect().items():
+            if value is not None:
+                yield self.name, self.labelnames, labels, value
+
+
+class MetricsRegistry:
+    """The metrics of this process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+        threadsafe: bool = False,
+    ):
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets, threadsafe)
+        )
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        collect,
+        labelnames: tuple = (),
+        kind: str = "gauge",
+    ):
+        return self.register(
+            CallbackMetric(name, documentation, labelnames, collect, kind)
+        )
+
+    def render(self) -> str:
+        """Text exposition (format 0.0.4) of every registered metric."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labelnames, labels, value in metric.samples():
+                labels = _format_labels(labelnames, labels)
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+requests_total = metrics_registry.counter(
+    "abalone_http_requests_total",
+    "HTTP requests served.",
+    ("endpoint", "method", "status"),
+)
+request_duration = metrics_registry.histogram(
+    "abalone_http_request_duration_seconds",
+    "Time from request arrival to the end of the response.",
+    ("endpoint", "model_version"),
+)
+stage_duration = metrics_registry.histogram(
+    "abalone_request_stage_duration_seconds",
+    "Time spent per request in each stage of the prediction path.",
+    ("endpoint", "model_version", "stage"),
+)
+batch_size = metrics_registry.histogram(
+    "abalone_prediction_batch_size",
+    "Rows predicted per request.",
+    ("endpoint", "model_version"),
+    buckets=BATCH_SIZE_BUCKETS,
+)
+
+
+class RequestTimer:
+    """Timings and details of one request, filled in along the request path."""
+
+    __slots__ = ("start", "last", "stages", "rows", "model_version", "done")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.last = start  # End of the last recorded stage
+        self.stages = []  # (stage, seconds); list.append is thread-safe
+        self.rows = None
+        self.model_version = None
+        self.done = False
+
+
+_request_timer = contextvars.ContextVar("request_timer", default=None)
+
+
+def mark_stage(name: str):
+    """Record the time since the previous stage (or the request start) as `name`."""
+    timer = _request_timer.get()
+    if timer is None or timer.done:
+        return
+    now = time.perf_counter()
+    timer.stages.append((name, now - timer.last))
+    timer.last = now
+
+
+def set_model_version(version: str):
+    """Label the current request's metrics with the model version serving it."""
+    timer = _request_timer.get()
+    if timer is not None:
+        timer.model_version = version
+
+
+class stage:
+    """Time the enclosed block as stage `name` of the current request, if any.
+
+    A plain class rather than a generator-based context manager, which costs
+    several times more per use.
+    """
+
+    __slots__ = ("name", "timer", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        timer = _request_timer.get()
+        self.timer = None if timer is None or timer.done else timer
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timer = self.timer
+        if timer is not None:
+            end = time.perf_counter()
+            timer.stages.append((self.name, end - self.start))
+            timer.last = end
+
+
+def count_rows(n: int):
+    """Add `n` rows to the number of rows predicted by the current request."""
+    timer = _request_timer.get()
+    if timer is not None and not timer.done:
+        timer.rows = (timer.rows or 0) + n
+
+
+class MetricsMiddleware:
+    """ASGI middleware measuring every HTTP request (see the module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timer = RequestTimer(time.perf_counter())
+        response_status = 500
+
+        async def send_and_time(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                # Only validation is recorded when a response starts before
+                # any prediction (streaming, or not a prediction endpoint)
+                if len(timer.stages) > 1:
+                    timer.stages.append(
+                        ("serialization", time.perf_counter() - timer.last)
+                    )
+            await send(message)
+
+        token = _request_timer.set(timer)
+        try:
+            await self.app(scope, receive, send_and_time)
+        finally:
+            _request_timer.reset(token)
+            timer.done = True
+            self.record(scope, timer, response_status)
+
+    @staticmethod
+    def record(scope, timer: RequestTimer, response_status: int):
+        route = scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        version = timer.model_version or ""
+
+        requests_total.inc((endpoint, scope["method"], str(response_status)))
+        request_duration.observe(time.perf_counter() - timer.start, (endpoint, version))
+        if timer.rows is not None:
+            batch_size.observe(timer.rows, (endpoint, version))
+
+        totals = {}
+        for name, seconds in timer.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+        for name, seconds in totals.items():
+            stage_duration.observe(seconds, (endpoint, version, name))
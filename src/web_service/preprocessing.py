@@ -3,10 +3,118 @@ Unified preprocessing functions for both training and inference.
 This ensures exact same preprocessing is applied in both cases.
 """
 
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 import pickle as pkl
 from pathlib import Path
+from .app_config import config
+from src.modelling.artifacts import file_signature, save_pickle_atomic
+from src.modelling.dataset import load_dataset
+
+
+# In-process cache of fitted label encoders: path -> (file signature, encoder)
+_encoder_cache = {}
+
+
+def load_label_encoder(encoder_path: Path = None, revalidate: bool = False):
+    """
+    Load the fitted label encoder, reusing the in-process copy when possible.
+
+    The encoder is unpickled once per path and kept in memory, so the inference
+    hot path does no disk I/O. Entries are keyed by path and file signature
+    (mtime + size): writing a new encoder through `preprocess_data` replaces the
+    entry, and `revalidate=True` reloads it if the file changed on disk.
+
+    Args:
+        encoder_path: Path to the pickled encoder
+        revalidate: If True, stat the file and reload it when it has changed
+
+    Returns:
+        The fitted LabelEncoder
+
+    Raises:
+        FileNotFoundError: If the encoder file doesn't exist
+    """
+    if encoder_path is None:
+        encoder_path = config.encoder_path
+    elif not isinstance(encoder_path, Path):
+        encoder_path = Path(encoder_path)
+
+    cached = _encoder_cache.get(encoder_path)
+    if cached is not None and not revalidate:
+        return cached[1]
+
+    if not encoder_path.exists():
+        raise FileNotFoundError(
+            f"Label encoder not found at {encoder_path}. Please train a model first."
+        )
+
+    signature = file_signature(encoder_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with open(encoder_path, "rb") as f:
+        label_encoder = pkl.load(f)
+
+    _encoder_cache[encoder_path] = (signature, label_encoder)
+    return label_encoder
+
+
+def clear_encoder_cache():
+    """Clear the label encoder cache (forces a reload on next use)."""
+    _encoder_cache.clear()
+
+
+def encode_sex_values(sexes, label_encoder=None) -> np.ndarray:
+    """
+    Encode a sequence of sex labels with a single vectorized lookup.
+
+    Equivalent to `label_encoder.transform(sexes)`: the encoder's classes are
+    sorted, so each label's code is its position in `classes_`.
+
+    Args:
+        sexes: Sequence of raw sex labels ("M", "F", "I")
+        label_encoder: Fitted encoder (defaults to the cached one)
+
+    Returns:
+        Array of integer codes, one per label
+
+    Raises:
+        ValueError: If a label was not seen when the encoder was fitted
+    """
+    if label_encoder is None:
+        label_encoder = load_label_encoder()
+
+    classes = label_encoder.classes_.astype(str)
+    sexes = np.asarray(sexes, dtype=str)
+    codes = np.searchsorted(classes, sexes)
+
+    unseen = (codes >= len(classes)) | (
+        classes[np.minimum(codes, len(classes) - 1)] != sexes
+    )
+    if unseen.any():
+        raise ValueError(
+            f"y contains previously unseen labels: {np.unique(sexes[unseen])}"
+        )
+
+    return codes
+
+
+def sex_code_table(label_encoder=None) -> dict:
+    """
+    Return the label -> code mapping of a fitted encoder, for scalar lookups.
+
+    Args:
+        label_encoder: Fitted encoder (defaults to the cached one)
+
+    Returns:
+        Dictionary mapping each sex label to its integer code
+    """
+    if label_encoder is None:
+        label_encoder = load_label_encoder()
+
+    return {str(label): code for code, label in enumerate(label_encoder.classes_)}
 
 
 def preprocess_data(
@@ -26,7 +134,8 @@ def preprocess_data(
     df = df.copy()
 
     if encoder_path is None:
-        encoder_path = Path("src/web_service/local_objects/label_encoder.pkl")
+        encoder_path = config.encoder_path
+    encoder_path = Path(encoder_path)
 
     if fit_encoder:
         # Training mode: fit new encoder
@@ -34,19 +143,13 @@ def preprocess_data(
         df["Sex_encoded"] = label_encoder.fit_transform(df["Sex"])
 
         # Save encoder for inference
-        encoder_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(encoder_path, "wb") as f:
-            pkl.dump(label_encoder, f)
-    else:
-        # Inference mode: load existing encoder
-        if not encoder_path.exists():
-            raise FileNotFoundError(
-                f"Label encoder not found at {encoder_path}. "
-                "Please train a model first."
-            )
+        save_pickle_atomic(label_encoder, encoder_path)
 
-        with open(encoder_path, "rb") as f:
-            label_encoder = pkl.load(f)
+        # Publish the new encoder to the cache so inference never serves a stale one
+        _encoder_cache[encoder_path] = (file_signature(encoder_path), label_encoder)
+    else:
+        # Inference mode: reuse the cached encoder (loaded from disk once)
+        label_encoder = load_label_encoder(encoder_path)
 
         df["Sex_encoded"] = label_encoder.transform(df["Sex"])
 
@@ -119,8 +222,8 @@ def prepare_training_data(data_path: Path) -> tuple:
     Returns:
         tuple: (X, y) where X is features DataFrame and y is target Series
     """
-    # Load raw data
-    df = pd.read_csv(data_path)
+    # Load raw data (through its typed columnar copy)
+    df = load_dataset(data_path)
 
     # Preprocess (training mode - fit new encoder)
     processed_df, encoder = preprocess_data(df, fit_encoder=True)
@@ -0,0 +1,163 @@
+"""Opt-in sampling profiler of the inference jobs of selected requests.
+
+With `config.profiling` set to "header" (requests sent with `X-Profile: 1`) or
+"all" (every request), `ProfilingMiddleware` marks the selected requests in a
+context variable. Thread-pool jobs submitted by a marked request run through
+`SamplingProfiler.run_profiled`, which registers the worker thread while the
+job runs. A sampler thread reads the stacks of registered threads every
+`config.profiling_interval_ms` and counts them in folded form
+("endpoint;outer frame;...;inner frame"), ready for flamegraph.pl or
+speedscope, served by GET /admin/profile.
+
+Only inference work done in thread workers is sampled: the event loop is
+shared by all requests, and process workers can't be sampled from here. With
+profiling "off" (the default) the middleware is not installed and jobs are not
+wrapped, so nothing is added to the request path.
+"""
+
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_HEADER_VALUES = (b"1", b"true", b"yes", b"on")
+
+# Label of the request being profiled (e.g. "POST /predict"), None otherwise
+_profiled_request = contextvars.ContextVar("profiled_request", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    filename = os.path.relpath(code.co_filename) if code.co_filename else "?"
+    if filename.startswith(".."):
+        # Outside the project (site-packages, stdlib): keep the last parts
+        filename = "/".join(code.co_filename.split(os.sep)[-2:])
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of worker threads running profiled jobs.
+
+    The sampler thread is started on first use and sleeps while no profiled
+    job is running.
+    """
+
+    def __init__(self, interval_ms: float = 1.0):
+        self.enabled = False
+        self.interval = interval_ms / 1000
+        self.samples = 0
+        self.jobs = 0
+        self._stacks = Counter()
+        self._threads = {}  # Thread ident -> label of the profiled request
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def wrap(self, fn):
+        """Return `fn` set up to be profiled if the current request is selected."""
+        label = _profiled_request.get()
+        if label is None:
+            return fn
+        self._ensure_started()
+        return functools.partial(self.run_profiled, label, fn)
+
+    def run_profiled(self, label: str, fn, *args):
+        """Run `fn(*args)` with this thread registered for sampling."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = label
+            self.jobs += 1
+            self._active.set()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                del self._threads[ident]
+                if not self._threads:
+                    self._active.clear()
+
+    def folded(self) -> str:
+        """Aggregated stacks, one "frame;frame;... count" line each."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def reset(self):
+        """Forget every collected sample."""
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+            self.jobs = 0
+
+    def _ensure_started(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            with self._lock:
+                if self._sampler is None or not self._sampler.is_alive():
+                    self._sampler = threading.Thread(
+                        target=self._sample_forever, name="profiler", daemon=True
+                    )
+                    self._sampler.start()
+
+    def _sample_forever(self):
+        own_code = self.run_profiled.__func__.__code__
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, label in threads:
+                frame = frames.get(ident)
+                stack = []
+                # Walk up to the profiled job, leaving out the pool machinery
+                while frame is not None and frame.f_code is not own_code:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if frame is not None and stack:
+                    stack.append(label)
+                    with self._lock:
+                        self._stacks[";".join(reversed(stack))] += 1
+                        self.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+
+sampling_profiler = SamplingProfiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware selecting the requests whose inference jobs are profiled.
+
+    Installing it enables the profiler's job hook.
+
+    Args:
+        mode: "header" to profile requests sent with `X-Profile: 1`, "all" to
+            profile every request
+        interval_ms: Sampling interval of the profiler
+    """
+
+    def __init__(self, app, mode: str = "header", interval_ms: float = 1.0):
+        if mode not in ("header", "all"):
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        self.app = app
+        self.mode = mode
+        sampling_profiler.interval = interval_ms / 1000
+        sampling_profiler.enabled = True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (
+            self.mode == "header"
+            and dict(scope["headers"]).get(PROFILE_HEADER, b"").lower()
+            not in PROFILE_HEADER_VALUES
+        ):
+            return await self.app(scope, receive, send)
+
+        token = _profiled_request.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _profiled_request.reset(token)
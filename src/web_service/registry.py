@@ -0,0 +1,290 @@
+"""Versioned in-process model registry with atomic hot-swap."""
+
+import logging
+import pickle as pkl
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+from .app_config import config
+from src.modelling.artifacts import content_version, file_signature
+from src.modelling.compiled_forest import CompiledForest
+from .metrics import LOAD_BUCKETS, metrics_registry
+from .preprocessing import load_label_encoder
+
+logger = logging.getLogger(__name__)
+
+model_load_duration = metrics_registry.histogram(
+    "abalone_model_load_duration_seconds",
+    "Time taken to load and warm a model version.",
+    ("model_version", "backend"),
+    buckets=LOAD_BUCKETS,
+    threadsafe=True,  # Models are loaded in worker threads
+)
+
+
+def serve_on_arrays(model):
+    """Drop the column names a model was fitted with, once checked against config.
+
+    The serving path feeds NumPy matrices in `config.feature_columns` order;
+    without names to compare them to, sklearn doesn't warn about them on every
+    call. A model fitted on columns in another order keeps its names, so that
+    warning is still raised for it.
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return model
+    if list(names) != list(config.feature_columns):
+        logger.warning(
+            "Model fitted on columns %s, but served in %s order",
+            list(names),
+            config.feature_columns,
+        )
+        return model
+    del model.feature_names_in_
+    return model
+
+
+class ModelVersion:
+    """An immutable, loaded and warmed model together with its metadata."""
+
+    __slots__ = (
+        "model",
+        "version",
+        "path",
+        "signature",
+        "loaded_at",
+        "load_seconds",
+        "warm_up_seconds",
+    )
+
+    def __init__(
+        self,
+        model,
+        version,
+        path,
+        signature,
+        loaded_at,
+        load_seconds,
+        warm_up_seconds=None,
+    ):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.signature = signature
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+        # None until the version has run its warm-up predictions
+        self.warm_up_seconds = warm_up_seconds
+
+
+class ModelRegistry:
+    """Holds the currently served model version.
+
+    Readers take `registry.current` (or `get()`) once per request and use that
+    reference until they are done, so publishing a new version never affects
+    in-flight predictions. Publishing is a single reference assignment, hence
+    lock-free for readers; the lock only serializes loads, so concurrent cold
+    requests trigger a single unpickle.
+
+    The registry also keeps the serving state read by the health probes
+    (process start, time to ready, first and last prediction requests) as
+    plain attributes, so probes never take a lock, touch the disk or trigger a
+    load.
+    """
+
+    def __init__(self, model_path: Path = None):
+        self._model_path = model_path
+        self._current: ModelVersion | None = None
+        self._load_lock = threading.Lock()
+        self._publish_listeners = []
+        self.started_at = time.monotonic()
+        # Seconds from process start until the instance was first marked ready
+        self.ready_seconds: float | None = None
+        # Latency of the first prediction request served after startup
+        self.first_request_seconds: float | None = None
+        self._last_prediction_at: float | None = None
+
+    @property
+    def model_path(self) -> Path:
+        return self._model_path if self._model_path is not None else config.model_path
+
+    @property
+    def current(self) -> ModelVersion | None:
+        """The published model version, or None if nothing is loaded yet."""
+        return self._current
+
+    def load(self, model_path: Path = None) -> ModelVersion:
+        """Load and warm a model from disk without publishing it.
+
+        The version is derived from the pickle's content (or recorded in the
+        compiled export), so every worker process serving the same file reports
+        the same version, whatever the backend.
+
+        Raises:
+            FileNotFoundError: If the model file doesn't exist
+        """
+        if model_path is None:
+            model_path = self.model_path
+
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"Model file not found at {model_path}. "
+                "Please train a model first using the /train endpoint or running the training pipeline."
+            )
+
+        start = time.perf_counter()
+        signature = file_signature(model_path)
+        if config.model_backend == "compiled":
+            model, version = self._load_compiled(model_path, signature)
+        else:
+            data = model_path.read_bytes()
+            model, version = serve_on_arrays(pkl.loads(data)), content_version(data)
+        # The encoder is trained together with the model: reload it if it changed
+        load_label_encoder(revalidate=True)
+        warm_up_start = time.perf_counter()
+        self._warm_up(model)
+        end = time.perf_counter()
+        model_load_duration.observe(end - start, (version, config.model_backend))
+
+        return ModelVersion(
+            model=model,
+            version=version,
+            path=model_path,
+            signature=signature,
+            loaded_at=datetime.now(timezone.utc),
+            load_seconds=end - start,
+            warm_up_seconds=end - warm_up_start,
+        )
+
+    def add_publish_listener(self, callback):
+        """Call `callback(model_version)` after every publish (e.g. to drop caches)."""
+        self._publish_listeners.append(callback)
+
+    def publish(self, model_version: ModelVersion) -> ModelVersion:
+        """Make `model_version` the served version (single reference swap)."""
+        self._current = model_version
+        for callback in self._publish_listeners:
+            callback(model_version)
+        return model_version
+
+    def load_and_publish(self, model_path: Path = None) -> ModelVersion:
+        """Load and warm a model, then publish it."""
+        with self._load_lock:
+            return self.publish(self.load(model_path))
+
+    def get(self, revalidate: bool = False) -> ModelVersion:
+        """Return the published version, loading it on first use.
+
+        Args:
+            revalidate: If True, reload the model when its file changed on disk
+                (used by process-pool workers, which don't see server publishes)
+
+        Raises:
+            FileNotFoundError: If no model is loaded and the file doesn't exist
+        """
+        current = self._current
+        if current is not None and not revalidate:
+            return current
+
+        with self._load_lock:
+            current = self._current
+            if current is None or (
+                revalidate
+                and (
+                    not current.path.exists()
+                    or file_signature(current.path) != current.signature
+                )
+            ):
+                current = self.publish(self.load())
+            return current
+
+    def clear(self):
+        """Forget the published version (the next `get()` loads from disk)."""
+        self._current = None
+        self.ready_seconds = None
+        self.first_request_seconds = None
+        self._last_prediction_at = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether a warmed model is published and the instance was marked ready."""
+        current = self._current
+        return (
+            self.ready_seconds is not None
+            and current is not None
+            and current.warm_up_seconds is not None
+        )
+
+    def mark_ready(self):
+        """Record the time to ready, the first time a warmed model is served."""
+        if self.ready_seconds is None and self._current is not None:
+            self.ready_seconds = self.uptime()
+
+    def record_prediction(self):
+        """Note that a prediction request is being served (a single assignment)."""
+        self._last_prediction_at = time.monotonic()
+
+    def last_prediction_age(self) -> float | None:
+        """Seconds since the last prediction request, None if there was none."""
+        last = self._last_prediction_at
+        return None if last is None else time.monotonic() - last
+
+    def uptime(self) -> float:
+        """Seconds since the registry (i.e. the serving process) started."""
+        return time.monotonic() - self.started_at
+
+    @staticmethod
+    def _load_compiled(model_path: Path, signature: tuple) -> tuple:
+        """Memory-map the compiled export of the model, recompiling it if stale.
+
+        When the export's recorded pickle signature matches, the pickle is not
+        read at all, so a cold start costs a manifest read and a few mmaps.
+
+        Returns:
+            tuple: (CompiledForest, version)
+        """
+        try:
+            forest, manifest = CompiledForest.load(config.compiled_model_path)
+        except (OSError, ValueError, KeyError):
+            forest, manifest = None, {}
+
+        if forest is not None and manifest.get("source_signature") == list(signature):
+            return forest, manifest["version"]
+
+        data = model_path.read_bytes()
+        version = content_version(data)
+        if forest is not None and manifest.get("version") == version:
+            return forest, version
+        return CompiledForest.from_sklearn(pkl.loads(data)), version
+
+    @staticmethod
+    def _warm_up(model):
+        """Predict synthetic batches so first-call overhead is paid before publishing.
+
+        One batch per `config.warm_up_batch_sizes` size, with realistic
+        feature values so predictions walk the trees rather than one path.
+        """
+        rng = np.random.default_rng(0)
+        sex_codes = list(config.sex_mapping.values())
+        for size in config.warm_up_batch_sizes or [1]:
+            X = rng.uniform(0.05, 1.0, (size, len(config.feature_columns)))
+            X[:, config.feature_columns.index("Sex_encoded")] = rng.choice(
+                sex_codes, size
+            )
+            model.predict(X)
+
+
+model_registry = ModelRegistry()
+
+metrics_registry.callback(
+    "abalone_time_to_ready_seconds",
+    "Seconds from process start until the instance was ready.",
+    lambda: {(): model_registry.ready_seconds},
+)
+metrics_registry.callback(
+    "abalone_first_request_seconds",
+    "Latency of the first prediction request after startup.",
+    lambda: {(): model_registry.first_request_seconds},
+)
@@ -1,7 +1,8 @@
 """Pydantic schemas for request and response validation."""
 
-from pydantic import BaseModel, Field, field_validator
-from typing import Literal
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import datetime
+from typing import Literal, Optional, Union
 
 
 class AbaloneFeatures(BaseModel):
@@ -62,6 +63,9 @@ class PredictionResponse(BaseModel):
     input_features: AbaloneFeatures = Field(
         ..., description="Echo of the input features used for prediction"
     )
+    model_version: Optional[str] = Field(
+        None, description="Version of the model that served the prediction"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -79,6 +83,7 @@ class PredictionResponse(BaseModel):
                         "viscera_weight": 0.101,
                         "shell_weight": 0.15,
                     },
+                    "model_version": "3f2a9c1b7d4e",
                 }
             ]
         }
@@ -91,6 +96,24 @@ class BatchPredictionRequest(BaseModel):
     samples: list[AbaloneFeatures] = Field(
         ..., min_length=1, description="List of abalone samples to predict"
     )
+    response_format: Literal["full", "compact"] = Field(
+        "full",
+        description=(
+            "full: one PredictionResponse per sample; compact: parallel arrays "
+            "of predictions without the echoed input features"
+        ),
+    )
+    ids: Optional[list[Union[int, str]]] = Field(
+        None,
+        description="Optional ID of each sample, echoed in compact responses",
+    )
+
+    @model_validator(mode="after")
+    def check_ids_length(self):
+        """Validate that there is one ID per sample."""
+        if self.ids is not None and len(self.ids) != len(self.samples):
+            raise ValueError(f"Got {len(self.ids)} ids for {len(self.samples)} samples")
+        return self
 
 
 class BatchPredictionResponse(BaseModel):
@@ -102,6 +125,32 @@ class BatchPredictionResponse(BaseModel):
     count: int = Field(..., description="Number of predictions made")
 
 
+class CompactBatchPredictionResponse(BaseModel):
+    """Compact response model for batch predictions (parallel arrays)."""
+
+    predicted_rings: list[float] = Field(
+        ..., description="Predicted number of rings of each sample"
+    )
+    predicted_age: list[float] = Field(
+        ..., description="Estimated age in years (rings + 1.5) of each sample"
+    )
+    ids: Optional[list[Union[int, str]]] = Field(
+        None, description="IDs of the samples, as given in the request"
+    )
+    count: int = Field(..., description="Number of predictions made")
+    model_version: Optional[str] = Field(
+        None, description="Version of the model that made the predictions"
+    )
+
+
+SEARCHABLE_PARAMS = {
+    "n_estimators",
+    "max_depth",
+    "min_samples_split",
+    "min_samples_leaf",
+}
+
+
 class TrainingRequest(BaseModel):
     """Request model for model training."""
 
@@ -122,16 +171,106 @@ class TrainingRequest(BaseModel):
     random_state: int = Field(
         default=42, description="Random state for reproducibility"
     )
+    search: Optional[Literal["halving"]] = Field(
+        None,
+        description=(
+            "halving: successive-halving search over param_grid instead of one "
+            "fit with the hyperparameters above (which fill in the others)"
+        ),
+    )
+    param_grid: Optional[dict[str, list[Optional[int]]]] = Field(
+        None,
+        description=(
+            "Values to search for n_estimators, max_depth, min_samples_split "
+            "and min_samples_leaf (null max_depth: unlimited; default grid if "
+            "omitted)"
+        ),
+    )
+    halving_factor: int = Field(
+        default=3, ge=2, description="Budget growth and elimination ratio per rung"
+    )
+    halving_resource: Literal["samples", "trees"] = Field(
+        "samples", description="Budget cut down in early rungs: rows or trees"
+    )
+
+    @field_validator("param_grid")
+    @classmethod
+    def check_param_grid(cls, v):
+        """Validate that only the searchable hyperparameters are in the grid."""
+        if v is None:
+            return v
+        unknown = set(v) - SEARCHABLE_PARAMS
+        if unknown:
+            raise ValueError(
+                f"Cannot search {sorted(unknown)}, expected {sorted(SEARCHABLE_PARAMS)}"
+            )
+        if any(not values for values in v.values()):
+            raise ValueError("Every searched hyperparameter needs at least one value")
+        return v
 
 
 class TrainingResponse(BaseModel):
-    """Response model for training endpoint."""
+    """Response model for training endpoint (the job is queued, not finished)."""
 
     message: str = Field(..., description="Status message about the training")
-    model_path: str = Field(..., description="Path where the model was saved")
-    training_samples: int = Field(
-        ..., description="Number of samples used for training"
+    job_id: str = Field(..., description="Identifier of the training job")
+    status: str = Field(..., description="Job status: queued, running, ...")
+    status_url: str = Field(..., description="Endpoint to poll for the job status")
+
+
+class SearchSummary(BaseModel):
+    """Outcome of a successive-halving search."""
+
+    best_params: dict[str, Optional[int]] = Field(
+        ..., description="Hyperparameters of the saved model"
+    )
+    n_candidates: int = Field(..., description="Number of candidates searched")
+    n_fits: int = Field(..., description="Number of fits over all rungs")
+    rungs: list[dict[str, float]] = Field(
+        ..., description="Budget, candidates, CPU time and best MSE of each rung"
+    )
+    cpu_seconds: float = Field(..., description="CPU time of all the fits")
+    estimated_exhaustive_cpu_seconds: float = Field(
+        ..., description="Estimated CPU time of fully fitting every candidate"
+    )
+    cpu_seconds_saved: float = Field(
+        ..., description="Estimated CPU time saved against the exhaustive grid"
+    )
+
+
+class TrainingJobStatus(BaseModel):
+    """Status, timing and results of a training job."""
+
+    job_id: str = Field(..., description="Identifier of the training job")
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(
+        ..., description="Current status of the job"
     )
+    params: TrainingRequest = Field(..., description="Requested hyperparameters")
+    submitted_at: datetime = Field(..., description="When the job was submitted")
+    started_at: Optional[datetime] = Field(None, description="When training started")
+    finished_at: Optional[datetime] = Field(None, description="When the job finished")
+    duration_seconds: Optional[float] = Field(
+        None, description="Wall time from start to finish, including model swap"
+    )
+    training_seconds: Optional[float] = Field(
+        None, description="Time spent fitting the model"
+    )
+    training_samples: Optional[int] = Field(
+        None, description="Number of samples used for training"
+    )
+    model_path: Optional[str] = Field(
+        None, description="Path where the model was saved"
+    )
+    model_version: Optional[str] = Field(
+        None, description="Version of the trained model once it was published"
+    )
+    metrics: Optional[dict[str, float]] = Field(
+        None, description="Metrics on the held-out split (mse, rmse, r2_score)"
+    )
+    search: Optional[SearchSummary] = Field(
+        None, description="Outcome of the hyperparameter search, if any"
+    )
+    error: Optional[str] = Field(None, description="Error message if the job failed")
 
 
 class HealthResponse(BaseModel):
@@ -140,3 +279,79 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Health status of the API")
     model_loaded: bool = Field(..., description="Whether the model is loaded and ready")
     version: str = Field(..., description="API version")
+
+
+class LivenessResponse(BaseModel):
+    """Response model for the liveness probe."""
+
+    status: Literal["alive"] = Field(..., description="Always 'alive'")
+    uptime_seconds: float = Field(..., description="Seconds since process start")
+
+
+class ReadinessResponse(BaseModel):
+    """Response model for the readiness probe."""
+
+    status: Literal["ready", "not_ready"] = Field(
+        ..., description="Whether the instance can serve predictions"
+    )
+    model_loaded: bool = Field(..., description="Whether a model is published")
+    model_version: Optional[str] = Field(None, description="Served model version")
+    model_loaded_at: Optional[datetime] = Field(
+        None, description="When the served model was loaded (UTC)"
+    )
+    model_load_seconds: Optional[float] = Field(
+        None, description="Time taken to load and warm the served model"
+    )
+    warmed_up: bool = Field(
+        ..., description="Whether the served model ran its warm-up predictions"
+    )
+    warm_up_seconds: Optional[float] = Field(
+        None, description="Time taken by the warm-up predictions"
+    )
+    last_prediction_age_seconds: Optional[float] = Field(
+        None, description="Seconds since the last prediction request"
+    )
+    time_to_ready_seconds: Optional[float] = Field(
+        None, description="Seconds from process start until the instance was ready"
+    )
+    first_request_seconds: Optional[float] = Field(
+        None, description="Latency of the first prediction request after startup"
+    )
+    uptime_seconds: float = Field(..., description="Seconds since process start")
+
+
+class WorkerPoolStats(BaseModel):
+    """Queue-depth metrics of one worker pool."""
+
+    name: str = Field(..., description="Pool name (inference or training)")
+    kind: str = Field(..., description="Executor kind: thread or process")
+    max_workers: int = Field(..., description="Maximum number of concurrent jobs")
+    in_flight: int = Field(..., description="Jobs submitted and not yet finished")
+    queue_depth: int = Field(..., description="Jobs waiting for a free worker")
+    peak_queue_depth: int = Field(..., description="Highest queue depth observed")
+    submitted: int = Field(..., description="Total jobs submitted")
+    completed: int = Field(..., description="Total jobs completed successfully")
+    failed: int = Field(..., description="Total jobs that raised an error")
+
+
+class ExecutorMetricsResponse(BaseModel):
+    """Response model for the executor metrics endpoint."""
+
+    pools: list[WorkerPoolStats] = Field(..., description="Metrics of each pool")
+
+
+class PredictionCacheStats(BaseModel):
+    """Response model for the prediction cache metrics endpoint."""
+
+    enabled: bool = Field(..., description="Whether predictions are cached")
+    entries: int = Field(..., description="Number of cached predictions")
+    max_entries: int = Field(..., description="Capacity before LRU eviction")
+    ttl_seconds: float = Field(..., description="Entry lifetime (0: no expiry)")
+    decimals: int = Field(..., description="Decimals features are quantized to")
+    hits: int = Field(..., description="Predictions served from the cache")
+    misses: int = Field(..., description="Predictions computed by the model")
+    hit_rate: float = Field(..., description="hits / (hits + misses)")
+    evictions: int = Field(..., description="Entries evicted to respect capacity")
+    invalidations: int = Field(
+        ..., description="Cache flushes caused by a new model being published"
+    )
@@ -0,0 +1,137 @@
+"""Eager model preload and warm-up, run by the application lifespan.
+
+Without it, the first prediction request pays for the model and encoder
+unpickle, the creation of the inference workers and every first-call overhead
+(sklearn input validation, Pydantic validators and serializers). At startup the
+instance instead:
+
+1. loads, warms and publishes the model (`ModelRegistry.load` predicts one
+   synthetic batch of each `config.warm_up_batch_sizes` size),
+2. sends one synthetic batch of each size through the full request path
+   (validation, every inference worker, response serialization),
+3. marks itself ready, recording the time to ready.
+
+`FirstRequestTimer` then measures the latency of the first prediction request.
+"""
+
+import asyncio
+import logging
+import time
+import numpy as np
+from .app_config import config
+from .executor import inference_pool
+from .inference import run_batch_inference
+from .registry import model_registry
+from .schemas import AbaloneFeatures, BatchPredictionResponse
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_samples(size: int, seed: int = 0) -> list[dict]:
+    """Build `size` plausible AbaloneFeatures payloads."""
+    rng = np.random.default_rng(seed)
+    sexes = rng.choice(list(config.sex_mapping), size)
+    measurements = rng.uniform(0.05, 1.0, (size, 7)).round(4)
+    return [
+        {
+            "sex": str(sex),
+            "length": values[0],
+            "diameter": values[1],
+            "height": values[2],
+            "whole_weight": values[3],
+            "shucked_weight": values[4],
+            "viscera_weight": values[5],
+            "shell_weight": values[6],
+        }
+        for sex, values in zip(sexes, measurements.tolist())
+    ]
+
+
+def warm_up_worker(features_list: list[AbaloneFeatures], model=None) -> list:
+    """Run one synthetic batch in an inference worker.
+
+    Process workers get no model and load (and warm) their own copy. The model
+    version is not passed on, so synthetic rows never enter the prediction cache.
+    """
+    if model is None:
+        model = model_registry.get(revalidate=True).model
+    return run_batch_inference(features_list, model)
+
+
+async def warm_up_request_path(model=None):
+    """Send one synthetic batch of each warm-up size through the request path.
+
+    Each size is submitted once per inference worker, concurrently, so every
+    worker is started and has served a request before the instance is ready.
+    """
+    for size in config.warm_up_batch_sizes or [1]:
+        features_list = [
+            AbaloneFeatures.model_validate(sample) for sample in synthetic_samples(size)
+        ]
+        batches = await asyncio.gather(
+            *(
+                inference_pool.run(warm_up_worker, features_list, model)
+                for _ in range(inference_pool.max_workers)
+            )
+        )
+        BatchPredictionResponse(predictions=batches[0], count=size).model_dump_json()
+
+
+async def preload() -> bool:
+    """Load, warm and publish the model, then mark the instance ready.
+
+    A missing model doesn't prevent startup: the instance stays not ready
+    until a model is trained (POST /train) or loaded on first use.
+
+    Returns:
+        bool: Whether the instance is ready
+    """
+    try:
+        served = await asyncio.to_thread(model_registry.load_and_publish)
+    except FileNotFoundError as e:
+        logger.warning("No model preloaded, instance not ready: %s", e)
+        return False
+
+    start = time.perf_counter()
+    model = served.model if inference_pool.kind == "thread" else None
+    await warm_up_request_path(model)
+    model_registry.mark_ready()
+    logger.info(
+        "Model %s ready %.3fs after process start (load %.3fs, warm-up %.3fs, "
+        "request path warm-up %.3fs)",
+        served.version,
+        model_registry.ready_seconds,
+        served.load_seconds,
+        served.warm_up_seconds,
+        time.perf_counter() - start,
+    )
+    return True
+
+
+class FirstRequestTimer:
+    """ASGI middleware recording the latency of the first prediction request.
+
+    Times from the request's arrival until its response is fully sent, into
+    `model_registry.first_request_seconds`. Once that is recorded, it only
+    forwards calls.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            model_registry.first_request_seconds is not None
+            or scope["type"] != "http"
+            or not scope["path"].startswith("/predict")
+        ):
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        await self.app(scope, receive, send)
+        if model_registry.first_request_seconds is None:
+            model_registry.first_request_seconds = time.perf_counter() - start
+            logger.info(
+                "First prediction request served in %.3fs",
+                model_registry.first_request_seconds,
+            )
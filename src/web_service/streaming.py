@@ -0,0 +1,373 @@
+"""Streaming bulk prediction over NDJSON and CSV request bodies.
+
+The body is split into lines as it arrives and scored in chunks of
+`config.stream_chunk_size` rows, so memory stays flat however large the
+upload is. Each chunk is parsed, validated and predicted in one vectorized call
+inside the inference pool, and its results are sent back as soon as they are
+ready.
+
+Output rows carry the 0-based index of the input row. An invalid row produces
+an error record for that row instead of failing the whole stream.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import tempfile
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+from starlette.responses import StreamingResponse
+from .app_config import config
+from .executor import inference_pool
+from .inference import FEATURE_FIELDS, predict_matrix
+from .metrics import count_rows
+from .preprocessing import sex_code_table
+from .schemas import AbaloneFeatures
+
+# Request fields, in AbaloneFeatures order
+FIELDS = list(AbaloneFeatures.model_fields)
+NUMERIC_FIELDS = [field for field in FIELDS if field != "sex"]
+_get_fields = itemgetter(*FIELDS)
+_decode_json = json.JSONDecoder().decode
+
+# CSV headers may use the API field names or the training column names
+COLUMN_ALIASES = {"Sex": "sex", **FEATURE_FIELDS}
+
+MEDIA_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-seq": "ndjson",
+    "text/csv": "csv",
+}
+RESPONSE_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_OUTPUT_HEADER = "row,predicted_rings,predicted_age,error\r\n"
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """A StreamingResponse whose generator reads the request body.
+
+    Before ASGI 2.4, Starlette listens for client disconnects with `receive()`
+    while streaming, which would steal body messages from the generator. Here
+    the generator is the only reader; a disconnect surfaces as a
+    `ClientDisconnect` from the body stream or a failed send.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def stream_format(content_type: str) -> str | None:
+    """Map a request Content-Type to "ndjson" or "csv" (None if unsupported)."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return MEDIA_TYPES.get(media_type)
+
+
+def parse_csv_header(line: bytes) -> list:
+    """Map the columns of a CSV header line to request fields.
+
+    Unknown columns (e.g. Rings in the training data) map to None and are ignored.
+
+    Raises:
+        ValueError: If a feature column is missing
+    """
+    names = next(csv.reader([line.decode("utf-8-sig")]))
+    columns = [
+        name if name in FIELDS else COLUMN_ALIASES.get(name)
+        for name in (name.strip() for name in names)
+    ]
+    missing = [field for field in FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+    return columns
+
+
+def _parse_rows(lines: list, fmt: str, columns: list) -> tuple:
+    """Parse raw lines into rows of field values, in FIELDS order.
+
+    Returns:
+        tuple: (rows, {line position: error message} for unparseable lines)
+    """
+    rows = []
+    errors = {}
+    empty = [None] * len(FIELDS)
+
+    if fmt == "ndjson":
+        for i, line in enumerate(lines):
+            try:
+                record = _decode_json(line.decode("utf-8", "replace"))
+                rows.append(_get_fields(record))
+            except KeyError:
+                # Missing fields become None and fail validation with a reason
+                rows.append([record.get(field) for field in FIELDS])
+            except (ValueError, TypeError):
+                errors[i] = "Line is not a JSON object"
+                rows.append(empty)
+        return rows, errors
+
+    position = {field: columns.index(field) for field in FIELDS}
+    reader = csv.reader(line.decode("utf-8", "replace") for line in lines)
+    for i, values in enumerate(reader):
+        if len(values) != len(columns):
+            errors[i] = f"Expected {len(columns)} values, got {len(values)}"
+            rows.append(empty)
+        else:
+            rows.append([values[position[field]] for field in FIELDS])
+    return rows, errors
+
+
+def score_chunk(
+    lines: list,
+    fmt: str,
+    columns: list,
+    first_row: int,
+    model=None,
+    model_version: str = None,
+) -> bytes:
+    """Parse, validate and predict one chunk of lines, and serialize the results.
+
+    Runs in the inference pool. Values are validated with the same rules as
+    AbaloneFeatures (known sex, finite and strictly positive measurements), but
+    column by column instead of building one Pydantic model per row.
+
+    Args:
+        lines: Raw data lines (no header, no blank lines)
+        fmt: "ndjson" or "csv"
+        columns: Field of each CSV column (unused for NDJSON)
+        first_row: Index of the first line in the whole stream
+        model: Model to predict with (None: the worker's registry)
+        model_version: Version of `model`
+
+    Returns:
+        Encoded output records for the chunk, in input order
+    """
+    rows, errors = _parse_rows(lines, fmt, columns)
+    frame = pd.DataFrame(rows, columns=FIELDS, dtype=object)
+
+    numeric = (
+        frame[NUMERIC_FIELDS]
+        .apply(pd.to_numeric, errors="coerce")
+        .to_numpy(dtype=np.float64)
+    )
+    sex_codes = sex_code_table()
+    sex = frame["sex"].astype(str).map(sex_codes).to_numpy(dtype=np.float64)
+
+    valid = np.isfinite(numeric).all(axis=1) & (numeric > 0).all(axis=1)
+    valid &= ~np.isnan(sex)
+    valid[list(errors)] = False
+    for i in np.flatnonzero(~valid):
+        if i not in errors:
+            errors[i] = _describe_invalid(frame.iloc[i], numeric[i], sex_codes)
+
+    # Assemble the feature matrix of the valid rows in config.feature_columns order
+    fields = {"Sex_encoded": sex, **dict(zip(NUMERIC_FIELDS, numeric.T))}
+    X = np.empty((int(valid.sum()), len(config.feature_columns)), dtype=np.float64)
+    for j, column in enumerate(config.feature_columns):
+        X[:, j] = fields[FEATURE_FIELDS.get(column, column)][valid]
+
+    predictions, _ = predict_matrix(X, model, model_version) if len(X) else ([], None)
+    count_rows(len(lines))
+    return _format_results(first_row, valid, predictions, errors, fmt)
+
+
+def _describe_invalid(values: pd.Series, numeric: np.ndarray, sex_codes) -> str:
+    """Explain why a parsed row failed validation."""
+    if values["sex"] not in sex_codes:
+        return f"Invalid sex {values['sex']!r}, expected one of {sorted(sex_codes)}"
+    for field, value in zip(NUMERIC_FIELDS, numeric):
+        if not np.isfinite(value) or value <= 0:
+            return f"Invalid {field} {values[field]!r}, expected a number > 0"
+    return "Invalid row"
+
+
+def _format_results(
+    first_row: int, valid: np.ndarray, predictions: list, errors: dict, fmt: str
+) -> bytes:
+    """Serialize predictions and row errors in input order."""
+    out = []
+    predictions = iter(predictions)
+
+    if fmt == "ndjson":
+        for i, ok in enumerate(valid.tolist()):
+            row = first_row + i
+            if ok:
+                rings = next(predictions)
+                out.append(
+                    f'{{"row":{row},"predicted_rings":{round(rings, 2)},'
+                    f'"predicted_age":{round(rings + 1.5, 2)}}}\n'
+                )
+            else:
+                out.append(json.dumps({"row": row, "error": errors[i]}) + "\n")
+        return "".join(out).encode()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, ok in enumerate(valid.tolist()):
+        row = first_row + i
+        if ok:
+            rings = next(predictions)
+            writer.writerow([row, round(rings, 2), round(rings + 1.5, 2), ""])
+        else:
+            writer.writerow([row, "", "", errors[i]])
+    return buffer.getvalue().encode()
+
+
+def _format_stream_error(message: str, fmt: str) -> bytes:
+    """Serialize an error that ends the stream (not tied to a row)."""
+    if fmt == "ndjson":
+        return (json.dumps({"row": None, "error": message}) + "\n").encode()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["", "", "", message])
+    return buffer.getvalue().encode()
+
+
+class ResultSpool:
+    """FIFO of encoded results between the scoring task and the response.
+
+    Most HTTP clients send the whole body before reading the response. If
+    scoring waited for the client to read results, such a client would stop
+    reading once the socket buffers fill up while the server stops reading the
+    body, and both would wait forever. The spool never blocks the writer:
+    unread results go to a temporary file, not to memory, and the file is
+    rewound whenever the reader catches up.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._read_offset = 0
+        self._write_offset = 0
+        self._closed = False
+        self._available = asyncio.Event()
+
+    def write(self, data: bytes):
+        self._file.seek(self._write_offset)
+        self._file.write(data)
+        self._write_offset += len(data)
+        self._available.set()
+
+    def close(self):
+        """Mark the end of the results."""
+        self._closed = True
+        self._available.set()
+
+    async def read(self, max_bytes: int = 1 << 20):
+        """Yield results as they are written, until the spool is closed."""
+        try:
+            while True:
+                if self._read_offset < self._write_offset:
+                    self._file.flush()
+                    self._file.seek(self._read_offset)
+                    data = self._file.read(
+                        min(max_bytes, self._write_offset - self._read_offset)
+                    )
+                    self._read_offset += len(data)
+                    if self._read_offset == self._write_offset:
+                        self._read_offset = self._write_offset = 0
+                    yield data
+                elif self._closed:
+                    return
+                else:
+                    self._available.clear()
+                    await self._available.wait()
+        finally:
+            self._file.close()
+
+
+async def stream_predictions(body, fmt: str, model=None, model_version: str = None):
+    """Score a request body chunk by chunk, yielding encoded results.
+
+    The body is read and scored by a separate task that writes to a
+    `ResultSpool`, so it keeps going whether or not the client reads the
+    response concurrently.
+
+    Args:
+        body: Async iterator over the raw body (e.g. `request.stream()`)
+        fmt: "ndjson" or "csv"
+        model: Model to predict with (None: the worker's registry)
+        model_version: Version of `model`
+
+    Yields:
+        Encoded output records, one chunk at a time
+    """
+    spool = ResultSpool()
+    scoring = asyncio.ensure_future(_score_body(body, fmt, model, model_version, spool))
+    try:
+        async for data in spool.read():
+            yield data
+        await scoring  # Surface errors of the scoring task
+    finally:
+        scoring.cancel()
+
+
+async def _score_body(body, fmt: str, model, model_version: str, spool):
+    """Read the body, score full chunks and write their results to `spool`.
+
+    While a chunk is being scored in the inference pool, the next one is read
+    from the body, so at most two chunks are held at any time.
+    """
+    chunk_size = config.stream_chunk_size
+    max_line_bytes = config.stream_max_line_bytes
+    columns = None
+    lines = []
+    next_row = 0
+    pending = b""
+    scoring = None  # Task scoring the previous chunk
+
+    def score(lines, first_row):
+        return asyncio.ensure_future(
+            inference_pool.run(
+                score_chunk, lines, fmt, columns, first_row, model, model_version
+            )
+        )
+
+    if fmt == "csv":
+        spool.write(CSV_OUTPUT_HEADER.encode())
+
+    try:
+        async for data in body:
+            *complete, pending = (pending + data).split(b"\n")
+            for line in complete:
+                if not line.strip():
+                    continue
+                if fmt == "csv" and columns is None:
+                    try:
+                        columns = parse_csv_header(line)
+                    except ValueError as e:
+                        spool.write(_format_stream_error(str(e), fmt))
+                        return
+                    continue
+
+                lines.append(line)
+                if len(lines) == chunk_size:
+                    previous, scoring = scoring, score(lines, next_row)
+                    next_row += len(lines)
+                    lines = []
+                    if previous is not None:
+                        spool.write(await previous)
+
+            if len(pending) > max_line_bytes:
+                if scoring is not None:
+                    spool.write(await scoring)
+                    scoring = None
+                spool.write(
+                    _format_stream_error(
+                        f"Line {next_row + len(lines)} exceeds {max_line_bytes} bytes",
+                        fmt,
+                    )
+                )
+                return
+
+        if pending.strip() and not (fmt == "csv" and columns is None):
+            lines.append(pending)
+        if scoring is not None:
+            spool.write(await scoring)
+            scoring = None
+        if lines:
+            spool.write(await score(lines, next_row))
+    finally:
+        if scoring is not None:
+            scoring.cancel()
+        spool.close()
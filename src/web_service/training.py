@@ -0,0 +1,118 @@
+"""Training function used by the /train endpoint.
+
+Kept at module level (and free of FastAPI objects) so it can run in a thread or
+a separate worker process.
+"""
+
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from .app_config import config
+from src.modelling.artifacts import save_pickle_atomic
+from src.modelling.compiled_forest import export_compiled_forest
+from .preprocessing import prepare_training_data
+
+
+HYPERPARAMETERS = (
+    "n_estimators",
+    "max_depth",
+    "min_samples_split",
+    "min_samples_leaf",
+    "random_state",
+)
+
+
+def search_best_model(X_train, y_train, X_test, y_test, params: dict) -> tuple:
+    """Run the successive-halving search requested in `params`.
+
+    Returns:
+        tuple: (best model, summary shaped like SearchSummary)
+    """
+    # Imported here: the search module pulls in MLflow and Prefect
+    from src.modelling.search import make_candidates, successive_halving
+
+    base_params = {key: params[key] for key in HYPERPARAMETERS}
+    candidates = make_candidates(
+        "halving", params.get("param_grid"), base_params=base_params
+    )
+    best_model, results, summary = successive_halving(
+        X_train,
+        y_train,
+        X_test,
+        y_test,
+        candidates,
+        factor=params.get("halving_factor", 3),
+        resource=params.get("halving_resource", "samples"),
+        random_state=params["random_state"],
+    )
+    rung_keys = ("rung", "budget", "n_candidates", "cpu_seconds", "best_mse")
+    return best_model, {
+        "best_params": results[0]["params"],
+        "n_candidates": summary["n_candidates"],
+        "n_fits": summary["n_fits"],
+        "rungs": [{key: rung[key] for key in rung_keys} for rung in summary["rungs"]],
+        "cpu_seconds": summary["cpu_seconds"],
+        "estimated_exhaustive_cpu_seconds": summary["estimated_exhaustive_cpu_seconds"],
+        "cpu_seconds_saved": summary["cpu_seconds_saved"],
+    }
+
+
+def train_and_save(params: dict) -> dict:
+    """Train a Random Forest on the configured data and save it to disk.
+
+    With `params["search"] == "halving"`, the model saved is the winner of a
+    successive-halving search instead of one fit of the given hyperparameters.
+
+    Args:
+        params: Hyperparameters (the fields of a TrainingRequest)
+
+    Returns:
+        Dictionary with the saved model path, the number of training samples,
+        the held-out metrics, the fit (or search) duration and the search
+        summary
+    """
+    # Load and preprocess data using unified preprocessing
+    X, y, encoder = prepare_training_data(config.data_path)
+
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    start = time.perf_counter()
+    search = None
+    if params.get("search") == "halving":
+        rf, search = search_best_model(X_train, y_train, X_test, y_test, params)
+        rf.n_jobs = -1
+    else:
+        # Train model with custom parameters
+        rf = RandomForestRegressor(
+            **{key: params[key] for key in HYPERPARAMETERS}, n_jobs=-1
+        )
+        rf.fit(X_train, y_train)
+    training_seconds = time.perf_counter() - start
+
+    # Evaluate on the held-out split
+    y_pred = rf.predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+
+    # Save model (atomically: the server may be reading the previous one)
+    model_path = config.model_path
+    save_pickle_atomic(rf, model_path)
+
+    # Export the flat array form used by the compiled serving backend
+    export_compiled_forest(rf, model_path, config.compiled_model_path)
+
+    return {
+        "model_path": str(model_path),
+        "training_samples": len(X_train),
+        "training_seconds": training_seconds,
+        "metrics": {
+            "mse": float(mse),
+            "rmse": float(np.sqrt(mse)),
+            "r2_score": float(r2_score(y_test, y_pred)),
+        },
+        "search": search,
+    }
@@ -9,7 +9,9 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from pathlib import Path
 from typing import Dict, Any
+from src.modelling.dataset import load_dataset
 
 # Configuration de la page
 st.set_page_config(
@@ -48,7 +50,7 @@ def make_prediction(data: Dict[str, Any]) -> Dict[str, Any]:
 def load_sample_data() -> pd.DataFrame:
     """Charger des données d'exemple pour la démonstration"""
     try:
-        df = pd.read_csv("data/abalone.csv")
+        df = load_dataset(Path("data/abalone.csv"))
         return df.sample(n=min(100, len(df)))  # Échantillon de 100 lignes max
     except FileNotFoundError:
         st.warning("Fichier de données non trouvé. Utilisation de données simulées.")
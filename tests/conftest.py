@@ -0,0 +1,53 @@
+"""
+Fixtures partagées : petit modèle entraîné sur le vrai jeu de données
+"""
+
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter la racine du projet au path
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def preprocessing_cache_dir(tmp_path, monkeypatch):
+    """Caches de preprocessing et de données isolés par test (jamais ceux du dépôt)"""
+    from src.modelling import dataset
+    from src.modelling.cache import preprocessing_cache
+
+    monkeypatch.setattr(preprocessing_cache, "directory", tmp_path / "cache")
+    monkeypatch.setattr(dataset, "DATASET_CACHE_DIR", tmp_path / "datasets")
+    return preprocessing_cache.directory
+
+
+@pytest.fixture
+def trained_artifacts(tmp_path, monkeypatch):
+    """Entraîne un petit modèle et redirige la configuration vers ses fichiers"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.web_service.app_config import config
+    from src.web_service.preprocessing import (
+        clear_encoder_cache,
+        prepare_training_data,
+    )
+
+    model_path = tmp_path / "model.pkl"
+    encoder_path = tmp_path / "label_encoder.pkl"
+    monkeypatch.setattr(config, "model_path", model_path)
+    monkeypatch.setattr(config, "encoder_path", encoder_path)
+    monkeypatch.setattr(config, "compiled_model_path", tmp_path / "compiled_forest")
+    clear_encoder_cache()
+
+    X, y, _ = prepare_training_data(ROOT / "data" / "abalone.csv")
+    model = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=42)
+    model.fit(X, y)
+    with open(model_path, "wb") as f:
+        pickle.dump(model, f)
+
+    yield model
+
+    clear_encoder_cache()
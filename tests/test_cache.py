@@ -0,0 +1,62 @@
+"""
+Tests du cache disque du preprocessing (clé de contenu, éviction)
+"""
+
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.modelling.cache import FrameCache, preprocessing_cache
+from src.modelling.preprocessing import prepare_data
+
+ROOT_DATA = "data/abalone.csv"
+
+
+def test_frame_cache_round_trip_and_eviction(tmp_path):
+    """Test du cache : relecture fidèle, puis éviction du moins récent"""
+    cache = FrameCache(tmp_path, max_bytes=10**9)
+    frame = pd.DataFrame(
+        {"Sex": ["M", "F", "I"], "Length": [0.5, 0.4, 0.3], "Rings": [9, 8, 7]},
+        index=[10, 3, 7],
+    )
+    series = pd.Series([1.5, 2.5], name="Rings")
+
+    assert cache.get("a") is None
+    cache.put("a", (frame, series))
+    cached_frame, cached_series = cache.get("a")
+    pd.testing.assert_frame_equal(cached_frame, frame)
+    pd.testing.assert_series_equal(cached_series, series)
+
+    # Limite juste au-dessus d'une entrée : la plus ancienne est évincée
+    cache.max_bytes = sum(p.stat().st_size for p in (tmp_path / "a").iterdir()) + 1
+    cache.put("b", frame)
+    assert cache.get("a") is None
+    pd.testing.assert_frame_equal(cache.get("b"), frame)
+
+
+def test_prepare_data_skips_stages_when_cached(tmp_path, monkeypatch):
+    """Test du flow : le second appel relit les splits sans relire le CSV"""
+    monkeypatch.setattr(preprocessing_cache, "max_bytes", 10**9)
+    trainset = tmp_path / "abalone.csv"
+    shutil.copy(ROOT_DATA, trainset)
+
+    first = prepare_data.fn(trainset)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV read again")
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, "read_csv", fail)
+        second = prepare_data.fn(trainset)
+        for expected, cached in zip(first, second):
+            pd.testing.assert_frame_equal(cached, expected)
+
+        # Le contenu du fichier fait partie de la clé
+        with open(trainset, "a") as f:
+            f.write("M,0.5,0.4,0.1,0.5,0.2,0.1,0.15,10\n")
+        with pytest.raises(AssertionError, match="CSV read again"):
+            prepare_data.fn(trainset)
+
+    X_train, X_test, _, _ = prepare_data.fn(trainset)
+    assert len(X_train) + len(X_test) == len(first[0]) + len(first[1]) + 1
@@ -0,0 +1,48 @@
+"""
+Tests de la forêt compilée en tableaux plats
+"""
+
+import numpy as np
+
+from src.web_service.app_config import config
+from src.modelling.compiled_forest import CompiledForest, export_compiled_forest
+from src.web_service.registry import ModelRegistry
+
+
+def test_compiled_forest_matches_sklearn(trained_artifacts):
+    """Test de parité des prédictions avec sklearn (à 1e-9 près)"""
+    rng = np.random.default_rng(0)
+    X = np.column_stack(
+        [rng.integers(0, 3, 500), rng.uniform(0.0, 1.2, size=(500, 7))]
+    ).astype(np.float64)
+
+    compiled = CompiledForest.from_sklearn(trained_artifacts)
+
+    assert compiled.n_trees == len(trained_artifacts.estimators_)
+    np.testing.assert_allclose(
+        compiled.predict(X), trained_artifacts.predict(X), rtol=0, atol=1e-9
+    )
+    np.testing.assert_allclose(
+        compiled.predict(X[:1]), trained_artifacts.predict(X[:1]), rtol=0, atol=1e-9
+    )
+
+
+def test_compiled_backend_serves_exported_forest(trained_artifacts, monkeypatch):
+    """Test du backend compilé : export mmap relu, même version que le pickle"""
+    sklearn_version = ModelRegistry().get().version
+    exported_version = export_compiled_forest(
+        trained_artifacts, config.model_path, config.compiled_model_path
+    )
+    assert exported_version == sklearn_version
+
+    monkeypatch.setattr(config, "model_backend", "compiled")
+    served = ModelRegistry().get()
+
+    assert isinstance(served.model, CompiledForest)
+    assert served.version == sklearn_version
+    # Les tableaux sont projetés en mémoire (mmap), pas copiés
+    assert isinstance(served.model.threshold.base, np.memmap)
+    X = np.array([[0, 0.455, 0.365, 0.095, 0.514, 0.2245, 0.101, 0.15]])
+    np.testing.assert_allclose(
+        served.model.predict(X), trained_artifacts.predict(X), rtol=0, atol=1e-9
+    )
@@ -0,0 +1,63 @@
+"""
+Tests de la copie colonnaire typée du jeu de données
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modelling import dataset
+from src.modelling.dataset import load_dataset
+
+ROOT_DATA = "data/abalone.csv"
+
+
+def test_load_dataset_types_and_values():
+    """Test des types explicites : catégorie, float32 sans perte, int16"""
+    df = load_dataset(ROOT_DATA)
+    raw = pd.read_csv(ROOT_DATA)
+
+    assert isinstance(df["Sex"].dtype, pd.CategoricalDtype)
+    assert list(df["Sex"].cat.categories) == ["F", "I", "M"]
+    assert df["Rings"].dtype == np.int16
+    assert (df[dataset.MEASUREMENT_COLUMNS].dtypes == np.float32).all()
+
+    assert list(df.columns) == list(raw.columns)
+    assert (df["Sex"].astype(str) == raw["Sex"]).all()
+    np.testing.assert_allclose(
+        df[dataset.MEASUREMENT_COLUMNS].to_numpy(np.float64),
+        raw[dataset.MEASUREMENT_COLUMNS].to_numpy(),
+        rtol=1e-6,
+    )
+
+
+def test_load_dataset_converts_only_when_csv_changes(tmp_path, monkeypatch):
+    """Test de la reconversion : ni au rechargement ni au simple touch"""
+    csv_path = tmp_path / "abalone.csv"
+    shutil.copy(ROOT_DATA, csv_path)
+    conversions = []
+    read_csv_typed = dataset.read_csv_typed
+    monkeypatch.setattr(
+        dataset,
+        "read_csv_typed",
+        lambda path: conversions.append(path) or read_csv_typed(path),
+    )
+
+    first = load_dataset(csv_path)
+    load_dataset(csv_path)
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    load_dataset(csv_path)
+    assert len(conversions) == 1
+
+    with open(csv_path, "a") as f:
+        f.write("M,0.5,0.4,0.1,0.5,0.2,0.1,0.15,10\n")
+    assert len(load_dataset(csv_path)) == len(first) + 1
+    assert len(conversions) == 2
+
+    assert list(load_dataset(csv_path, columns=["Rings"]).columns) == ["Rings"]
+    with pytest.raises(FileNotFoundError):
+        load_dataset(tmp_path / "missing.csv")
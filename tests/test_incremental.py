@@ -0,0 +1,117 @@
+"""
+Tests du réentraînement incrémental (nouvelles lignes, dérive, warm start)
+"""
+
+import pickle
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.modelling import incremental
+from src.modelling.incremental import (
+    bin_counts,
+    detect_new_data,
+    drift_reference,
+    encode_features,
+    population_stability,
+)
+
+ROOT_DATA = Path(__file__).parent.parent / "data" / "abalone.csv"
+
+
+@pytest.fixture
+def abalone():
+    return pd.read_csv(ROOT_DATA)
+
+
+def test_detect_new_data_high_water_mark(tmp_path, abalone):
+    """Test de la détection : lignes ajoutées, fichiers déposés, réécritures"""
+    trainset = tmp_path / "abalone.csv"
+    data_dir = tmp_path / "incoming"
+    data_dir.mkdir()
+    abalone.iloc[:100].to_csv(trainset, index=False)
+
+    df, sources, reason = detect_new_data(trainset, data_dir)
+    assert len(df) == 100 and reason is None
+
+    # Ajout de 20 lignes et d'une ligne incomplète (encore en cours d'écriture)
+    with open(trainset, "a") as f:
+        f.write(abalone.iloc[100:120].to_csv(index=False, header=False))
+        f.write("M,0.5,0.4")
+    abalone.iloc[120:130].to_csv(data_dir / "batch-1.csv", index=False)
+
+    df, sources, reason = detect_new_data(trainset, data_dir, {"sources": sources})
+    assert reason is None
+    assert len(df) == 30
+    pd.testing.assert_frame_equal(df, abalone.iloc[100:130].reset_index(drop=True))
+
+    df, _, reason = detect_new_data(trainset, data_dir, {"sources": sources})
+    assert len(df) == 0 and reason is None
+
+    abalone.iloc[1:100].to_csv(trainset, index=False)
+    _, _, reason = detect_new_data(trainset, data_dir, {"sources": sources})
+    assert "rewritten" in reason
+
+
+def test_population_stability_detects_shift(abalone):
+    """Test de l'indice de stabilité : faible sans dérive, élevé avec"""
+    X, y = encode_features(abalone)
+    df = X.assign(Rings=y)
+    edges = drift_reference(df.iloc[:3000])
+    reference = bin_counts(df.iloc[:3000], edges)
+
+    stable = population_stability(reference, bin_counts(df.iloc[3000:], edges))
+    shifted = df.iloc[3000:].assign(Rings=lambda d: d["Rings"] + 5)
+    drifted = population_stability(reference, bin_counts(shifted, edges))
+
+    assert max(stable.values()) < 0.1
+    assert drifted["Rings"] > 0.25
+
+
+def test_incremental_training_warm_starts_then_retrains_on_drift(
+    tmp_path, abalone, monkeypatch
+):
+    """Test du flow : entraînement complet, ajout d'arbres, puis dérive"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.modelling.training import save_model
+
+    # Entraînement complet sans serveur MLflow
+    def train(X, y, X_test=None, y_test=None, savepath=None, **params):
+        rf = RandomForestRegressor(**params).fit(X, y)
+        save_model(rf, savepath)
+        return rf
+
+    monkeypatch.setattr(incremental, "train", train)
+    trainset = tmp_path / "abalone.csv"
+    abalone.iloc[:3000].to_csv(trainset, index=False)
+    options = {
+        "trainset_path": trainset,
+        "data_dir": tmp_path / "incoming",
+        "savepath": tmp_path,
+        "params": {"n_estimators": 20, "max_depth": 6},
+    }
+
+    result = incremental.incremental_training.fn(**options)
+    assert result["mode"] == "full" and result["n_rows"] == 3000
+    assert result["n_estimators"] == 20
+
+    with open(trainset, "a") as f:
+        f.write(abalone.iloc[3000:3600].to_csv(index=False, header=False))
+    result = incremental.incremental_training.fn(**options)
+    assert result["mode"] == "incremental"
+    assert result["new_rows"] == 600
+    assert result["n_estimators"] == 20 + 10  # au moins min_extra_trees
+    with open(tmp_path / "model.pkl", "rb") as f:
+        assert len(pickle.load(f).estimators_) == 30
+
+    assert incremental.incremental_training.fn(**options)["mode"] == "skipped"
+
+    shifted = abalone.iloc[3600:4177].assign(Rings=lambda d: d["Rings"] + 8)
+    with open(trainset, "a") as f:
+        f.write(shifted.to_csv(index=False, header=False))
+    result = incremental.incremental_training.fn(**options)
+    assert result["mode"] == "full"
+    assert "drift on Rings" in result["reason"]
+    assert result["n_rows"] == 4177 and result["n_estimators"] == 20
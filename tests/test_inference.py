@@ -0,0 +1,144 @@
+"""
+Tests du chemin d'inférence (unitaire et par lot)
+"""
+
+import warnings
+
+import numpy as np
+
+from src.web_service.app_config import config
+from src.web_service.inference import (
+    PredictionCache,
+    features_to_matrix,
+    prepare_features,
+    prepare_features_frame,
+    run_batch_inference,
+    run_inference,
+)
+from src.web_service.schemas import AbaloneFeatures
+
+
+def _samples(n: int, seed: int = 0) -> list[AbaloneFeatures]:
+    rng = np.random.default_rng(seed)
+    return [
+        AbaloneFeatures(
+            sex=rng.choice(["M", "F", "I"]),
+            length=rng.uniform(0.1, 0.8),
+            diameter=rng.uniform(0.1, 0.7),
+            height=rng.uniform(0.01, 0.3),
+            whole_weight=rng.uniform(0.1, 2.0),
+            shucked_weight=rng.uniform(0.05, 1.0),
+            viscera_weight=rng.uniform(0.01, 0.5),
+            shell_weight=rng.uniform(0.01, 0.5),
+        )
+        for _ in range(n)
+    ]
+
+
+def test_feature_matrix_matches_dataframe_path(trained_artifacts):
+    """Test de la matrice vectorisée contre le preprocessing DataFrame"""
+    samples = _samples(25)
+
+    X = features_to_matrix(samples)
+
+    assert X.dtype == np.float64
+    assert X.flags["C_CONTIGUOUS"]
+    expected = np.vstack([prepare_features_frame(f).to_numpy() for f in samples])
+    np.testing.assert_array_equal(X, expected)
+
+
+def test_single_sample_fast_path_matches_dataframe_path(trained_artifacts):
+    """Test de parité du chemin rapide sans pandas contre le chemin DataFrame"""
+    for features in _samples(25, seed=1):
+        row = prepare_features(features)
+        frame = prepare_features_frame(features)
+
+        assert row.shape == (1, 8)
+        assert row.dtype == np.float64
+        assert list(frame.columns) == config.feature_columns
+        np.testing.assert_array_equal(row, frame.to_numpy(dtype=np.float64))
+        np.testing.assert_array_equal(
+            trained_artifacts.predict(row), trained_artifacts.predict(frame)
+        )
+
+
+def test_batch_inference_matches_per_row(trained_artifacts):
+    """Test de la parité entre l'inférence par lot et ligne par ligne"""
+    samples = _samples(50)
+
+    batch = run_batch_inference(samples, model=trained_artifacts)
+    per_row = [run_inference(f, model=trained_artifacts) for f in samples]
+
+    assert [p.model_dump() for p in batch] == [p.model_dump() for p in per_row]
+
+
+def test_registry_publish_is_atomic_swap(trained_artifacts):
+    """Test du registre : chargement unique, version stable, publication atomique"""
+    from src.web_service.registry import ModelRegistry
+
+    registry = ModelRegistry()
+    first = registry.get()
+    assert registry.get() is first
+    assert registry.get(revalidate=True) is first
+    assert len(first.version) == 12
+
+    # Le modèle servi prend des matrices NumPy sans avertissement de sklearn
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        first.model.predict(np.zeros((1, len(config.feature_columns))))
+
+    # Un modèle republié remplace la version servie d'un seul coup
+    held = registry.current
+    republished = registry.load_and_publish()
+    assert registry.current is republished
+    assert held.model is first.model
+    assert republished.version == first.version  # même fichier, même version
+
+
+def test_prediction_cache_lru_ttl_and_quantization():
+    """Test du cache de prédictions : quantification, LRU, expiration"""
+    cache = PredictionCache(max_entries=2, ttl_seconds=60, decimals=3)
+    X = np.array([[0.0, 0.1234], [-0.0, 0.12341], [1.0, 0.5]])
+
+    keys = cache.keys(X, "v1")
+    assert keys[0] == keys[1]  # -0.0 et 0.0, écart sous la quantification
+    assert keys[0] != cache.keys(X[:1], "v2")[0]  # la version fait partie de la clé
+
+    cache.store(keys[:1], [7.0])
+    values, missing = cache.lookup(keys)
+    assert values[:2] == [7.0, 7.0] and missing == [2]
+
+    cache.store(keys[2:], [9.0])
+    cache.store(cache.keys(X[:1] + 5, "v1"), [3.0])  # évince l'entrée la plus ancienne
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.lookup(keys[:1])[1] == [0]
+
+    expired = PredictionCache(max_entries=10, ttl_seconds=1e-9, decimals=3)
+    expired.store(keys[:1], [7.0])
+    assert expired.lookup(keys[:1])[1] == [0]
+
+
+def test_prediction_cache_serves_repeats_and_flushes_on_publish(trained_artifacts):
+    """Test du cache branché sur l'inférence et vidé à la publication d'un modèle"""
+    from src.web_service.inference import prediction_cache
+    from src.web_service.registry import model_registry
+
+    samples = _samples(20, seed=3)
+    served = model_registry.load_and_publish()
+    assert len(prediction_cache) == 0
+
+    hits = prediction_cache.hits
+    first = run_batch_inference(samples, served.model, served.version)
+    again = run_batch_inference(samples[:10], served.model, served.version)
+    single = run_inference(samples[0], served.model, served.version)
+
+    assert prediction_cache.hits - hits == 11
+    assert again == first[:10] and single == first[0]
+    uncached = run_batch_inference(samples, model=trained_artifacts)
+    assert [p.model_dump() for p in first] == [
+        dict(p.model_dump(), model_version=served.version) for p in uncached
+    ]
+
+    model_registry.load_and_publish()
+    assert len(prediction_cache) == 0
+    model_registry.clear()
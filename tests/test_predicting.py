@@ -0,0 +1,53 @@
+"""
+Tests du scoring hors ligne par blocs (src/modelling/predicting.py)
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.modelling.predicting import predict, score_file
+from src.web_service.app_config import config
+
+
+def test_predict_loads_model_from_path(trained_artifacts, tmp_path):
+    """Test de predict avec un chemin de sauvegarde (fichier ou dossier)"""
+    X = np.random.default_rng(0).uniform(0.1, 1.0, size=(5, 8))
+    expected = trained_artifacts.predict(X)
+
+    np.testing.assert_array_equal(predict(X, savepath=config.model_path), expected)
+    np.testing.assert_array_equal(predict(X, savepath=tmp_path), expected)
+
+
+def test_score_file_in_chunks(trained_artifacts, tmp_path):
+    """Test du scoring d'un CSV par blocs vers Parquet, lignes invalides nulles"""
+    from src.web_service.preprocessing import prepare_training_data
+
+    data = pd.read_csv(config.data_path).head(250)
+    data.loc[7, "Sex"] = "X"
+    data.loc[120, "Length"] = None
+    # Types qui varient d'un bloc à l'autre : même schéma pour tous les blocs
+    data.loc[230, "Rings"] = None
+    data["comment"] = None
+    data.loc[230, "comment"] = "checked"
+    input_path = tmp_path / "input.csv"
+    data.to_csv(input_path, index=False)
+    output_path = tmp_path / "scored.parquet"
+
+    stats = score_file(input_path, output_path, chunk_size=100, workers=1)
+
+    assert stats["rows"] == 250 and stats["unscored_rows"] == 2
+    assert stats["rows_per_second"] > 0
+    assert pq.ParquetFile(output_path).metadata.num_row_groups == 3
+
+    scored = pd.read_parquet(output_path)
+    assert list(scored.columns) == list(data.columns) + [
+        "predicted_rings",
+        "predicted_age",
+    ]
+    valid = scored["predicted_rings"].notna()
+    assert not valid[7] and not valid[120]
+
+    X, _, _ = prepare_training_data(config.data_path)
+    expected = trained_artifacts.predict(X.head(250))[valid.to_numpy()]
+    np.testing.assert_allclose(scored["predicted_rings"][valid], expected)
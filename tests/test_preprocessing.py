@@ -0,0 +1,65 @@
+"""
+Tests du preprocessing unifié (entraînement et inférence)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Ajouter la racine du projet au path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.web_service.preprocessing import (  # noqa: E402
+    clear_encoder_cache,
+    load_label_encoder,
+    preprocess_data,
+)
+
+
+def _raw_data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Sex": ["M", "F", "I", "M", "F", "I"],
+            "Length": [0.5, 0.6, 0.4, 0.55, 0.65, 0.3],
+            "Diameter": [0.4, 0.5, 0.3, 0.45, 0.55, 0.2],
+            "Height": [0.15, 0.2, 0.1, 0.18, 0.22, 0.07],
+            "Whole weight": [0.8, 1.0, 0.6, 0.9, 1.1, 0.3],
+            "Shucked weight": [0.3, 0.4, 0.2, 0.35, 0.45, 0.1],
+            "Viscera weight": [0.15, 0.2, 0.1, 0.18, 0.22, 0.05],
+            "Shell weight": [0.2, 0.25, 0.15, 0.23, 0.28, 0.08],
+            "Rings": [15, 18, 12, 16, 20, 6],
+        }
+    )
+
+
+def test_label_encoder_cache(tmp_path):
+    """Test du cache de l'encodeur : chargé une fois, invalidé à la réécriture"""
+    clear_encoder_cache()
+    encoder_path = tmp_path / "label_encoder.pkl"
+
+    _, fitted = preprocess_data(
+        _raw_data(), fit_encoder=True, encoder_path=encoder_path
+    )
+
+    # L'encodeur fraîchement entraîné est servi depuis le cache
+    assert load_label_encoder(encoder_path) is fitted
+
+    # Après vidage du cache, un seul chargement depuis le disque
+    clear_encoder_cache()
+    first = load_label_encoder(encoder_path)
+    assert load_label_encoder(encoder_path) is first
+
+    # Le fichier est supprimé : le cache évite toute lecture disque
+    os.unlink(encoder_path)
+    assert load_label_encoder(encoder_path) is first
+
+    # Un nouvel entraînement remplace l'entrée du cache
+    _, refitted = preprocess_data(
+        _raw_data(), fit_encoder=True, encoder_path=encoder_path
+    )
+    assert load_label_encoder(encoder_path) is refitted
+    assert load_label_encoder(encoder_path, revalidate=True) is refitted
+
+    clear_encoder_cache()
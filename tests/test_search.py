@@ -0,0 +1,132 @@
+"""
+Tests de la recherche d'hyperparamètres en parallèle
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modelling.parallel_fit import SharedArrays
+from src.modelling.search import (
+    halving_rungs,
+    make_candidates,
+    run_search,
+    successive_halving,
+)
+
+ROOT_DATA = "data/abalone.csv"
+
+
+def test_make_candidates_grid_and_random():
+    """Test des candidats : grille complète ou tirage aléatoire"""
+    grid = {"n_estimators": [5, 10], "max_depth": [2, 4, None]}
+
+    assert len(make_candidates("grid", grid)) == 6
+    random = make_candidates("random", grid, n_iter=4)
+    assert len(random) == 4
+    assert all(c["min_samples_leaf"] == 2 for c in random)  # valeurs par défaut
+
+
+def test_shared_arrays_round_trip():
+    """Test de la mémoire partagée : vues identiques et en lecture seule"""
+    arrays = {"X": np.arange(12.0).reshape(4, 3), "y": np.arange(3, dtype=np.int32)}
+
+    with SharedArrays(arrays) as shared:
+        shm, attached = SharedArrays.attach(shared.spec)
+        np.testing.assert_array_equal(attached["X"], arrays["X"])
+        np.testing.assert_array_equal(attached["y"], arrays["y"])
+        assert not attached["X"].flags.writeable
+        del attached
+        shm.close()
+
+
+def test_run_search_picks_best_on_held_out_split():
+    """Test de la recherche : meilleur candidat sur le jeu de test, modèle fidèle"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.modelling.preprocessing import encode_sex, splitting_data
+
+    df = encode_sex.fn(pd.read_csv(ROOT_DATA))
+    X_train, X_test, y_train, y_test = splitting_data.fn(df)
+    candidates = make_candidates("grid", {"n_estimators": [3, 6], "max_depth": [3, 6]})
+
+    best_model, results = run_search(
+        X_train, y_train, X_test, y_test, candidates, workers=2
+    )
+
+    assert len(results) == 4
+    assert results[0]["mse"] == min(r["mse"] for r in results)
+    assert all(r["wall_seconds"] >= r["fit_seconds"] > 0 for r in results)
+
+    refit = RandomForestRegressor(**results[0]["params"])
+    refit.fit(X_train, y_train.to_numpy().ravel())
+    np.testing.assert_array_equal(best_model.predict(X_test), refit.predict(X_test))
+    assert list(best_model.feature_names_in_) == list(X_train.columns)
+
+
+def test_halving_rungs():
+    """Test du calendrier : budgets croissants, dernier palier complet"""
+    assert halving_rungs(36, 3341, factor=3) == [1 / 27, 1 / 9, 1 / 3, 1]
+    assert halving_rungs(36, 1000, factor=3, min_samples=100) == [1 / 9, 1 / 3, 1]
+    assert halving_rungs(2, 3341, factor=3) == [1]
+
+
+def test_successive_halving_eliminates_and_reports_savings():
+    """Test de la recherche par paliers : éliminations et CPU économisé"""
+    from src.modelling.preprocessing import encode_sex, splitting_data
+
+    df = encode_sex.fn(pd.read_csv(ROOT_DATA))
+    X_train, X_test, y_train, y_test = splitting_data.fn(df)
+    candidates = make_candidates(
+        "halving", {"n_estimators": [4, 8, 12], "max_depth": [2, 4, 8]}
+    )
+
+    best_model, results, summary = successive_halving(
+        X_train, y_train, X_test, y_test, candidates, factor=3, workers=2
+    )
+
+    assert [rung["n_candidates"] for rung in summary["rungs"]] == [9, 3, 1]
+    assert summary["n_fits"] == 13
+    assert results[0]["n_samples"] == len(X_train)
+    assert summary["rungs"][0]["budget"] == 1 / 9
+    # Sur des forêts minuscules, l'économie elle-même n'est pas garantie
+    assert (
+        summary["estimated_exhaustive_cpu_seconds"]
+        > summary["rungs"][-1]["cpu_seconds"]
+    )
+    assert summary["cpu_seconds_saved"] == pytest.approx(
+        max(0.0, summary["estimated_exhaustive_cpu_seconds"] - summary["cpu_seconds"])
+    )
+    assert best_model.get_params()["max_depth"] == results[0]["params"]["max_depth"]
+    assert len(best_model.estimators_) == results[0]["params"]["n_estimators"]
+
+    # Petite grille : les premiers paliers coûtent plus qu'ils n'économisent
+    _, _, summary = successive_halving(
+        X_train, y_train, X_test, y_test, candidates[:4], factor=2, workers=2
+    )
+    assert summary["cpu_seconds_saved"] >= 0
+
+
+def test_training_pipeline_returns_structured_result(tmp_path, monkeypatch):
+    """Test du flow d'entraînement : métriques, chemin du modèle et durées"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.modelling import main as pipeline
+    from src.modelling.training import save_model
+
+    # Entraînement sans serveur MLflow
+    def train(X, y, savepath=None, **params):
+        rf = RandomForestRegressor(n_estimators=5, random_state=42)
+        rf.fit(X, y.to_numpy().ravel())
+        save_model(rf, savepath)
+        return rf
+
+    monkeypatch.setattr(pipeline, "train", train)
+    result = pipeline.main.fn(ROOT_DATA, savepath=str(tmp_path))
+
+    assert result["model_path"] == str(tmp_path / "model.pkl")
+    assert (tmp_path / "model.pkl").exists()
+    assert set(result["metrics"]) == {"mse", "rmse", "r2_score"}
+    assert result["training_samples"] + result["test_samples"] == 4177
+    assert set(result["stage_seconds"]) == {"prepare_data", "train", "evaluate"}
+    assert result["total_seconds"] >= sum(result["stage_seconds"].values())
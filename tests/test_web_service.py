@@ -0,0 +1,426 @@
+"""
+Tests de bout en bout de l'application FastAPI
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+SAMPLE = {
+    "sex": "M",
+    "length": 0.455,
+    "diameter": 0.365,
+    "height": 0.095,
+    "whole_weight": 0.514,
+    "shucked_weight": 0.2245,
+    "viscera_weight": 0.101,
+    "shell_weight": 0.15,
+}
+
+
+@pytest.fixture
+def client(trained_artifacts):
+    """Client de test sur un modèle fraîchement entraîné"""
+    from src.web_service import main
+    from src.web_service.registry import model_registry
+
+    model_registry.clear()
+    with TestClient(main.app) as test_client:
+        yield test_client
+    model_registry.clear()
+
+
+def test_predict_runs_in_worker_pool(client):
+    """Test de la prédiction exécutée hors de la boucle d'événements"""
+    from src.web_service.executor import inference_pool
+
+    submitted = inference_pool.submitted
+
+    single = client.post("/predict", json=SAMPLE)
+    batch = client.post("/predict/batch", json={"samples": [SAMPLE, SAMPLE]})
+
+    assert single.status_code == 200
+    assert batch.status_code == 200
+    assert batch.json()["count"] == 2
+    assert batch.json()["predictions"][0] == single.json()
+    assert single.json()["model_version"] is not None
+    assert inference_pool.submitted == submitted + 2
+
+    metrics = client.get("/metrics/executor").json()
+    pools = {pool["name"]: pool for pool in metrics["pools"]}
+    assert pools["inference"]["in_flight"] == 0
+    assert pools["inference"]["completed"] >= 2
+    assert pools["training"]["max_workers"] == 1
+
+    # Les deux prédictions identiques du lot viennent du cache
+    cache = client.get("/metrics/cache").json()
+    assert cache["enabled"] and cache["hits"] >= 2
+    assert 0 < cache["hit_rate"] <= 1
+
+
+def test_train_returns_job_and_swaps_model(client, monkeypatch):
+    """Test de l'entraînement en tâche de fond avec identifiant de job"""
+    import time
+
+    from src.web_service.executor import training_pool
+    from src.web_service.registry import model_registry
+
+    # Pool de threads pour le test (évite de lancer un processus)
+    monkeypatch.setattr(training_pool, "kind", "thread")
+    old_version = client.post("/predict", json=SAMPLE).json()["model_version"]
+
+    response = client.post("/train", json={"n_estimators": 5, "max_depth": 4})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["status_url"] == f"/train/{job_id}"
+
+    for _ in range(200):
+        job = client.get(f"/train/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    training_pool.shutdown()
+
+    assert job["status"] == "succeeded", job["error"]
+    assert job["params"]["n_estimators"] == 5
+    assert job["duration_seconds"] >= job["training_seconds"] > 0
+    assert set(job["metrics"]) == {"mse", "rmse", "r2_score"}
+    assert job["model_version"] == model_registry.current.version != old_version
+    assert len(model_registry.current.model.estimators_) == 5
+    prediction = client.post("/predict", json=SAMPLE).json()
+    assert prediction["model_version"] == job["model_version"]
+
+    assert client.get("/train/unknown").status_code == 404
+
+
+def test_micro_batching_coalesces_concurrent_predictions(
+    trained_artifacts, monkeypatch
+):
+    """Test du micro-batching : requêtes concurrentes regroupées, mêmes résultats"""
+    import asyncio
+
+    import httpx
+
+    from src.web_service import main
+    from src.web_service.app_config import config
+    from src.web_service.batching import micro_batcher
+    from src.web_service.registry import model_registry
+
+    model_registry.clear()
+    monkeypatch.setattr(config, "micro_batching_enabled", True)
+    monkeypatch.setattr(micro_batcher, "max_wait", 0.05)
+    samples = [dict(SAMPLE, length=0.3 + i / 100) for i in range(32)]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            batched = await asyncio.gather(
+                *(c.post("/predict", json=s) for s in samples)
+            )
+            monkeypatch.setattr(config, "micro_batching_enabled", False)
+            direct = [await c.post("/predict", json=s) for s in samples]
+        micro_batcher.stop()
+        return batched, direct
+
+    batches_before = micro_batcher.batches
+    batched, direct = asyncio.run(scenario())
+
+    assert [r.json() for r in batched] == [r.json() for r in direct]
+    assert micro_batcher.batches - batches_before < len(samples)
+    assert micro_batcher.largest_batch > 1
+    model_registry.clear()
+
+
+def test_predict_stream_ndjson_and_csv(client, monkeypatch):
+    """Test du flux NDJSON/CSV : découpage en blocs, erreurs par ligne, parité"""
+    import json
+
+    from src.web_service.app_config import config
+
+    monkeypatch.setattr(config, "stream_chunk_size", 3)
+    samples = [dict(SAMPLE, length=0.3 + i / 100) for i in range(8)]
+    expected = client.post("/predict/batch", json={"samples": samples}).json()
+    expected = [
+        (p["predicted_rings"], p["predicted_age"]) for p in expected["predictions"]
+    ]
+
+    lines = [json.dumps(s) for s in samples]
+    lines.insert(4, json.dumps(dict(SAMPLE, sex="X")))
+    body = ("\n".join(lines) + "\n").encode()
+
+    def pieces(data, size=37):
+        for start in range(0, len(data), size):
+            yield data[start : start + size]
+
+    response = client.post(
+        "/predict/stream",
+        content=pieces(body),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["x-model-version"]
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["row"] for r in records] == list(range(9))
+    assert "sex" in records.pop(4)["error"]
+    assert [(r["predicted_rings"], r["predicted_age"]) for r in records] == expected
+
+    # En-tête CSV aux noms des colonnes d'entraînement, colonne Rings ignorée
+    csv_lines = [
+        "Sex,Length,Diameter,Height,Whole weight,Shucked weight,"
+        "Viscera weight,Shell weight,Rings"
+    ]
+    csv_lines += [",".join(str(v) for v in s.values()) + ",9" for s in samples]
+    response = client.post(
+        "/predict/stream",
+        content="\r\n".join(csv_lines).encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    rows = [line.split(",") for line in response.text.splitlines()[1:]]
+    assert [(float(r[1]), float(r[2])) for r in rows] == expected
+
+    assert client.post("/predict/stream", json=SAMPLE).status_code == 415
+
+
+def test_train_with_successive_halving(client, monkeypatch):
+    """Test de l'entraînement avec recherche par paliers via /train"""
+    import time
+
+    from src.web_service.executor import training_pool
+
+    monkeypatch.setattr(training_pool, "kind", "thread")
+    response = client.post(
+        "/train",
+        json={
+            "search": "halving",
+            "halving_resource": "trees",
+            "param_grid": {"n_estimators": [3, 9], "max_depth": [2, 4]},
+        },
+    )
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    for _ in range(400):
+        job = client.get(f"/train/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    training_pool.shutdown()
+
+    assert job["status"] == "succeeded", job["error"]
+    search = job["search"]
+    assert [rung["n_candidates"] for rung in search["rungs"]] == [4, 2]
+    assert search["n_fits"] == 6 and search["cpu_seconds"] > 0
+    assert search["best_params"]["min_samples_leaf"] == 2  # valeur de la requête
+
+    invalid = client.post("/train", json={"param_grid": {"criterion": [1]}})
+    assert invalid.status_code == 422
+
+
+def test_predict_arrow_and_parquet(client, trained_artifacts):
+    """Test du lot colonnaire Arrow/Parquet : mêmes prédictions, erreurs en 422"""
+    import io
+
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from src.web_service.app_config import config
+    from src.web_service.preprocessing import prepare_training_data
+
+    X, _, _ = prepare_training_data(config.data_path)
+    X = X.iloc[:500]
+    expected = trained_artifacts.predict(X)
+
+    # Noms d'entraînement, sexe en libellés dictionnaire
+    frame = X.rename(columns={"Sex_encoded": "Sex"})
+    frame["Sex"] = np.array(["F", "I", "M"])[X["Sex_encoded"]]
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.set_column(0, "Sex", table.column("Sex").dictionary_encode())
+
+    stream = io.BytesIO()
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+
+    for body, media_type in (
+        (stream.getvalue(), "application/vnd.apache.arrow.stream"),
+        (parquet.getvalue(), "application/vnd.apache.parquet"),
+    ):
+        response = client.post(
+            "/predict/arrow", content=body, headers={"Content-Type": media_type}
+        )
+        assert response.status_code == 200
+        result = pa.ipc.open_stream(response.content).read_all()
+        assert result.column_names == ["predicted_rings", "predicted_age"]
+        assert (
+            result.schema.metadata[b"model_version"].decode()
+            == (response.headers["x-model-version"])
+        )
+        rings = result.column("predicted_rings").to_numpy()
+        np.testing.assert_allclose(rings, expected, atol=0.005 + 1e-9)
+        np.testing.assert_allclose(
+            result.column("predicted_age").to_numpy(), rings + 1.5
+        )
+
+    missing = io.BytesIO()
+    with pa.ipc.new_stream(missing, table.drop(["Height"]).schema) as writer:
+        writer.write_table(table.drop(["Height"]))
+    response = client.post(
+        "/predict/arrow",
+        content=missing.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+    )
+    assert response.status_code == 422
+    assert "Height" in response.json()["detail"]
+
+    # Un code Sex_encoded hors des classes de l'encodeur est rejeté, pas prédit
+    codes = pa.array(np.resize([0, 1, 3], table.num_rows))
+    encoded = table.set_column(0, "Sex_encoded", codes)
+    out_of_range = io.BytesIO()
+    pq.write_table(encoded, out_of_range)
+    response = client.post(
+        "/predict/arrow",
+        content=out_of_range.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.parquet"},
+    )
+    assert response.status_code == 422
+    assert "Sex_encoded" in response.json()["detail"]
+
+
+def test_predict_batch_compact_response(client):
+    """Test du mode compact : tableaux parallèles, identifiants, mêmes prédictions"""
+    samples = [dict(SAMPLE, length=0.3 + i / 100) for i in range(5)]
+    full = client.post("/predict/batch", json={"samples": samples}).json()
+
+    response = client.post(
+        "/predict/batch",
+        json={"samples": samples, "response_format": "compact", "ids": list("abcde")},
+    )
+    assert response.status_code == 200
+    compact = response.json()
+    assert compact["count"] == 5
+    assert compact["ids"] == list("abcde")
+    assert compact["model_version"] == full["predictions"][0]["model_version"]
+    assert compact["predicted_rings"] == [
+        p["predicted_rings"] for p in full["predictions"]
+    ]
+    assert compact["predicted_age"] == [p["predicted_age"] for p in full["predictions"]]
+
+    mismatched = {"samples": samples, "response_format": "compact", "ids": [1]}
+    assert client.post("/predict/batch", json=mismatched).status_code == 422
+
+
+def test_liveness_and_readiness_probes(trained_artifacts, monkeypatch):
+    """Test des sondes : prête seulement une fois le modèle chargé, sans chargement"""
+    from src.web_service import main
+    from src.web_service.app_config import config
+    from src.web_service.registry import model_registry
+
+    monkeypatch.setattr(config, "preload_model", False)
+    model_registry.clear()
+    with TestClient(main.app) as client:
+        live = client.get("/health/live")
+        assert live.status_code == 200 and live.json()["status"] == "alive"
+
+        # La sonde ne déclenche pas le chargement du modèle
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "not_ready"
+        assert not response.json()["model_loaded"]
+        assert model_registry.current is None
+
+        health = client.get("/health").json()
+        assert health["status"] == "degraded" and not health["model_loaded"]
+        assert model_registry.current is None
+
+        prediction = client.post("/predict", json=SAMPLE).json()
+        ready = client.get("/health/ready")
+        assert ready.status_code == 200
+        body = ready.json()
+        assert body["status"] == "ready" and body["warmed_up"]
+        assert body["model_version"] == prediction["model_version"]
+        assert body["model_load_seconds"] >= body["warm_up_seconds"] > 0
+        assert 0 <= body["last_prediction_age_seconds"] < 60
+        assert client.get("/health").json()["status"] == "healthy"
+    model_registry.clear()
+
+
+def test_startup_preloads_and_warms_up(client):
+    """Test du préchargement : prête dès le démarrage, workers et cache intacts"""
+    from src.web_service.app_config import config
+    from src.web_service.executor import inference_pool
+    from src.web_service.inference import prediction_cache
+
+    # Le lifespan a chargé et chauffé le modèle avant la première requête
+    ready = client.get("/health/ready").json()
+    assert ready["status"] == "ready"
+    assert ready["time_to_ready_seconds"] > 0
+    assert ready["first_request_seconds"] is None
+    assert ready["last_prediction_age_seconds"] is None
+    warm_ups = len(config.warm_up_batch_sizes) * inference_pool.max_workers
+    assert inference_pool.completed >= warm_ups
+
+    # Les lots synthétiques n'entrent pas dans le cache de prédictions
+    assert len(prediction_cache) == 0
+
+    assert client.post("/predict", json=SAMPLE).status_code == 200
+    assert client.get("/health/ready").json()["first_request_seconds"] > 0
+
+
+def test_prometheus_metrics(client):
+    """Test de /metrics : étapes du chemin de prédiction, tailles de lot, chargements"""
+    client.post("/predict", json=SAMPLE)
+    client.post("/predict/batch", json={"samples": [SAMPLE] * 3})
+    version = client.get("/health/ready").json()["model_version"]
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    for stage in ("validation", "prepare_features", "model.predict", "serialization"):
+        assert (
+            f'abalone_request_stage_duration_seconds_count{{endpoint="/predict",'
+            f'model_version="{version}",stage="{stage}"}}'
+        ) in text
+    assert (
+        'abalone_http_requests_total{endpoint="/predict",method="POST",status="200"}'
+    ) in text
+    assert (
+        f'abalone_prediction_batch_size_bucket{{endpoint="/predict/batch",'
+        f'model_version="{version}",le="4.0"}}'
+    ) in text
+    assert "abalone_prediction_cache_hits_total" in text
+    assert (
+        f'abalone_model_load_duration_seconds_count{{model_version="{version}"' in text
+    )
+
+
+def test_profiling_samples_selected_requests(trained_artifacts):
+    """Test du profileur : seules les requêtes marquées sont échantillonnées"""
+    from src.web_service import main
+    from src.web_service.profiling import ProfilingMiddleware, sampling_profiler
+    from src.web_service.registry import model_registry
+
+    samples = [dict(SAMPLE, length=0.2 + i / 10**5) for i in range(5000)]
+    model_registry.clear()
+    try:
+        with TestClient(ProfilingMiddleware(main.app, mode="header")) as client:
+            client.delete("/admin/profile")
+            client.post("/predict/batch", json={"samples": samples})
+            assert sampling_profiler.jobs == 0
+
+            response = client.post(
+                "/predict/batch", json={"samples": samples}, headers={"X-Profile": "1"}
+            )
+            assert response.status_code == 200
+            profile = client.get("/admin/profile")
+    finally:
+        sampling_profiler.enabled = False
+        model_registry.clear()
+
+    assert profile.headers["X-Profile-Jobs"] == "1"
+    assert int(profile.headers["X-Profile-Samples"]) > 0
+    stack, count = profile.text.splitlines()[0].rsplit(" ", 1)
+    assert stack.startswith("POST /predict/batch;run_batch_inference (")
+    assert int(count) > 0